@@ -0,0 +1,64 @@
+"""Common fixtures for the Powersensor integration benchmarks."""
+
+import json
+import logging
+from pathlib import Path
+import platform
+import sys
+
+import pytest
+
+from homeassistant.const import __version__ as HA_VERSION
+
+RESULTS: list[dict] = []
+
+# Registering thousands of entities is otherwise very chatty
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the benchmark options."""
+    parser.addoption(
+        "--benchmark-json",
+        default=str(Path(__file__).parent / "results.json"),
+        help="File to write the benchmark results to, as JSON",
+    )
+    parser.addoption(
+        "--replay-capture",
+        default=None,
+        help="Message capture to replay, instead of a synthetic one",
+    )
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Placeholder fixture that is a no-op for enabling custom integrations."""
+
+
+@pytest.fixture
+def benchmark_results() -> list[dict]:
+    """Return the list collecting results, one dict per benchmark run."""
+    return RESULTS
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    """Write out all collected results."""
+    if not RESULTS:
+        return
+    output = Path(session.config.getoption("--benchmark-json"))
+    output.write_text(
+        json.dumps(
+            {
+                "environment": {
+                    "python": sys.version.split()[0],
+                    "homeassistant": HA_VERSION,
+                    "machine": platform.machine(),
+                    "platform": platform.platform(),
+                },
+                "results": RESULTS,
+            },
+            indent=2,
+        )
+        + "\n"
+    )
+    print(f"\nBenchmark results written to {output}")
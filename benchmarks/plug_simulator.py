@@ -0,0 +1,338 @@
+"""Local stand-in for Powersensor plugs, speaking the plug's UDP protocol.
+
+Each simulated plug listens on its own localhost UDP port, the same way a real
+plug does on the network. A client subscribes by sending `subscribe(<secs>)`,
+after which the plug streams JSON encoded `instant_power` messages to it: the
+plug's own, and those of any sensors it relays for. Shortly before a
+subscription runs out a subscription warning is sent, prompting the client to
+renew it, just like the real thing.
+
+Plugs can be told to go silent for a while (a dropped connection), or to move
+to another address (an IP change). A fake zeroconf announcer delivers the
+plug's service info straight to the integration's dispatcher signals, in place
+of real mDNS.
+
+It can be used from the benchmarks, or run standalone to point a development
+Home Assistant at:
+
+    python benchmarks/plug_simulator.py --plugs 200 --sensors-per-plug 1
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+import json
+import re
+from time import time
+
+from custom_components.powersensor.const import (
+    ROLE_APPLIANCE,
+    ZEROCONF_ADD_PLUG_SIGNAL,
+    ZEROCONF_REMOVE_PLUG_SIGNAL,
+    ZEROCONF_UPDATE_PLUG_SIGNAL,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+SERVICE_TYPE = "_powersensor._udp.local."
+SUBSCRIBE_RE = re.compile(rb"subscribe\((\d+)\)")
+WARNING_LEAD = 10  # seconds before expiry to warn about the subscription
+
+
+@dataclass
+class SimulatedSensor:
+    """A sensor relayed by a simulated plug."""
+
+    mac: str
+    role: str | None = None
+    interval_multiplier: int = 30  # sensors report less often than plugs
+
+
+class SimulatedPlug(asyncio.DatagramProtocol):
+    """A single simulated plug, serving UDP on localhost."""
+
+    def __init__(
+        self,
+        mac: str,
+        role: str = ROLE_APPLIANCE,
+        interval: float = 1.0,
+        sensors: list[SimulatedSensor] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Constructor for the plug. A port of 0 picks a free port on start."""
+        self.mac = mac
+        self.role = role
+        self.interval = interval
+        self.sensors = sensors or []
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self._subscribers: dict[tuple, float] = {}
+        self._warned: set[tuple] = set()
+        self._transport: asyncio.DatagramTransport | None = None
+        self._task: asyncio.Task | None = None
+        self._silent_until = 0.0
+        self._tick = 0
+        self._started = int(time())
+
+    @property
+    def name(self) -> str:
+        """The zeroconf service name of the plug."""
+        return f"Powersensor-gateway-{self.mac}-civet.{SERVICE_TYPE}"
+
+    @property
+    def subscribers(self) -> int:
+        """Number of clients currently subscribed."""
+        return len(self._subscribers)
+
+    def zeroconf_info(self) -> dict:
+        """Return service info shaped like the discovery service provides."""
+        return {
+            "type": SERVICE_TYPE,
+            "name": self.name,
+            "addresses": [self.host],
+            "port": self.port,
+            "server": f"{self.mac}.local.",
+            "properties": {b"id": self.mac.encode()},
+        }
+
+    async def start(self) -> None:
+        """Start serving, and streaming to subscribers."""
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            lambda: self, local_addr=(self.host, self.port)
+        )
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"plug-{self.mac}")
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._close()
+
+    def drop(self, seconds: float) -> None:
+        """Go silent for a while, neither answering nor streaming."""
+        self._silent_until = asyncio.get_running_loop().time() + seconds
+
+    async def move(self, host: str | None = None, port: int = 0) -> None:
+        """Change address, dropping all existing subscriptions."""
+        self._close()
+        self.host = host or self.host
+        self.port = port
+        await self.start()
+
+    def _close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        self._subscribers.clear()
+        self._warned.clear()
+
+    def _silent(self) -> bool:
+        return asyncio.get_running_loop().time() < self._silent_until
+
+    # DatagramProtocol support
+
+    def connection_made(self, transport) -> None:
+        """Note the transport, and the port actually bound to."""
+        self._transport = transport
+        self.port = transport.get_extra_info("sockname")[1]
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        """Handle (un)subscribe requests."""
+        if self._silent():
+            return
+        for line in data.splitlines():
+            if (match := SUBSCRIBE_RE.fullmatch(line.strip())) is None:
+                continue
+            seconds = int(match.group(1))
+            self._warned.discard(addr)
+            if seconds == 0:
+                self._subscribers.pop(addr, None)
+            else:
+                expiry = asyncio.get_running_loop().time() + seconds
+                self._subscribers[addr] = expiry
+
+    # Message generation
+
+    def _send(self, message: dict) -> None:
+        if self._transport is None:
+            return
+        data = json.dumps(message).encode() + b"\n"
+        for addr in self._subscribers:
+            self._transport.sendto(data, addr)
+            self.sent += 1
+
+    def _expire_subscriptions(self) -> None:
+        now = asyncio.get_running_loop().time()
+        for addr, expiry in list(self._subscribers.items()):
+            if expiry <= now:
+                del self._subscribers[addr]
+                self._warned.discard(addr)
+            elif expiry - now <= WARNING_LEAD and addr not in self._warned:
+                self._warned.add(addr)
+                if self._transport is not None:
+                    self._transport.sendto(
+                        b'{"type": "subscription", "subtype": "warning"}\n', addr
+                    )
+
+    def plug_message(self) -> dict:
+        """Return the plug's own next message."""
+        tick = self._tick
+        watts = 100.0 + tick % 50
+        return {
+            "type": "instant_power",
+            "device": "plug",
+            "mac": self.mac,
+            "role": self.role,
+            "starttime": float(self._started + tick),
+            "duration": self.interval,
+            "unit": "W",
+            "power": watts,
+            "summation": 3_600_000 + tick * watts,
+            "summation_start": self._started,
+            "current": watts / 240,
+            "active_current": watts / 245,
+            "reactive_current": watts / 2400,
+            "voltage": 240.0 + tick % 7,
+        }
+
+    def sensor_message(self, sensor: SimulatedSensor) -> dict:
+        """Return the next message of a relayed sensor."""
+        tick = self._tick
+        watts = 1500.0 + tick % 300
+        return {
+            "type": "instant_power",
+            "device": "sensor",
+            "mac": sensor.mac,
+            "role": sensor.role,
+            "starttime": float(self._started + tick),
+            "duration": self.interval * sensor.interval_multiplier,
+            "unit": "W",
+            "power": watts,
+            "summation": 36_000_000 + tick * watts,
+            "summation_start": self._started,
+            "batteryMicrovolt": 3_900_000 - tick % 10 * 1000,
+            "rssi": -60.0 - tick % 20,
+            "raw_rssi": -60 - tick % 20,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self._tick += 1
+            if self._silent():
+                continue
+            self._expire_subscriptions()
+            if not self._subscribers:
+                continue
+            self._send(self.plug_message())
+            for sensor in self.sensors:
+                if self._tick % sensor.interval_multiplier == 0:
+                    self._send(self.sensor_message(sensor))
+
+
+class FakeZeroconfAnnouncer:
+    """Announces simulated plugs to the integration, in place of mDNS."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Constructor for the announcer."""
+        self._hass = hass
+
+    def add(self, plug: SimulatedPlug) -> None:
+        """Announce a newly discovered plug."""
+        async_dispatcher_send(self._hass, ZEROCONF_ADD_PLUG_SIGNAL, plug.zeroconf_info())
+
+    def update(self, plug: SimulatedPlug) -> None:
+        """Announce a change of a plug's service info, such as its address."""
+        async_dispatcher_send(
+            self._hass, ZEROCONF_UPDATE_PLUG_SIGNAL, plug.zeroconf_info()
+        )
+
+    def remove(self, plug: SimulatedPlug) -> None:
+        """Announce a plug has gone away."""
+        async_dispatcher_send(
+            self._hass, ZEROCONF_REMOVE_PLUG_SIGNAL, plug.name, plug.zeroconf_info()
+        )
+
+
+class PlugSimulator:
+    """A fleet of simulated plugs."""
+
+    def __init__(
+        self,
+        plugs: int,
+        sensors_per_plug: int = 0,
+        interval: float = 1.0,
+        host: str = "127.0.0.1",
+        base_port: int = 0,
+    ) -> None:
+        """Constructor for the fleet.
+
+        With a `base_port` of 0 each plug gets a free port, otherwise the plugs
+        use consecutive ports from `base_port`.
+        """
+        self.plugs = []
+        for n in range(plugs):
+            sensors = [
+                SimulatedSensor(f"a4cf13{n:04x}{s:02x}") for s in range(sensors_per_plug)
+            ]
+            self.plugs.append(
+                SimulatedPlug(
+                    f"a4cf12{n:06x}",
+                    interval=interval,
+                    sensors=sensors,
+                    host=host,
+                    port=base_port + n if base_port else 0,
+                )
+            )
+
+    async def start(self) -> None:
+        """Start all plugs."""
+        await asyncio.gather(*(plug.start() for plug in self.plugs))
+
+    async def stop(self) -> None:
+        """Stop all plugs."""
+        await asyncio.gather(*(plug.stop() for plug in self.plugs))
+
+    def announce(self, announcer: FakeZeroconfAnnouncer) -> None:
+        """Announce all plugs."""
+        for plug in self.plugs:
+            announcer.add(plug)
+
+    @property
+    def sent(self) -> int:
+        """Total number of messages sent by all plugs."""
+        return sum(plug.sent for plug in self.plugs)
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--plugs", type=int, default=10)
+    parser.add_argument("--sensors-per-plug", type=int, default=0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = PlugSimulator(
+        args.plugs, args.sensors_per_plug, args.interval, args.host, args.base_port
+    )
+    await simulator.start()
+    for plug in simulator.plugs:
+        print(f"{plug.mac} {plug.host}:{plug.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
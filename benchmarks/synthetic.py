@@ -0,0 +1,81 @@
+"""Synthetic Powersensor messages, shaped like those emitted by PlugApi."""
+
+from collections.abc import Iterator
+
+PLUG_EVENTS = ("average_power", "average_power_components", "summation_energy")
+SENSOR_EVENTS = (
+    "average_power",
+    "summation_energy",
+    "battery_level",
+    "radio_signal_quality",
+)
+
+START_TIME = 1_700_000_000
+
+
+def device_macs(prefix: str, count: int) -> list[str]:
+    """Return `count` distinct, stable mac addresses."""
+    return [f"{prefix}{n:06x}" for n in range(count)]
+
+
+def plug_messages(mac: str, tick: int) -> Iterator[tuple[str, dict]]:
+    """Yield one round of plug messages, varying the readings with `tick`."""
+    start = START_TIME + tick
+    watts = 100 + tick % 50
+    yield "average_power", {
+        "mac": mac,
+        "role": "appliance",
+        "starttime_utc": start,
+        "watts": watts,
+        "duration_s": 1.0,
+    }
+    yield "average_power_components", {
+        "mac": mac,
+        "role": "appliance",
+        "starttime_utc": start,
+        "apparent_current": round(watts / 240, 3),
+        "active_current": round(watts / 245, 3),
+        "reactive_current": round(watts / 2400, 3),
+        "volts": 240.0 + tick % 7,
+    }
+    yield "summation_energy", {
+        "mac": mac,
+        "role": "appliance",
+        "starttime_utc": start,
+        "summation_joules": 3_600_000 + tick * watts,
+        "summation_resettime_utc": START_TIME,
+    }
+
+
+def sensor_messages(mac: str, role: str, tick: int) -> Iterator[tuple[str, dict]]:
+    """Yield one round of sensor messages, varying the readings with `tick`."""
+    start = START_TIME + tick * 30
+    watts = 1500 + tick % 300
+    yield "average_power", {
+        "mac": mac,
+        "role": role,
+        "starttime_utc": start,
+        "watts": watts,
+        "duration_s": 30.0,
+    }
+    yield "summation_energy", {
+        "mac": mac,
+        "role": role,
+        "starttime_utc": start,
+        "summation_joules": 36_000_000 + tick * watts * 30,
+        "summation_resettime_utc": START_TIME,
+    }
+    yield "battery_level", {
+        "mac": mac,
+        "role": role,
+        "starttime_utc": start,
+        "volts": 3.6 - tick % 10 / 100,
+    }
+    yield "radio_signal_quality", {
+        "mac": mac,
+        "role": role,
+        "starttime_utc": start,
+        "average_rssi": -60.0 - tick % 20,
+        "last_rssi": -60 - tick % 20,
+        "duration_s": 30.0,
+    }
@@ -0,0 +1,189 @@
+"""Throughput and latency of the message path, from dispatcher to state write.
+
+Each benchmark feeds synthetic messages for a population of plugs and sensors
+through `PowersensorMessageDispatcher.handle_message`, with real entities
+subscribed, and measures:
+
+- messages handled per second,
+- p50/p99 latency from the start of `handle_message` to each resulting
+  `async_write_ha_state`,
+- state writes per message, and
+- memory allocated per message, as traced by tracemalloc.
+"""
+
+from dataclasses import dataclass, field
+from time import perf_counter
+import tracemalloc
+
+from powersensor_local import VirtualHousehold  # type: ignore[import-untyped]
+import pytest
+from synthetic import device_macs, plug_messages, sensor_messages
+
+from custom_components.powersensor.const import (
+    CFG_ROLES,
+    DOMAIN,
+    ROLE_APPLIANCE,
+    ROLE_HOUSENET,
+    ROLE_SOLAR,
+)
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from custom_components.powersensor.sensor.PlugMeasurements import PlugMeasurements
+from custom_components.powersensor.sensor.PowersensorEntity import PowersensorEntity
+from custom_components.powersensor.sensor.PowersensorPlugEntity import (
+    PowersensorPlugEntity,
+)
+from custom_components.powersensor.sensor.PowersensorSensorEntity import (
+    PowersensorSensorEntity,
+)
+from custom_components.powersensor.sensor.SensorMeasurements import (
+    SensorMeasurements,
+)
+from homeassistant.core import HomeAssistant
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    MockEntityPlatform,
+)
+
+SCALES = [10, 100, 1000]
+SENSOR_EVERY = 5  # one in every five devices is a sensor, the rest are plugs
+TARGET_MESSAGES = 20000
+ALLOCATION_SAMPLE = 500
+
+
+@dataclass
+class WriteProbe:
+    """Records the latency of state writes relative to the current message."""
+
+    started: float | None = None
+    latencies: list[float] = field(default_factory=list)
+    writes: int = 0
+
+    def record(self) -> None:
+        """Note a state write."""
+        self.writes += 1
+        if self.started is not None:
+            self.latencies.append(perf_counter() - self.started)
+
+
+@pytest.fixture
+def probe(monkeypatch: pytest.MonkeyPatch) -> WriteProbe:
+    """Instrument entity state writes. Must be set up before creating entities."""
+    probe = WriteProbe()
+    write = PowersensorEntity.async_write_ha_state
+
+    def timed_write(self) -> None:
+        write(self)
+        probe.record()
+
+    monkeypatch.setattr(PowersensorEntity, "async_write_ha_state", timed_write)
+    return probe
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of some samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def build_population(devices: int) -> tuple[list[str], dict[str, str]]:
+    """Split `devices` into plug macs and sensor mac -> role."""
+    macs = device_macs("a4cf12", devices)
+    sensors: dict[str, str] = {}
+    for n, mac in enumerate(macs[::SENSOR_EVERY]):
+        sensors[mac] = (ROLE_HOUSENET, ROLE_SOLAR)[n] if n < 2 else ROLE_APPLIANCE
+    plugs = [mac for mac in macs if mac not in sensors]
+    return plugs, sensors
+
+
+def build_round(plugs: list[str], sensors: dict[str, str], tick: int) -> list:
+    """Return one message from every event of every device."""
+    messages = [msg for mac in plugs for msg in plug_messages(mac, tick)]
+    messages += [
+        msg for mac, role in sensors.items() for msg in sensor_messages(mac, role, tick)
+    ]
+    return messages
+
+
+@pytest.mark.parametrize("devices", SCALES)
+async def test_dispatcher_throughput(
+    hass: HomeAssistant, probe: WriteProbe, benchmark_results: list, devices: int
+) -> None:
+    """Benchmark the message path for a population of devices."""
+    plugs, sensors = build_population(devices)
+    # Persist the steady state roles, so no role updates get signalled
+    roles = {**dict.fromkeys(plugs, ROLE_APPLIANCE), **sensors}
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: roles})
+    entry.add_to_hass(hass)
+    dispatcher = PowersensorMessageDispatcher(hass, entry, VirtualHousehold(False))
+
+    platform = MockEntityPlatform(hass)
+    await platform.async_add_entities(
+        [
+            PowersensorPlugEntity(hass, mac, ROLE_APPLIANCE, measurement)
+            for mac in plugs
+            for measurement in PlugMeasurements
+        ]
+        + [
+            PowersensorSensorEntity(hass, mac, role, measurement)
+            for mac, role in sensors.items()
+            for measurement in SensorMeasurements
+        ]
+    )
+
+    # Warm up, which also makes all the entities available
+    for event, message in build_round(plugs, sensors, 0):
+        await dispatcher.handle_message(event, message)
+
+    per_round = len(plugs) * 3 + len(sensors) * 4
+    rounds = max(3, TARGET_MESSAGES // per_round)
+    messages = [
+        msg for tick in range(1, rounds + 1) for msg in build_round(plugs, sensors, tick)
+    ]
+
+    probe.latencies.clear()
+    probe.writes = 0
+    started = perf_counter()
+    for event, message in messages:
+        probe.started = perf_counter()
+        await dispatcher.handle_message(event, message)
+    elapsed = perf_counter() - started
+    probe.started = None
+
+    # Allocations are measured separately, as tracing skews the timings
+    sample = build_round(plugs, sensors, rounds + 1)[:ALLOCATION_SAMPLE]
+    tracemalloc.start()
+    peak_bytes = 0
+    baseline, _ = tracemalloc.get_traced_memory()
+    for event, message in sample:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await dispatcher.handle_message(event, message)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - before
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert probe.latencies, "no state writes happened while benchmarking"
+    result = {
+        "benchmark": "dispatcher_throughput",
+        "devices": devices,
+        "plugs": len(plugs),
+        "sensors": len(sensors),
+        "entities": len(platform.entities),
+        "messages": len(messages),
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(len(messages) / elapsed, 1),
+        "state_writes_per_message": round(probe.writes / len(messages), 3),
+        "write_latency_p50_ms": round(percentile(probe.latencies, 50) * 1000, 4),
+        "write_latency_p99_ms": round(percentile(probe.latencies, 99) * 1000, 4),
+        "peak_alloc_bytes_per_message": round(peak_bytes / len(sample)),
+        "retained_bytes_per_message": round((retained - baseline) / len(sample)),
+    }
+    benchmark_results.append(result)
+    print(result)
+
+    await platform.async_reset()
+    await dispatcher.disconnect()
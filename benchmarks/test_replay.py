@@ -0,0 +1,81 @@
+"""Replay of a message capture through the dispatcher, as fast as possible.
+
+By default a synthetic capture is recorded first. Pass
+`--replay-capture=<file>` to replay a capture taken on a real site instead,
+so a change can be measured against that site's actual traffic.
+"""
+
+from time import perf_counter
+
+from powersensor_local import VirtualHousehold  # type: ignore[import-untyped]
+import pytest
+from synthetic import device_macs, plug_messages, sensor_messages
+
+from custom_components.powersensor.const import CFG_ROLES, DOMAIN, ROLE_SOLAR
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from custom_components.powersensor.PowersensorMessageRecorder import (
+    PowersensorMessageRecorder,
+    async_replay,
+    read_capture,
+)
+from homeassistant.core import HomeAssistant
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+ROUNDS = 200
+
+
+async def record_synthetic_capture(hass: HomeAssistant, path: str) -> None:
+    """Record a capture of 50 plugs and 10 sensors."""
+    recorder = PowersensorMessageRecorder(hass, path)
+    plugs = device_macs("a4cf12", 50)
+    sensors = device_macs("a4cf13", 10)
+    for mac in sensors:
+        recorder.record(mac, "now_relaying_for", {"mac": mac, "device_type": "sensor"})
+    for tick in range(ROUNDS):
+        for mac in plugs:
+            for event, message in plug_messages(mac, tick):
+                recorder.record(mac, event, message)
+        for mac in sensors:
+            for event, message in sensor_messages(mac, ROLE_SOLAR, tick):
+                recorder.record(mac, event, message)
+    await recorder.async_stop()
+
+
+async def test_replay(
+    hass: HomeAssistant,
+    request: pytest.FixtureRequest,
+    tmp_path,
+    benchmark_results: list,
+) -> None:
+    """Benchmark replaying a capture at maximum speed."""
+    path = request.config.getoption("--replay-capture")
+    if path is None:
+        path = str(tmp_path / "capture.bin")
+        await record_synthetic_capture(hass, path)
+
+    started = perf_counter()
+    messages = list(read_capture(path))
+    read_seconds = perf_counter() - started
+
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}})
+    entry.add_to_hass(hass)
+    dispatcher = PowersensorMessageDispatcher(hass, entry, VirtualHousehold(False))
+    started = perf_counter()
+    replayed = await async_replay(dispatcher, iter(messages), speed=None)
+    elapsed = perf_counter() - started
+
+    result = {
+        "benchmark": "replay",
+        "capture": request.config.getoption("--replay-capture") or "synthetic",
+        "messages": replayed,
+        "read_seconds": round(read_seconds, 4),
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(replayed / elapsed, 1),
+    }
+    benchmark_results.append(result)
+    print(result)
+
+    await dispatcher.disconnect()
@@ -0,0 +1,128 @@
+"""Load test of plug connections, against simulated plugs on localhost.
+
+Plugs are announced through a fake zeroconf announcer and connected through
+the integration's own queue, `_create_api` and connection manager, with real
+PlugApi UDP connections to the simulator. Measures how long it takes for all
+plugs to deliver their first message, the steady state message rate and loss,
+and how quickly a plug changing address is reconnected.
+"""
+
+import asyncio
+from time import perf_counter
+
+from plug_simulator import FakeZeroconfAnnouncer, PlugSimulator
+from powersensor_local import VirtualHousehold  # type: ignore[import-untyped]
+import pytest
+
+from custom_components.powersensor.const import (
+    CFG_ROLES,
+    CREATE_PLUG_SIGNAL,
+    DOMAIN,
+    PLUG_ADDED_TO_HA_SIGNAL,
+)
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+PLUG_COUNTS = [10, 200]
+INTERVAL = 0.2
+STEADY_SECONDS = 3
+CONNECT_TIMEOUT = 60
+MAX_LOSS_RATIO = 0.1
+
+
+async def wait_for(condition, timeout: float = CONNECT_TIMEOUT) -> None:
+    """Poll until a condition holds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.05)
+
+
+@pytest.mark.parametrize("plugs", PLUG_COUNTS)
+async def test_simulated_plugs(
+    hass: HomeAssistant, socket_enabled: None, benchmark_results: list, plugs: int
+) -> None:
+    """Benchmark connecting to, and receiving from, a fleet of plugs."""
+    simulator = PlugSimulator(plugs, sensors_per_plug=1, interval=INTERVAL)
+    await simulator.start()
+
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}})
+    entry.add_to_hass(hass)
+    dispatcher = PowersensorMessageDispatcher(
+        hass, entry, VirtualHousehold(False), connect_concurrency=32
+    )
+    # Every raw plug message yields exactly one average_power event
+    received = 0
+    handle_message = dispatcher._mailbox._handler
+
+    async def count_message(event: str, message: dict) -> None:
+        nonlocal received
+        if event == "average_power":
+            received += 1
+        await handle_message(event, message)
+
+    # The mailbox holds on to the handler it was given, so that is wrapped
+    dispatcher._mailbox._handler = count_message
+
+    # Stand in for the sensor platform, acknowledging new plugs straight away
+    @callback
+    def plug_created(mac: str, host: str, port: int, name: str) -> None:
+        async_dispatcher_send(hass, PLUG_ADDED_TO_HA_SIGNAL, mac, host, port, name)
+
+    unsub = async_dispatcher_connect(hass, CREATE_PLUG_SIGNAL, plug_created)
+    await dispatcher.process_plug_queue()
+
+    macs = [plug.mac for plug in simulator.plugs]
+    started = perf_counter()
+    simulator.announce(FakeZeroconfAnnouncer(hass))
+    await wait_for(
+        lambda: all(dispatcher.connections.time_to_first_message(mac) for mac in macs)
+    )
+    all_connected = perf_counter() - started
+    first_messages = sorted(
+        dispatcher.connections.time_to_first_message(mac) or 0 for mac in macs
+    )
+
+    sent_before, received_before = simulator.sent, received
+    await asyncio.sleep(STEADY_SECONDS)
+    sent = simulator.sent - sent_before
+    steady_received = received - received_before
+
+    # Move a plug to another port, and have it found again
+    plug = simulator.plugs[0]
+    await plug.move(port=0)
+    started = perf_counter()
+    FakeZeroconfAnnouncer(hass).update(plug)
+    await wait_for(lambda: dispatcher.plugs[plug.mac].port == plug.port)
+    await wait_for(lambda: dispatcher.connections.time_to_first_message(plug.mac))
+    moved_reconnect = perf_counter() - started
+
+    result = {
+        "benchmark": "simulated_plugs",
+        "plugs": plugs,
+        "sensors": plugs,
+        "all_connected_s": round(all_connected, 3),
+        "first_message_p50_s": round(first_messages[len(first_messages) // 2], 3),
+        "first_message_max_s": round(first_messages[-1], 3),
+        "steady_messages_per_second": round(steady_received / STEADY_SECONDS, 1),
+        "steady_loss_ratio": round(1 - steady_received / sent, 4) if sent else None,
+        "moved_plug_reconnect_s": round(moved_reconnect, 3),
+    }
+    benchmark_results.append(result)
+    print(result)
+
+    unsub()
+    await dispatcher.disconnect()
+    await simulator.stop()
+    await hass.async_block_till_done()
+
+    # Messages are only counted once drained from the mailbox
+    assert steady_received > 0
+    assert sent and 1 - steady_received / sent < MAX_LOSS_RATIO
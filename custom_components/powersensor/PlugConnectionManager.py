@@ -0,0 +1,248 @@
+"""Coordinated establishment and supervision of plug connections.
+
+Rather than every plug connecting the moment its PlugApi is created, connection
+requests are queued and handed to a bounded pool of workers. Each worker starts
+a connection after a random stagger delay, and holds on to its slot until the
+plug has produced its first message (or a timeout expires). This avoids a
+thundering herd of connection attempts after Home Assistant restarts.
+
+Once connected, each plug is supervised. A plug which reports an exception,
+fails to produce its first message, or goes silent is disconnected and
+reconnected after an exponential backoff with jitter. Reconnects go through
+the same bounded pool, so many plugs failing at once cannot spike the loop.
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from functools import partial
+import logging
+import random
+from time import monotonic
+
+from powersensor_local import PlugApi  # type: ignore[import-untyped]
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    DEFAULT_CONNECT_CONCURRENCY,
+    DEFAULT_CONNECT_STAGGER,
+    DEFAULT_FIRST_MESSAGE_TIMEOUT,
+    DEFAULT_RECONNECT_BACKOFF_MAX,
+    DEFAULT_RECONNECT_BACKOFF_MIN,
+)
+from .PowersensorLivenessTracker import async_get_liveness_tracker
+from .PowersensorMetrics import async_get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PlugConnectionStats:
+    """Connection timing and health for a single plug."""
+
+    requested_at: float
+    connected_at: float | None = None
+    first_message_at: float | None = None
+    failures: int = 0
+    reconnects: int = 0
+
+    @property
+    def time_to_first_message(self) -> float | None:
+        """Seconds from requesting the connection until the first message."""
+        if self.first_message_at is None:
+            return None
+        return self.first_message_at - self.requested_at
+
+    @property
+    def uptime(self) -> float | None:
+        """Seconds since the current connection produced its first message."""
+        if self.first_message_at is None:
+            return None
+        return monotonic() - self.first_message_at
+
+
+class PlugConnectionManager:
+    """Opens plug connections in parallel up to a concurrency limit, and keeps them up."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        concurrency: int = DEFAULT_CONNECT_CONCURRENCY,
+        stagger: float = DEFAULT_CONNECT_STAGGER,
+        first_message_timeout: float = DEFAULT_FIRST_MESSAGE_TIMEOUT,
+        backoff_min: float = DEFAULT_RECONNECT_BACKOFF_MIN,
+        backoff_max: float = DEFAULT_RECONNECT_BACKOFF_MAX,
+    ) -> None:
+        """Constructor for the connection manager."""
+        self._hass = hass
+        self._concurrency = max(1, concurrency)
+        self._stagger = stagger
+        self._first_message_timeout = first_message_timeout
+        self._backoff_min = backoff_min
+        self._backoff_max = backoff_max
+        self._apis: dict[str, PlugApi] = {}
+        self._pending: OrderedDict[str, PlugApi] = OrderedDict()
+        self._awaiting_first_message: dict[str, asyncio.Event] = {}
+        self._workers: set[asyncio.Task] = set()
+        self._reconnect_timers: dict[str, CALLBACK_TYPE] = {}
+        self._unsub_silence: dict[str, Callable[[], None]] = {}
+        self.stats: dict[str, PlugConnectionStats] = {}
+
+    @property
+    def queued(self) -> int:
+        """Number of plugs waiting for a connection slot."""
+        return len(self._pending)
+
+    @callback
+    def request_connect(self, mac: str, api: PlugApi) -> None:
+        """Queue a plug connection, replacing any not yet started one."""
+        self._apis[mac] = api
+        self._pending.pop(mac, None)
+        self._pending[mac] = api
+        now = monotonic()
+        if (stats := self.stats.get(mac)) is None:
+            self.stats[mac] = PlugConnectionStats(requested_at=now)
+        else:
+            stats.requested_at = now
+            stats.connected_at = stats.first_message_at = None
+        if mac not in self._unsub_silence:
+            self._unsub_silence[mac] = async_get_liveness_tracker(
+                self._hass
+            ).subscribe(mac, partial(self.report_failure, mac, "no messages"))
+        if len(self._workers) < self._concurrency:
+            task = self._hass.async_create_background_task(
+                self._worker(), name="powersensor_plug_connect"
+            )
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+
+    @callback
+    def cancel(self, mac: str) -> None:
+        """Stop connecting to and supervising a plug."""
+        self._apis.pop(mac, None)
+        self._pending.pop(mac, None)
+        self.stats.pop(mac, None)
+        if (unsub := self._reconnect_timers.pop(mac, None)) is not None:
+            unsub()
+        if (unsub := self._unsub_silence.pop(mac, None)) is not None:
+            unsub()
+        if (event := self._awaiting_first_message.get(mac)) is not None:
+            event.set()
+
+    @callback
+    def message_received(self, mac: str) -> None:
+        """Note a message from a plug, completing its connection if pending."""
+        event = self._awaiting_first_message.pop(mac, None)
+        if event is None:
+            return
+        stats = self.stats.get(mac)
+        if stats is not None:
+            stats.first_message_at = monotonic()
+            stats.failures = 0
+            _LOGGER.debug(
+                "First message from plug %s after %.1f s",
+                mac,
+                stats.time_to_first_message,
+            )
+        event.set()
+
+    def time_to_first_message(self, mac: str) -> float | None:
+        """Return how long a plug took to produce its first message, if known."""
+        stats = self.stats.get(mac)
+        return None if stats is None else stats.time_to_first_message
+
+    def as_diagnostics(self) -> dict:
+        """Return the connection progress and stats of all plugs."""
+        return {
+            "queued": list(self._pending),
+            "awaiting_first_message": list(self._awaiting_first_message),
+            "reconnect_scheduled": list(self._reconnect_timers),
+            "stats": {
+                mac: {**asdict(stats), "uptime": stats.uptime}
+                for mac, stats in self.stats.items()
+            },
+        }
+
+    @callback
+    def report_failure(self, mac: str, reason: str) -> None:
+        """Schedule a reconnect of a failing plug, backing off exponentially."""
+        stats = self.stats.get(mac)
+        if (
+            stats is None
+            or mac in self._reconnect_timers
+            or mac in self._pending
+            or mac in self._awaiting_first_message
+        ):
+            # Not supervised, or a (re)connection is already under way
+            return
+        delay = min(
+            self._backoff_max, self._backoff_min * 2**stats.failures
+        ) * random.uniform(0.5, 1.0)
+        stats.failures += 1
+        _LOGGER.info(
+            "Plug %s connection problem (%s), reconnecting in %.1f s",
+            mac,
+            reason,
+            delay,
+        )
+        self._reconnect_timers[mac] = async_call_later(
+            self._hass,
+            delay,
+            HassJob(partial(self._async_reconnect, mac), cancel_on_shutdown=True),
+        )
+
+    async def _async_reconnect(self, mac: str, _now=None) -> None:
+        self._reconnect_timers.pop(mac, None)
+        api = self._apis.get(mac)
+        if api is None:
+            return
+        self.stats[mac].reconnects += 1
+        async_get_metrics(self._hass).count("reconnects")
+        await api.disconnect()
+        self.request_connect(mac, api)
+
+    async def _worker(self) -> None:
+        """Connect queued plugs one at a time, until none are left."""
+        while self._pending:
+            mac, api = self._pending.popitem(last=False)
+            await asyncio.sleep(random.uniform(0, self._stagger))
+            if (
+                mac in self._pending
+                or mac not in self._apis
+                or self._apis[mac] is not api
+            ):
+                # Cancelled or requested again while staggering
+                continue
+            first_message = asyncio.Event()
+            self._awaiting_first_message[mac] = first_message
+            if (stats := self.stats.get(mac)) is not None:
+                stats.connected_at = monotonic()
+            api.connect()
+            timed_out = False
+            try:
+                await asyncio.wait_for(
+                    first_message.wait(), self._first_message_timeout
+                )
+            except TimeoutError:
+                timed_out = True
+            finally:
+                # A newer attempt for the same plug may be awaiting its own
+                if self._awaiting_first_message.get(mac) is first_message:
+                    del self._awaiting_first_message[mac]
+            if timed_out:
+                # Only once no longer awaiting, as the failure is ignored before
+                self.report_failure(mac, "no first message")
+
+    async def stop(self) -> None:
+        """Stop all pending connection and supervision work."""
+        for mac in list(self._apis):
+            self.cancel(mac)
+        workers = list(self._workers)
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._awaiting_first_message.clear()
@@ -0,0 +1,106 @@
+"""Per plug flap detection, for adapting the removal debounce.
+
+A single fixed debounce fits no plug well. One on marginal Wi-Fi keeps
+dropping off mDNS and coming back, and would better be given more time before
+its connection is torn down. One which has been stable for a long time and
+then disappears has most likely been unplugged, and needn't linger.
+
+Every time a pending removal turns out to be unfounded, or a connection drops,
+the plug's flap score goes up. The score decays with a half life, so plugs
+which settle down are trusted again over time. The debounce starts out at half
+the base value, doubles with each point of score, and is kept within bounds.
+Plugs whose score has (all but) decayed away are considered stable, and are
+removed without any debounce once they have gone silent.
+"""
+
+from dataclasses import dataclass
+import math
+from time import monotonic
+
+from .const import (
+    DEFAULT_REMOVAL_DEBOUNCE,
+    FLAP_HALF_LIFE,
+    REMOVAL_DEBOUNCE_MAX,
+    REMOVAL_DEBOUNCE_MIN,
+)
+
+FLAP_WEIGHT = 1.0
+DROP_WEIGHT = 0.5
+STABLE_SCORE = 0.05  # the score never quite decays to zero
+
+
+@dataclass
+class PlugFlapHistory:
+    """The flap history of a single plug."""
+
+    score: float = 0.0
+    updated_at: float = 0.0
+    flaps: int = 0
+    drops: int = 0
+
+
+class PlugFlapDetector:
+    """Tracks how much each plug flaps, and the removal debounce it warrants."""
+
+    def __init__(
+        self,
+        base: float = DEFAULT_REMOVAL_DEBOUNCE,
+        minimum: float = REMOVAL_DEBOUNCE_MIN,
+        maximum: float = REMOVAL_DEBOUNCE_MAX,
+        half_life: float = FLAP_HALF_LIFE,
+    ) -> None:
+        """Constructor for the flap detector.
+
+        Plugs which have never flapped get half of `base` seconds, and the
+        debounce is kept between `minimum` and `maximum` seconds.
+        """
+        self._base = base
+        self._minimum = minimum
+        self._maximum = max(minimum, maximum)
+        self._decay = math.log(2) / half_life
+        self._history: dict[str, PlugFlapHistory] = {}
+
+    def record_flap(self, mac: str) -> None:
+        """Note that a plug came back while its removal was pending."""
+        history = self._bump(mac, FLAP_WEIGHT)
+        history.flaps += 1
+
+    def record_drop(self, mac: str) -> None:
+        """Note that the connection to a plug dropped."""
+        history = self._bump(mac, DROP_WEIGHT)
+        history.drops += 1
+
+    def score(self, mac: str) -> float:
+        """Return the current flap score of a plug."""
+        history = self._history.get(mac)
+        if history is None:
+            return 0.0
+        return history.score * math.exp(
+            -self._decay * (monotonic() - history.updated_at)
+        )
+
+    def is_stable(self, mac: str) -> bool:
+        """Check whether a plug hasn't flapped or dropped recently."""
+        return self.score(mac) < STABLE_SCORE
+
+    def debounce(self, mac: str) -> float:
+        """Return the removal debounce for a plug, in seconds."""
+        debounce = self._base * 2 ** (self.score(mac) - 1)
+        return min(self._maximum, max(self._minimum, debounce))
+
+    def as_diagnostics(self, mac: str) -> dict:
+        """Return the flap history and debounce of a plug, for diagnostics."""
+        history = self._history.get(mac, PlugFlapHistory())
+        return {
+            "score": round(self.score(mac), 3),
+            "flaps": history.flaps,
+            "drops": history.drops,
+            "removal_debounce": round(self.debounce(mac), 1),
+        }
+
+    def _bump(self, mac: str, weight: float) -> PlugFlapHistory:
+        score = self.score(mac)
+        history = self._history.setdefault(mac, PlugFlapHistory())
+        history.score = score + weight
+        history.updated_at = monotonic()
+        return history
@@ -0,0 +1,95 @@
+"""Ordered queue of plugs waiting to be added, with per-plug progress tracking."""
+
+import asyncio
+from collections import OrderedDict
+from enum import Enum
+
+
+class PlugState(Enum):
+    """How far along a plug is in being added to Home Assistant."""
+
+    PENDING = 1
+    CREATING = 2
+    CONNECTED = 3
+
+
+PlugInfo = tuple[str, str, int, str]  # mac, host, port, name
+
+
+class PlugQueue:
+    """Awaitable, ordered queue of plugs to add, keyed by mac address.
+
+    Each plug appears in the queue at most once, and is processed in the order
+    it was first queued. Re-queueing a plug still waiting in the queue only
+    refreshes its network details. The state of each plug is kept after it
+    leaves the queue, so that a plug whose entity creation is in progress is
+    not requested again, and a connected plug queued again on a discovery
+    update still shows as connected.
+    """
+
+    def __init__(self) -> None:
+        """Constructor for PlugQueue. Starts out empty."""
+        self._queue: OrderedDict[str, PlugInfo] = OrderedDict()
+        self._states: dict[str, PlugState] = {}
+        self._not_empty = asyncio.Event()
+
+    def put(self, info: PlugInfo) -> bool:
+        """Queue a plug for adding. Returns False if the plug is being created."""
+        mac = info[0]
+        if self._states.get(mac) == PlugState.CREATING:
+            return False
+        self._queue[mac] = info
+        if self._states.get(mac) != PlugState.CONNECTED:
+            self._states[mac] = PlugState.PENDING
+        self._not_empty.set()
+        return True
+
+    def get_nowait(self) -> PlugInfo:
+        """Remove and return the longest waiting plug, raise KeyError if empty."""
+        try:
+            _, info = self._queue.popitem(last=False)
+        except KeyError:
+            raise KeyError("PlugQueue is empty") from None
+        if not self._queue:
+            self._not_empty.clear()
+        return info
+
+    async def get(self) -> PlugInfo:
+        """Remove and return the longest waiting plug, waiting for one if needed."""
+        while not self._queue:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def set_state(self, mac: str, state: PlugState) -> None:
+        """Record the progress of a plug."""
+        self._states[mac] = state
+
+    def state(self, mac: str) -> PlugState | None:
+        """Return the progress of a plug, or None if never queued."""
+        return self._states.get(mac)
+
+    def forget(self, mac: str) -> None:
+        """Drop a plug from the queue along with its progress."""
+        self._queue.pop(mac, None)
+        self._states.pop(mac, None)
+        if not self._queue:
+            self._not_empty.clear()
+
+    def as_diagnostics(self) -> dict:
+        """Return the queued plugs and the progress of all plugs."""
+        return {
+            "queued": list(self._queue),
+            "states": {mac: state.name for mac, state in self._states.items()},
+        }
+
+    def __contains__(self, mac) -> bool:
+        """Check if a plug is waiting in the queue."""
+        return mac in self._queue
+
+    def __len__(self) -> int:
+        """Get number of plugs waiting in the queue."""
+        return len(self._queue)
+
+    def __bool__(self) -> bool:
+        """Check if any plugs are waiting in the queue."""
+        return bool(self._queue)
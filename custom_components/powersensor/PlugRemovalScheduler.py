@@ -0,0 +1,99 @@
+"""Deadline based scheduling of plug removals.
+
+Plugs used to be removed by a task per plug, sleeping out the debounce before
+tearing the plug down. The discovery listener held one such task as well, so a
+vanished plug was only removed after both had slept, and a large outage left
+hundreds of tasks sleeping. Instead, the deadline of each pending removal is
+only recorded here, and a single timer fires for whichever is due first.
+"""
+
+from collections.abc import Callable, Iterator
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PlugRemovalScheduler:
+    """The pending plug removals, and when each is due."""
+
+    def __init__(self, hass: HomeAssistant, on_due: Callable[[str], None]) -> None:
+        """Constructor for the scheduler, calling `on_due` with each due mac."""
+        self._hass = hass
+        self._on_due = on_due
+        self._deadlines: dict[str, float] = {}
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._timer_at: float | None = None
+
+    def __contains__(self, mac: object) -> bool:
+        """Check whether the removal of a plug is pending."""
+        return mac in self._deadlines
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the plugs whose removal is pending."""
+        return iter(self._deadlines)
+
+    def __len__(self) -> int:
+        """Return the number of pending removals."""
+        return len(self._deadlines)
+
+    @callback
+    def schedule(self, mac: str, delay: float) -> None:
+        """Remove a plug after `delay` seconds, unless cancelled before.
+
+        An already pending removal is only ever brought forward.
+        """
+        deadline = self._hass.loop.time() + delay
+        if mac in self._deadlines and self._deadlines[mac] <= deadline:
+            return
+        self._deadlines[mac] = deadline
+        self._arm()
+
+    @callback
+    def cancel(self, mac: str) -> bool:
+        """Cancel the pending removal of a plug. Returns whether there was one."""
+        if self._deadlines.pop(mac, None) is None:
+            return False
+        if not self._deadlines:
+            self.stop()
+        return True
+
+    @callback
+    def stop(self) -> None:
+        """Cancel all pending removals."""
+        self._deadlines.clear()
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+            self._timer_at = None
+
+    @callback
+    def _arm(self) -> None:
+        """Have the timer fire when the earliest removal is due."""
+        due_at = min(self._deadlines.values())
+        if self._timer_at is not None and self._timer_at <= due_at:
+            return
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+        self._timer_at = due_at
+        self._unsub_timer = async_call_later(
+            self._hass,
+            max(0, due_at - self._hass.loop.time()),
+            HassJob(self._async_fire, cancel_on_shutdown=True),
+        )
+
+    @callback
+    def _async_fire(self, _now=None) -> None:
+        self._unsub_timer = None
+        self._timer_at = None
+        now = self._hass.loop.time()
+        due = [mac for mac, deadline in self._deadlines.items() if deadline <= now]
+        for mac in due:
+            del self._deadlines[mac]
+        if self._deadlines:
+            self._arm()
+        for mac in due:
+            _LOGGER.debug("Removal of plug %s is due", mac)
+            self._on_due(mac)
@@ -0,0 +1,121 @@
+"""Per-device routing of Powersensor messages to Home Assistant entities.
+
+Rather than going through the global Home Assistant dispatcher with a
+formatted signal name per (mac, event), entities register their handlers in a
+prebuilt mac -> event -> handlers table. A message for a device can then be
+delivered to all of that device's interested entities in a single pass.
+
+The router also knows which events have any entity listening at all, and tells
+listeners when that changes, so plugs need only be asked for those events.
+"""
+
+from collections.abc import Callable
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_ROUTER
+
+_LOGGER = logging.getLogger(__name__)
+
+RouteHandler = Callable[[str, dict], Any]
+
+
+class PowersensorDeviceRouter:
+    """Routing table from device mac and event to entity handlers."""
+
+    def __init__(self) -> None:
+        """Constructor for the device router. Starts off with an empty table."""
+        # Handler sequences are stored as tuples and rebuilt on (un)subscribe,
+        # so the message path never has to copy them before iterating.
+        self._routes: dict[str, dict[str, tuple[RouteHandler, ...]]] = {}
+        self._event_refs: dict[str, int] = {}
+        self._event_listeners: list[Callable[[], None]] = []
+
+    @callback
+    def subscribe(
+        self, mac: str, event: str, handler: RouteHandler
+    ) -> Callable[[], None]:
+        """Register a handler for an event from a device.
+
+        Returns a callable which removes the registration again.
+        """
+        events = self._routes.setdefault(mac, {})
+        events[event] = (*events.get(event, ()), handler)
+        self._ref_event(event, 1)
+
+        @callback
+        def unsubscribe() -> None:
+            self._unsubscribe(mac, event, handler)
+
+        return unsubscribe
+
+    @callback
+    def _unsubscribe(self, mac: str, event: str, handler: RouteHandler) -> None:
+        events = self._routes.get(mac)
+        if events is None or handler not in events.get(event, ()):
+            return
+        handlers = tuple(h for h in events[event] if h is not handler)
+        self._ref_event(event, len(handlers) - len(events[event]))
+        if handlers:
+            events[event] = handlers
+        else:
+            del events[event]
+            if not events:
+                del self._routes[mac]
+
+    @callback
+    def _ref_event(self, event: str, delta: int) -> None:
+        refs = self._event_refs.get(event, 0) + delta
+        if refs:
+            self._event_refs[event] = refs
+        else:
+            del self._event_refs[event]
+        # Only the first subscription to and the last removal from an event
+        # change the set of routed events
+        if refs == (1 if delta > 0 else 0):
+            for listener in list(self._event_listeners):
+                listener()
+
+    def routed_events(self) -> frozenset[str]:
+        """Return the events which any entity is listening to."""
+        return frozenset(self._event_refs)
+
+    @callback
+    def subscribe_routed_events(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback for changes to the set of routed events.
+
+        Returns a callable which removes the registration again.
+        """
+        self._event_listeners.append(listener)
+
+        @callback
+        def unsubscribe() -> None:
+            if listener in self._event_listeners:
+                self._event_listeners.remove(listener)
+
+        return unsubscribe
+
+    def has_routes(self, mac: str) -> bool:
+        """Check whether any entity is listening to this device."""
+        return mac in self._routes
+
+    @callback
+    def route(self, mac: str, *updates: tuple[str, dict]) -> None:
+        """Deliver one or more (event, message) updates to a device's entities."""
+        events = self._routes.get(mac)
+        if events is None:
+            return
+        for event, message in updates:
+            for handler in events.get(event, ()):
+                handler(event, message)
+
+
+@callback
+def async_get_router(hass: HomeAssistant) -> PowersensorDeviceRouter:
+    """Return the device router for this Home Assistant instance."""
+    router: PowersensorDeviceRouter | None = hass.data.get(DATA_ROUTER)
+    if router is None:
+        router = hass.data[DATA_ROUTER] = PowersensorDeviceRouter()
+    return router
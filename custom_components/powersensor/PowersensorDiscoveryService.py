@@ -1,11 +1,24 @@
-"""Utilities to support zeroconf discovery of new plugs on the network."""
+"""Utilities to support zeroconf discovery of new plugs on the network.
+
+Discovery runs entirely on the event loop. The async zeroconf browser reports
+service changes on the loop, where they are only queued. The changes queued
+within a short window are handled as a batch. Service info for all plugs which
+are present is looked up concurrently, mostly answered from the zeroconf cache,
+so an mDNS storm neither blocks a thread on lookups nor floods the loop with a
+handoff per event.
+
+Chatty mDNS responders repeat their announcements constantly. Within a batch
+only the last change of each service counts, and a plug is only signalled to
+the dispatcher when its addresses, port or properties differ from what it was
+last seen with. Removals are signalled straight away, as debouncing them is
+left to the dispatcher.
+"""
 
 import asyncio
-from contextlib import suppress
 import logging
 
-from zeroconf import BadTypeInNameException, ServiceBrowser, ServiceListener, Zeroconf
-from zeroconf.asyncio import AsyncServiceInfo
+from zeroconf import BadTypeInNameException, ServiceStateChange, Zeroconf
+from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo
 
 import homeassistant.components.zeroconf
 from homeassistant.core import HomeAssistant, callback
@@ -13,6 +26,7 @@ from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.loader import bind_hass
 
 from .const import (
+    DISCOVERY_COALESCE_WINDOW,
     ZEROCONF_ADD_PLUG_SIGNAL,
     ZEROCONF_REMOVE_PLUG_SIGNAL,
     ZEROCONF_UPDATE_PLUG_SIGNAL,
@@ -20,91 +34,115 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
+SERVICE_INFO_TIMEOUT = 3000
 
-class PowersensorServiceListener(ServiceListener):
+
+def _endpoint(plug: dict) -> tuple:
+    """Return what the dispatcher cares about, for detecting changes."""
+    return plug["addresses"], plug["port"], plug["properties"]
+
+
+class PowersensorServiceListener:
     """A zeroconf service listener that handles the discovery of plugs and signals the dispatcher."""
 
-    def __init__(self, hass: HomeAssistant, debounce_timeout: float = 60) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coalesce_window: float = DISCOVERY_COALESCE_WINDOW,
+    ) -> None:
         """Initialize the listener, set up various buffers to hold info."""
         self._hass = hass
         self._plugs: dict[str, dict] = {}
-        self._discoveries: dict[str, AsyncServiceInfo] = {}
-        self._pending_removals: dict[str, asyncio.Task] = {}
-        self._debounce_seconds = debounce_timeout
-
-    def add_service(self, zc, type_, name):
-        """Handle zeroconf messages for adding new devices."""
-        self.cancel_any_pending_removal(name, "request to add")
-        info = self.__add_plug(zc, type_, name)
-        if info:
-            asyncio.run_coroutine_threadsafe(
-                self._async_service_add(self._plugs[name]), self._hass.loop
-            )
+        self._coalesce_seconds = coalesce_window
+        self._queued: list[tuple[Zeroconf, str, str, ServiceStateChange]] = []
+        self._batch: asyncio.Task | None = None
 
-    async def _async_service_add(self, *args):
-        """Send add signal to dispatcher."""
-        self.dispatch(ZEROCONF_ADD_PLUG_SIGNAL, *args)
+    @callback
+    def async_on_service_state_change(
+        self,
+        zeroconf: Zeroconf,
+        service_type: str,
+        name: str,
+        state_change: ServiceStateChange,
+    ) -> None:
+        """Queue a service change reported by the browser, for the next batch."""
+        self._queued.append((zeroconf, service_type, name, state_change))
+        if self._batch is None:
+            self._batch = self._hass.async_create_background_task(
+                self._async_process_queued(),
+                "Powersensor zeroconf batch",
+                eager_start=False,
+            )
 
-    async def _async_delayed_remove(self, name):
-        """Actually process the removal after delay."""
+    async def _async_process_queued(self) -> None:
+        """Handle the last queued change of each service, in order of appearance."""
         try:
-            await asyncio.sleep(self._debounce_seconds)
-            _LOGGER.info(
-                "Request to remove service %s still pending after timeout. Processing remove request... ",
-                name,
-            )
-            if name in self._plugs:
-                data = self._plugs[name].copy()
-                del self._plugs[name]
-            else:
-                data = None
-            asyncio.run_coroutine_threadsafe(
-                self._async_service_remove(name, data), self._hass.loop
-            )
-        except asyncio.CancelledError:
-            # Task was cancelled because service came back
-            _LOGGER.info(
-                "Request to remove service %s was canceled by request to update or add plug. ",
-                name,
-            )
-            raise
+            while self._queued:
+                # Let the rest of a burst of changes arrive first
+                await asyncio.sleep(self._coalesce_seconds)
+                batch, self._queued = self._queued, []
+                changes = {
+                    name: (zc, type_, state_change)
+                    for zc, type_, name, state_change in batch
+                }
+                present = {
+                    name: (zc, type_)
+                    for name, (zc, type_, state_change) in changes.items()
+                    if state_change is not ServiceStateChange.Removed
+                }
+                infos = dict(
+                    zip(
+                        present,
+                        await asyncio.gather(
+                            *(
+                                self._async_get_service_info(zc, type_, name)
+                                for name, (zc, type_) in present.items()
+                            )
+                        ),
+                    )
+                )
+                for name, (_, type_, state_change) in changes.items():
+                    if state_change is ServiceStateChange.Removed:
+                        self.remove_service(name)
+                    else:
+                        self.update_service(type_, name, infos[name])
         finally:
-            # Either way were done with this task
-            self._pending_removals.pop(name, None)
+            self._batch = None
 
-    def remove_service(self, zc, type_, name):
-        """Handle zeroconf messages for removal of devices."""
-        if name in self._pending_removals:
-            # removal for this service is already pending
-            return
-
-        _LOGGER.info("Scheduling removal for %s", name)
-        self._pending_removals[name] = asyncio.run_coroutine_threadsafe(
-            self._async_delayed_remove(name), self._hass.loop
-        )
+    @callback
+    def remove_service(self, name: str):
+        """Handle zeroconf messages for removal of devices.
 
-    async def _async_service_remove(self, *args):
-        """Send remove signal to dispatcher."""
-        self.dispatch(ZEROCONF_REMOVE_PLUG_SIGNAL, *args)
-
-    def update_service(self, zc, type_, name):
-        """Handle zeroconf messages for updating device info."""
-        self.cancel_any_pending_removal(name, "request to update")
-        info = self.__add_plug(zc, type_, name)
-        if info:
-            asyncio.run_coroutine_threadsafe(
-                self._async_service_update(self._plugs[name]), self._hass.loop
-            )
+        Whether and when the plug is actually removed is up to the dispatcher.
+        """
+        data = self._plugs.pop(name, None)
+        self.dispatch(ZEROCONF_REMOVE_PLUG_SIGNAL, name, data)
 
-    async def _async_service_update(self, *args):
-        """Send update signal to dispatcher."""
-        # remove from pending tasks if update received
-        self.dispatch(ZEROCONF_UPDATE_PLUG_SIGNAL, *args)
+    @callback
+    def update_service(self, type_: str, name: str, info: AsyncServiceInfo | None):
+        """Handle zeroconf messages for adding or updating devices.
 
-    async def _async_get_service_info(self, zc, type_, name):
+        Only new plugs, and plugs whose endpoint changed, are signalled.
+        """
+        if not info:
+            return
+        plug = self.__plug_data(type_, name, info)
+        known = self._plugs.get(name)
+        self._plugs[name] = plug
+        if known is None:
+            self.dispatch(ZEROCONF_ADD_PLUG_SIGNAL, plug)
+        elif _endpoint(known) != _endpoint(plug):
+            self.dispatch(ZEROCONF_UPDATE_PLUG_SIGNAL, plug)
+        else:
+            _LOGGER.debug("Service %s is unchanged", name)
+
+    async def _async_get_service_info(
+        self, zc: Zeroconf, type_: str, name: str
+    ) -> AsyncServiceInfo | None:
         try:
-            info = await zc.async_get_service_info(type_, name, timeout=3000)
-            self._discoveries[name] = info
+            return await zc.async_get_service_info(
+                type_, name, timeout=SERVICE_INFO_TIMEOUT
+            )
         except (
             TimeoutError,
             OSError,
@@ -112,29 +150,25 @@ class PowersensorServiceListener(ServiceListener):
             NotImplementedError,
         ) as err:  # expected possible exceptions
             _LOGGER.error("Error retrieving info for %s: %s", name, err)
-
-    def __add_plug(self, zc, type_, name):
-        info = zc.get_service_info(type_, name)
-
-        if info:
-            self._plugs[name] = {
-                "type": type_,
-                "name": name,
-                "addresses": [
-                    ".".join(str(b) for b in addr) for addr in info.addresses
-                ],
-                "port": info.port,
-                "server": info.server,
-                "properties": info.properties,
-            }
-        return info
-
-    def cancel_any_pending_removal(self, name, source):
-        """Cancel pending removal and don't send to dispatcher."""
-        task = self._pending_removals.pop(name, None)
-        if task:
-            task.cancel()
-            _LOGGER.info("Cancelled pending removal for %s by %s. ", name, source)
+            return None
+
+    def __plug_data(self, type_, name, info):
+        return {
+            "type": type_,
+            "name": name,
+            "addresses": [".".join(str(b) for b in addr) for addr in info.addresses],
+            "port": info.port,
+            "server": info.server,
+            "properties": info.properties,
+        }
+
+    async def async_stop(self) -> None:
+        """Drop queued changes, and cancel pending lookups."""
+        self._queued.clear()
+        if self._batch is not None:
+            self._batch.cancel()
+            await asyncio.gather(self._batch, return_exceptions=True)
+            self._batch = None
 
     @callback
     @bind_hass
@@ -155,9 +189,8 @@ class PowersensorDiscoveryService:
 
         self.zc: Zeroconf | None = None
         self.listener: PowersensorServiceListener | None = None
-        self.browser: ServiceBrowser | None = None
+        self.browser: AsyncServiceBrowser | None = None
         self.running = False
-        self._task: asyncio.Task | None = None
 
     async def start(self):
         """Start the mDNS discovery service."""
@@ -168,26 +201,22 @@ class PowersensorDiscoveryService:
         self.zc = await homeassistant.components.zeroconf.async_get_instance(self._hass)
         self.listener = PowersensorServiceListener(self._hass)
 
-        # Create browser
-        self.browser = ServiceBrowser(self.zc, self.service_type, self.listener)
-
-        # Start the background task
-        self._task = asyncio.create_task(self._run())
-
-    async def _run(self):
-        """Background task that keeps the service alive."""
-        with suppress(asyncio.CancelledError):
-            while self.running:
-                await asyncio.sleep(1)
+        # The async browser reports changes on the event loop
+        self.browser = AsyncServiceBrowser(
+            self.zc,
+            self.service_type,
+            handlers=[self.listener.async_on_service_state_change],
+        )
 
     async def stop(self):
         """Stop the mDNS discovery service."""
         self.running = False
 
-        if self._task:
-            self._task.cancel()
-            with suppress(asyncio.CancelledError):
-                await self._task
+        if self.browser:
+            await self.browser.async_cancel()
+
+        if self.listener:
+            await self.listener.async_stop()
 
         if self.zc:
             # self.zc.close()
@@ -0,0 +1,102 @@
+"""Persisted cache of the network endpoints of all known plugs.
+
+The config flow only stores the plugs found during setup. Plugs discovered
+later, and address changes of any plug, are remembered here instead, so on
+startup connections can be made straight away rather than waiting for zeroconf
+to rediscover every plug. Zeroconf then only has to correct what has changed.
+
+Updates are only held in memory, and written out in one go a little later, so
+a burst of discovery events results in a single write. Plugs which stay
+connected are noted as seen again from their messages, about once a day, so
+they aren't forgotten just for never having been rediscovered.
+"""
+
+import logging
+from time import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .PowersensorStoreWriter import PowersensorStoreWriter
+from .const import (
+    DOMAIN,
+    ENDPOINT_CACHE_MAX_AGE,
+    ENDPOINT_CACHE_REFRESH_INTERVAL,
+    ENDPOINT_CACHE_SAVE_DELAY,
+    ENDPOINT_CACHE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _storage_key(entry_id: str) -> str:
+    return f"{DOMAIN}.{entry_id}.endpoints"
+
+
+class PowersensorEndpointCache:
+    """Remembers the host, port and name each plug was last seen at."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Constructor for the endpoint cache of a config entry."""
+        self._store: Store[dict[str, dict]] = Store(
+            hass, ENDPOINT_CACHE_VERSION, _storage_key(entry_id)
+        )
+        self._endpoints: dict[str, dict] = {}
+        self._writer = PowersensorStoreWriter(
+            hass, self._store, self._data_to_save, ENDPOINT_CACHE_SAVE_DELAY
+        )
+
+    async def async_load(self) -> dict[str, dict]:
+        """Load the cache, returning the endpoints by mac.
+
+        Plugs not seen for a long time are forgotten.
+        """
+        stored = await self._store.async_load() or {}
+        cutoff = time() - ENDPOINT_CACHE_MAX_AGE
+        self._endpoints = {
+            mac: endpoint
+            for mac, endpoint in stored.items()
+            if endpoint.get("last_seen", 0) >= cutoff
+        }
+        _LOGGER.debug("Loaded %d cached plug endpoints", len(self._endpoints))
+        return dict(self._endpoints)
+
+    @callback
+    def update(self, mac: str, host: str, port: int, name: str) -> None:
+        """Record where a plug has just been seen."""
+        self._endpoints[mac] = {
+            "mac": mac,
+            "host": str(host),
+            "port": port,
+            "name": name,
+            "last_seen": time(),
+        }
+        self._writer.schedule()
+
+    @callback
+    def touch(self, mac: str) -> None:
+        """Note that a known plug is still there, at the same endpoint."""
+        endpoint = self._endpoints.get(mac)
+        now = time()
+        if (
+            endpoint is None
+            or now - endpoint["last_seen"] < ENDPOINT_CACHE_REFRESH_INTERVAL
+        ):
+            return
+        self._endpoints[mac] = {**endpoint, "last_seen": now}
+        self._writer.schedule()
+
+    async def async_stop(self) -> None:
+        """Write out any pending updates now."""
+        await self._writer.async_flush()
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict]:
+        # Entries are only ever replaced, never changed in place, so a shallow
+        # copy is a consistent snapshot
+        return dict(self._endpoints)
+
+
+async def async_remove_endpoint_cache(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the endpoint cache of a config entry which is being removed."""
+    await Store(hass, ENDPOINT_CACHE_VERSION, _storage_key(entry_id)).async_remove()
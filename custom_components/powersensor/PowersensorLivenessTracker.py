@@ -0,0 +1,125 @@
+"""Integration wide tracking of which Powersensor devices are still reporting.
+
+Instead of each entity holding its own timer which gets cancelled and
+recreated on every message, the message dispatcher records when each device
+was last heard from. A single coarse periodic sweep then expires all devices
+which have gone silent, and notifies their entities in one batch.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import timedelta
+import logging
+from time import monotonic
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DATA_LIVENESS
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60
+DEFAULT_TICK = 5
+
+
+class PowersensorLivenessTracker:
+    """Tracks the last time each device was heard from."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        timeout: float = DEFAULT_TIMEOUT,
+        tick: float = DEFAULT_TICK,
+    ) -> None:
+        """Constructor for the liveness tracker.
+
+        Devices not heard from for `timeout` seconds are expired. Expiry is
+        checked every `tick` seconds, while any device is being tracked.
+        """
+        self._hass = hass
+        self._timeout = timeout
+        self._tick = timedelta(seconds=tick)
+        # Kept ordered from least to most recently seen, so a sweep only ever
+        # has to look at the head of the queue. With a single timeout for all
+        # devices this gives the same O(1) behaviour as a timing wheel.
+        self._last_seen: OrderedDict[str, float] = OrderedDict()
+        self._listeners: dict[str, list[Callable[[], None]]] = {}
+        self._unsub_tick: CALLBACK_TYPE | None = None
+
+    @callback
+    def touch(self, mac: str) -> None:
+        """Record that a device has just been heard from."""
+        last_seen = self._last_seen
+        if mac in last_seen:
+            last_seen.move_to_end(mac)
+        last_seen[mac] = monotonic()
+        if self._unsub_tick is None:
+            self._unsub_tick = async_track_time_interval(
+                self._hass,
+                self._async_sweep,
+                self._tick,
+                name="Powersensor liveness sweep",
+                cancel_on_shutdown=True,
+            )
+
+    def is_alive(self, mac: str) -> bool:
+        """Check whether a device has been heard from recently."""
+        return mac in self._last_seen
+
+    @callback
+    def subscribe(
+        self, mac: str, on_unavailable: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Register a callback for when a device stops reporting.
+
+        Returns a callable which removes the registration again.
+        """
+        self._listeners.setdefault(mac, []).append(on_unavailable)
+
+        @callback
+        def unsubscribe() -> None:
+            listeners = self._listeners.get(mac, [])
+            if on_unavailable in listeners:
+                listeners.remove(on_unavailable)
+            if not listeners:
+                self._listeners.pop(mac, None)
+
+        return unsubscribe
+
+    @callback
+    def _async_sweep(self, _now=None) -> None:
+        """Expire all devices which have been silent for too long."""
+        deadline = monotonic() - self._timeout
+        last_seen = self._last_seen
+        expired = []
+        while last_seen:
+            mac, seen = next(iter(last_seen.items()))
+            if seen > deadline:
+                break
+            last_seen.popitem(last=False)
+            expired.append(mac)
+
+        for mac in expired:
+            _LOGGER.debug("No messages from %s within timeout, marking unavailable", mac)
+            for on_unavailable in list(self._listeners.get(mac, ())):
+                on_unavailable()
+
+        if not last_seen:
+            self.stop()
+
+    @callback
+    def stop(self) -> None:
+        """Stop the periodic sweep."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+
+
+@callback
+def async_get_liveness_tracker(hass: HomeAssistant) -> PowersensorLivenessTracker:
+    """Return the liveness tracker for this Home Assistant instance."""
+    tracker: PowersensorLivenessTracker | None = hass.data.get(DATA_LIVENESS)
+    if tracker is None:
+        tracker = hass.data[DATA_LIVENESS] = PowersensorLivenessTracker(hass)
+    return tracker
@@ -0,0 +1,76 @@
+"""Latest-value mailboxes between the plug connections and message handling.
+
+Handling a message involves the virtual household and cancelling pending plug
+removals, and used to be awaited straight from the PlugApi callback. A slow
+consumer thus held up the plug's whole connection, and messages piled up in
+its tasks. Instead, incoming messages are now only posted to a mailbox per
+device and event, which holds just the latest message. Once per loop
+iteration, a single drain hands everything posted since to the handler.
+
+Under loop lag this keeps memory bounded by the number of devices and events,
+and the freshest value is always the one handled. Superseded messages are
+counted, so lag shows up in the metrics rather than as a growing backlog.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .PowersensorMetrics import async_get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+MessageHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class PowersensorMailbox:
+    """The latest message by device and event, waiting to be handled."""
+
+    def __init__(self, hass: HomeAssistant, handler: MessageHandler) -> None:
+        """Constructor for the mailbox, draining into `handler`."""
+        self._hass = hass
+        self._handler = handler
+        self._metrics = async_get_metrics(hass)
+        self._pending: dict[tuple[str, str], dict] = {}
+        self._drain: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        """Return the number of messages waiting to be handled."""
+        return len(self._pending)
+
+    @callback
+    def post(self, mac: str, event: str, message: dict) -> None:
+        """Post a message, replacing any not yet handled one of the same kind."""
+        key = (mac, event)
+        if key in self._pending:
+            self._metrics.count("messages_superseded")
+            # Move to the end, so messages are handled in order of arrival
+            del self._pending[key]
+        self._pending[key] = message
+        if self._drain is None:
+            # Not started eagerly, so everything posted during this loop
+            # iteration is handled together
+            self._drain = self._hass.async_create_background_task(
+                self._async_drain(), "Powersensor mailbox drain", eager_start=False
+            )
+
+    async def _async_drain(self) -> None:
+        try:
+            while self._pending:
+                pending, self._pending = self._pending, {}
+                for (mac, event), message in pending.items():
+                    try:
+                        await self._handler(event, message)
+                    except Exception:
+                        _LOGGER.exception("Error handling %s from %s", event, mac)
+        finally:
+            self._drain = None
+
+    async def async_stop(self) -> None:
+        """Drop all waiting messages, and stop handling."""
+        self._pending.clear()
+        if self._drain is not None:
+            self._drain.cancel()
+            await asyncio.gather(self._drain, return_exceptions=True)
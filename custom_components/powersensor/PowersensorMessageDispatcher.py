@@ -6,7 +6,10 @@ The classes and utilities here mediate Powersensor PlugApi messages and updates/
 import asyncio
 from contextlib import suppress
 import datetime
+from collections.abc import Callable
+from functools import partial
 import logging
+from time import perf_counter
 from typing import Any
 
 from powersensor_local import PlugApi, VirtualHousehold # type: ignore[import-untyped]
@@ -18,14 +21,35 @@ from homeassistant.helpers.dispatcher import (
     async_dispatcher_send,
 )
 
-from .AsyncSet import AsyncSet
+from .PlugConnectionManager import PlugConnectionManager
+from .PlugFlapDetector import PlugFlapDetector
+from .PlugQueue import PlugQueue, PlugState
+from .PlugRemovalScheduler import PlugRemovalScheduler
+from .PowersensorDeviceRouter import async_get_router
+from .PowersensorEndpointCache import PowersensorEndpointCache
+from .PowersensorLivenessTracker import async_get_liveness_tracker
+from .PowersensorMailbox import PowersensorMailbox
+from .PowersensorMessageRecorder import PowersensorMessageRecorder
+from .PowersensorMessageTrace import PowersensorMessageTrace
+from .PowersensorMetrics import async_get_metrics
+from .PowersensorRoleRegistry import PowersensorRoleRegistry
+from .PowersensorSharedUdpTransport import (
+    PowersensorSharedUdpTransport,
+    SharedUdpPlugApi,
+)
 from .const import (
     # Used config entry fields
-    CFG_ROLES,
+    # Used defaults
+    DEFAULT_CONNECT_CONCURRENCY,
+    DEFAULT_REMOVAL_DEBOUNCE,
+    REMOVAL_DEBOUNCE_MAX,
+    REMOVAL_DEBOUNCE_MIN,
+    # Used plug events
+    BASE_PLUG_EVENTS,
+    PLUG_EVENTS,
     # Used signals
     CREATE_PLUG_SIGNAL,
     CREATE_SENSOR_SIGNAL,
-    DATA_UPDATE_SIGNAL_FMT_MAC_EVENT,
     PLUG_ADDED_TO_HA_SIGNAL,
     ROLE_UPDATE_SIGNAL,
     SENSOR_ADDED_TO_HA_SIGNAL,
@@ -56,7 +80,17 @@ class PowersensorMessageDispatcher:
         hass: HomeAssistant,
         entry: ConfigEntry,
         vhh: VirtualHousehold,
-        debounce_timeout: float = 60,
+        debounce_timeout: float = DEFAULT_REMOVAL_DEBOUNCE,
+        debounce_bounds: tuple[float, float] = (
+            REMOVAL_DEBOUNCE_MIN,
+            REMOVAL_DEBOUNCE_MAX,
+        ),
+        connect_concurrency: int = DEFAULT_CONNECT_CONCURRENCY,
+        trace_depth: int = 0,
+        recorder: PowersensorMessageRecorder | None = None,
+        endpoints: PowersensorEndpointCache | None = None,
+        roles: PowersensorRoleRegistry | None = None,
+        shared_transport: PowersensorSharedUdpTransport | None = None,
     ) -> None:
         """Constructor for message dispatcher.
 
@@ -65,13 +99,28 @@ class PowersensorMessageDispatcher:
         self._hass = hass
         self._entry = entry
         self._vhh = vhh
+        self._router = async_get_router(hass)
+        self._liveness = async_get_liveness_tracker(hass)
+        self._metrics = async_get_metrics(hass)
         self.plugs: dict[str, PlugApi] = {}
+        self.connections = PlugConnectionManager(hass, connect_concurrency)
         self._known_plugs: set[str] = set()
         self._known_plug_names: dict[str, str] = {}
         self.sensors: dict[str, str] = {}
+        self.relays: dict[str, str] = {}
+        self.roles = roles if roles is not None else PowersensorRoleRegistry(hass, entry)
+        self._trace = (
+            PowersensorMessageTrace(trace_depth) if trace_depth > 0 else None
+        )
+        self._recorder = recorder
+        self._endpoints = endpoints
+        self._shared_transport = shared_transport
+        self._mailbox = PowersensorMailbox(hass, self.handle_message)
         self.on_start_sensor_queue: dict[str, Any] = {}
-        self._pending_removals: dict[str, asyncio.Task] = {}
-        self._debounce_seconds = debounce_timeout
+        self._pending_removals = PlugRemovalScheduler(hass, self._remove_plug)
+        self._unsub_silence: dict[str, Callable[[], None]] = {}
+        self._flaps = PlugFlapDetector(debounce_timeout, *debounce_bounds)
+        self._gone_quiet: set[str] = set()
         self.has_solar = False
         self._solar_request_limit = datetime.timedelta(seconds=10)
         self._unsubscribe_from_signals = [
@@ -98,20 +147,34 @@ class PowersensorMessageDispatcher:
 
         self._monitor_add_plug_queue = None
         self._stop_task = False
-        self._plug_added_queue: AsyncSet = AsyncSet()
+        self._plug_queue = PlugQueue()
+        self._plug_events = self._wanted_plug_events()
         self._safe_to_process_plug_queue = False
+        self._unsubscribe_from_signals.extend(
+            [
+                self._router.subscribe_routed_events(self._update_plug_events),
+                self._metrics.add_gauge("plug_queue", self._plug_queue.__len__),
+                self._metrics.add_gauge(
+                    "connect_queue", lambda: self.connections.queued
+                ),
+            ]
+        )
 
     async def enqueue_plug_for_adding(self, network_info: dict):
         """On receiving zeroconf data this info is added to processing buffer to await creation of entity and api."""
         _LOGGER.debug("Adding to plug processing queue: %s", network_info)
-        await self._plug_added_queue.add(
+        if not self._plug_queue.put(
             (
                 network_info["mac"],
                 network_info["host"],
                 network_info["port"],
                 network_info["name"],
             )
-        )
+        ):
+            _LOGGER.debug(
+                "Plug %s is already being created, not queueing again",
+                network_info["mac"],
+            )
 
     async def process_plug_queue(self):
         """Start the background task if not already running."""
@@ -131,61 +194,58 @@ class PowersensorMessageDispatcher:
         )
 
     async def _monitor_plug_queue(self):
-        """The actual background task loop."""
+        """The actual background task, processing plugs as they get queued."""
         try:
-            while not self._stop_task and self._plug_added_queue:
-                queue_snapshot = await self._plug_added_queue.copy()
-                for mac_address, host, port, name in queue_snapshot:
-                    # @todo: maybe better to query the entity registry?
-                    if not self._plug_has_been_seen(mac_address, name):
-                        async_dispatcher_send(
-                            self._hass,
-                            CREATE_PLUG_SIGNAL,
-                            mac_address,
-                            host,
-                            port,
-                            name,
-                        )
-                    elif (
-                        mac_address in self._known_plugs
-                        and mac_address not in self.plugs
-                    ):
-                        _LOGGER.info(
-                            "Plug with mac %s is known, but API is missing."
-                            "Reconnecting without requesting entity creation... ",
-                            mac_address,
-                        )
-                        self._create_api(mac_address, host, port, name)
-                    else:
-                        _LOGGER.debug(
-                            "Plug: %s has already been created as an entity in Home Assistant."
-                            " Skipping and flushing from queue. ",
-                            mac_address,
-                        )
-                        await self._plug_added_queue.remove(
-                            (mac_address, host, port, name)
-                        )
-
-                await asyncio.sleep(5)
-            _LOGGER.debug("Plug queue has been processed!")
+            while not self._stop_task:
+                mac_address, host, port, name = await self._plug_queue.get()
+                try:
+                    self._process_queued_plug(mac_address, host, port, name)
+                    self._metrics.count("plugs_processed")
+                except (
+                    TimeoutError,
+                    OSError,
+                    NotImplementedError,
+                ) as e:  # just trying to add a little crash free safety, if not catch all errors
+                    self._metrics.count("plug_queue_errors")
+                    _LOGGER.error("Error in Plug queue processing task: %s", e)
 
         except asyncio.CancelledError:
             _LOGGER.debug("Plug queue processing cancelled")
             raise
-        except (
-            TimeoutError,
-            OSError,
-            NotImplementedError,
-        ) as e:  # just trying to add a little crash free safety, if not catch all errors
-            _LOGGER.error("Error in Plug queue processing task: %s", e)
         finally:
             self._monitor_add_plug_queue = None
 
+    def _process_queued_plug(self, mac_address, host, port, name):
+        """Request entity creation or reconnect the API for a queued plug."""
+        # @todo: maybe better to query the entity registry?
+        if not self._plug_has_been_seen(mac_address, name):
+            self._plug_queue.set_state(mac_address, PlugState.CREATING)
+            async_dispatcher_send(
+                self._hass,
+                CREATE_PLUG_SIGNAL,
+                mac_address,
+                host,
+                port,
+                name,
+            )
+        elif mac_address in self._known_plugs and mac_address not in self.plugs:
+            _LOGGER.info(
+                "Plug with mac %s is known, but API is missing."
+                "Reconnecting without requesting entity creation... ",
+                mac_address,
+            )
+            self._create_api(mac_address, host, port, name)
+        else:
+            _LOGGER.debug(
+                "Plug: %s has already been created as an entity in Home Assistant."
+                " Skipping and flushing from queue. ",
+                mac_address,
+            )
+
     def _get_role_info(self, message):
         """Retrieve the effective role and persisted role for this message."""
         # Filter in case older version stuck an "unknown" in there
-        persisted_role = _filter_unknown(
-            self._entry.data.get(CFG_ROLES, {}).get(message['mac'], None))
+        persisted_role = _filter_unknown(self.roles.get(message['mac']))
         # The sensor *does* send "unknown", not null/None, so filter it
         role = _filter_unknown(message.get('role', None))
         return role, persisted_role
@@ -201,55 +261,113 @@ class PowersensorMessageDispatcher:
             self._monitor_add_plug_queue = None
 
     async def stop_pending_removal_tasks(self):
-        """Stop the background removal tasks."""
-        # create a temporary copy to avoid concurrency problems
-        task_list = list(self._pending_removals.values())
-        for task in task_list:
-            if task and not task.done():
-                task.cancel()
-                with suppress(asyncio.CancelledError):
-                    await task
-
-                _LOGGER.debug("Background removal task stopped")
-        self._pending_removals = {}
+        """Cancel all pending plug removals."""
+        self._pending_removals.stop()
+        self._gone_quiet.clear()
 
     def _create_api(self, mac_address, ip, port, name):
         _LOGGER.info("Creating API for mac=%s, ip=%s, port=%s", mac_address, ip, port)
-        api = PlugApi(mac=mac_address, ip=ip, port=port)
+        if self._shared_transport is not None:
+            try:
+                api = SharedUdpPlugApi(mac_address, ip, port, self._shared_transport)
+            except TypeError as err:
+                # Said once, as plugs use sockets of their own from then on
+                _LOGGER.warning("Not sharing a socket between plugs: %s", err)
+                self._shared_transport = None
+        if self._shared_transport is None:
+            api = PlugApi(mac=mac_address, ip=ip, port=port)
         self.plugs[mac_address] = api
+        self._plug_queue.set_state(mac_address, PlugState.CONNECTED)
         self._known_plugs.add(mac_address)
         self._known_plug_names[name] = mac_address
-        known_evs = [
-            "average_flow",
-            "average_power",
-            "average_power_components",
-            "battery_level",
-            "radio_signal_quality",
-            "summation_energy",
-            "summation_volume",
-            #'uncalibrated_instant_reading',
-        ]
-
-        for ev in known_evs:
-            api.subscribe(ev, self.handle_message)
+        if self._endpoints is not None:
+            self._endpoints.update(mac_address, ip, port, name)
+        for ev in self._plug_events:
+            api.subscribe(ev, self._post_message)
         api.subscribe("now_relaying_for", self.handle_relaying_for)
-        api.subscribe("exception", _handle_exception)
-        api.connect()
-
-    async def cancel_any_pending_removal(self, mac, source):
-        """Cancel removal of a plug that has been scheduled."""
-        task = self._pending_removals.pop(mac, None)
-        if task:
-            task.cancel()
-            with suppress(asyncio.CancelledError):
-                await task
+        api.subscribe("now_relaying_for", partial(self._record_relay, mac_address))
+        api.subscribe("exception", partial(self._handle_plug_exception, mac_address))
+        if mac_address not in self._unsub_silence:
+            self._unsub_silence[mac_address] = self._liveness.subscribe(
+                mac_address, partial(self._plug_failing, mac_address, "no messages")
+            )
+        self.connections.request_connect(mac_address, api)
+
+    def _wanted_plug_events(self) -> frozenset[str]:
+        return BASE_PLUG_EVENTS | (PLUG_EVENTS & self._router.routed_events())
+
+    @callback
+    def _update_plug_events(self) -> None:
+        """Align the plug subscriptions with the events entities listen to.
+
+        Entities which are disabled are never added, so their events stop
+        being decoded and dispatched altogether.
+        """
+        wanted = self._wanted_plug_events()
+        added = wanted - self._plug_events
+        removed = self._plug_events - wanted
+        if not added and not removed:
+            return
+        _LOGGER.debug("Plug events now %s", sorted(wanted))
+        self._plug_events = wanted
+        for api in self.plugs.values():
+            for ev in added:
+                api.subscribe(ev, self._post_message)
+            for ev in removed:
+                api.unsubscribe(ev, self._post_message)
+
+    async def _handle_plug_exception(self, mac: str, event: str, exc: BaseException):
+        """Log a PlugApi exception, and have the plug's connection re-established."""
+        await _handle_exception(event, exc)
+        self._plug_failing(mac, f"exception: {exc}")
+        self.connections.report_failure(mac, f"exception: {exc}")
+
+    @callback
+    def _plug_failing(self, mac: str, reason: str) -> None:
+        """Note a plug failing, which may hasten its removal if gone from zeroconf.
+
+        A stable plug is removed straight away. One which has been flapping
+        keeps the rest of its debounce, in case it comes back again.
+        """
+        stable = self._flaps.is_stable(mac)
+        self._flaps.record_drop(mac)
+        if mac not in self._pending_removals:
+            return
+        if stable:
+            _LOGGER.debug("Plug %s is gone and failing (%s)", mac, reason)
+            self._pending_removals.cancel(mac)
+            self._remove_plug(mac)
+        else:
+            _LOGGER.debug("Plug %s is gone and failing (%s), waiting", mac, reason)
+            self._gone_quiet.add(mac)
+
+    async def cancel_any_pending_removal(self, mac, source, rediscovered=False):
+        """Cancel removal of a plug that has been scheduled.
+
+        Only a plug which had gone quiet, or reappears in zeroconf, counts as
+        having flapped. One still talking right after its goodbye merely
+        dropped off mDNS.
+        """
+        if self._pending_removals.cancel(mac):
+            if mac in self._gone_quiet or rediscovered:
+                self._gone_quiet.discard(mac)
+                self._flaps.record_flap(mac)
             _LOGGER.debug("Cancelled pending removal for %s by %s. ", mac, source)
 
+    async def _record_relay(self, plug_mac: str, event: str, message: dict):
+        """Remember which plug a device was last relayed through."""
+        if (mac := message.get("mac")) is not None:
+            self.relays[mac] = plug_mac
+
     async def handle_relaying_for(self, event: str, message: dict):
         """Handle a potentially new sensor being reported."""
         mac = message.get("mac")
+        if self._recorder is not None:
+            self._recorder.record(mac or "", event, message)
         device_type = message.get("device_type")
+        self._metrics.count("relays")
         if mac is None or device_type != "sensor":
+            self._metrics.count("relays_ignored")
             _LOGGER.warning(
                 'Ignoring relayed device with MAC "%s" and type %s', mac, device_type
             )
@@ -257,6 +375,7 @@ class PowersensorMessageDispatcher:
 
         role, persisted_role = self._get_role_info(message)
         _LOGGER.debug("Relayed sensor %s with role %s found", mac, role)
+        self.roles.add_sensor(mac)
 
         if mac not in self.sensors:
             _LOGGER.debug("Reporting new sensor %s with role %s", mac, role)
@@ -269,13 +388,25 @@ class PowersensorMessageDispatcher:
             _LOGGER.debug("Restoring role for %s from %s to %s", mac, role, persisted_role)
             async_dispatcher_send(self._hass, ROLE_UPDATE_SIGNAL, mac, persisted_role)
 
+    async def _post_message(self, event: str, message: dict):
+        """Callback for messages from PlugApi, which are handled in batches.
+
+        Only the latest message of each device and event is kept until then.
+        """
+        self._mailbox.post(message["mac"], event, message)
+
     async def handle_message(self, event: str, message: dict):
         """Callback for handling messages from PlugApi.
 
         This includes but is not limited to: updating sensor data, device roles, canceling removal if data is still
         flowing from a device but zeroconf scheduled removal and signaling for creation of new Homeassistant entities.
         """
+        started = perf_counter()
         mac = message["mac"]
+        if self._recorder is not None:
+            self._recorder.record(mac, event, message)
+        if self._trace is not None:
+            self._trace.record(mac, event, message)
         role, persisted_role = self._get_role_info(message)
 
         # Apply persisted role information if necessary
@@ -288,6 +419,10 @@ class PowersensorMessageDispatcher:
             async_dispatcher_send(self._hass, ROLE_UPDATE_SIGNAL, mac, role)
 
         await self.cancel_any_pending_removal(mac, "new message received from plug")
+        self._liveness.touch(mac)
+        self.connections.message_received(mac)
+        if self._endpoints is not None:
+            self._endpoints.touch(mac)
 
         # Feed the household calculations
         if event == "average_power":
@@ -295,26 +430,77 @@ class PowersensorMessageDispatcher:
         elif event == "summation_energy":
             await self._vhh.process_summation_event(message)
 
-        async_dispatcher_send(
-            self._hass, DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (mac, event), event, message
+        # Update all the device's entities in one pass, including a synthesised
+        # role type message for the role diagnostic entity
+        self._router.route(mac, (event, message), ("role", {"role": role}))
+
+        self._metrics.message(mac, event)
+        self._metrics.observe("handle_message", perf_counter() - started)
+
+    def as_diagnostics(self) -> dict:
+        """Return the dispatcher's view of all devices, for diagnostics."""
+        return {
+            "plugs": {
+                mac: {"host": str(api.ip_address), "port": api.port}
+                for mac, api in self.plugs.items()
+            },
+            "known_plugs": sorted(self._known_plugs),
+            "known_plug_names": dict(self._known_plug_names),
+            "sensors": dict(self.sensors),
+            "relays": dict(self.relays),
+            "pending_removals": sorted(self._pending_removals),
+            "flaps": {mac: self._flaps.as_diagnostics(mac) for mac in self.plugs},
+            "plug_queue": self._plug_queue.as_diagnostics(),
+            "connections": self.connections.as_diagnostics(),
+            "traces": {}
+            if self._trace is None
+            else {mac: self._trace.as_diagnostics(mac) for mac in self._trace.macs()},
+        }
+
+    def is_known_device(self, mac: str) -> bool:
+        """Check if a mac is that of a plug or sensor known to the dispatcher."""
+        return (
+            mac in self._known_plugs
+            or mac in self.sensors
+            or mac in self.relays
+            or mac in self.roles
         )
 
-        # Synthesise a role type message for the role diagnostic entity
-        async_dispatcher_send(
-            self._hass,
-            DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (mac, "role"),
-            "role",
-            {"role": role},
-        )
+    def device_as_diagnostics(self, mac: str) -> dict:
+        """Return the dispatcher's view of a single device, for diagnostics."""
+        api = self.plugs.get(mac)
+        return {
+            "plug": None
+            if api is None
+            else {"host": str(api.ip_address), "port": api.port},
+            "sensor_role": self.sensors.get(mac),
+            "relayed_by": self.relays.get(mac),
+            "relaying_for": sorted(s for s, p in self.relays.items() if p == mac),
+            "pending_removal": mac in self._pending_removals,
+            "flaps": self._flaps.as_diagnostics(mac),
+            "plug_queue_state": getattr(self._plug_queue.state(mac), "name", None),
+            "connection": self.connections.as_diagnostics()["stats"].get(mac),
+            "trace": [] if self._trace is None else self._trace.as_diagnostics(mac),
+        }
 
     async def disconnect(self):
         """Handle graceful disconnection of PlugApi objects."""
+        await self.connections.stop()
+        await self._mailbox.async_stop()
+        if self._recorder is not None:
+            await self._recorder.async_stop()
+        if self._endpoints is not None:
+            await self._endpoints.async_stop()
+        await self.roles.async_stop()
         for _ in range(len(self.plugs)):
             _, api = self.plugs.popitem()
             await api.disconnect()
         for unsubscribe in self._unsubscribe_from_signals:
             if unsubscribe is not None:
                 unsubscribe()
+        for unsubscribe in self._unsub_silence.values():
+            unsubscribe()
+        self._unsub_silence.clear()
 
         await self.stop_processing_plug_queue()
         await self.stop_pending_removal_tasks()
@@ -327,14 +513,20 @@ class PowersensorMessageDispatcher:
         self, mac_address, host, port, name
     ):
         self._create_api(mac_address, host, port, name)
-        await self._plug_added_queue.remove((mac_address, host, port, name))
 
     async def _plug_added(self, info):
         _LOGGER.debug(" Request to add plug received: %s", info)
         network_info = {}
         mac = info["properties"][b"id"].decode("utf-8")
+        if mac in self.plugs:
+            # e.g. already connected from the endpoint cache, so at most the
+            # address needs correcting
+            await self._plug_updated(info)
+            return
         network_info["mac"] = mac
-        await self.cancel_any_pending_removal(mac, "request to add plug")
+        await self.cancel_any_pending_removal(
+            mac, "request to add plug", rediscovered=True
+        )
         network_info["host"] = info["addresses"][0]
         network_info["port"] = info["port"]
         network_info["name"] = info["name"]
@@ -348,7 +540,9 @@ class PowersensorMessageDispatcher:
     async def _plug_updated(self, info):
         _LOGGER.debug("Request to update plug received: %s", info)
         mac = info["properties"][b"id"].decode("utf-8")
-        await self.cancel_any_pending_removal(mac, "request to update plug")
+        await self.cancel_any_pending_removal(
+            mac, "request to update plug", rediscovered=True
+        )
         host = info["addresses"][0]
         port = info["port"]
         name = info["name"]
@@ -374,19 +568,28 @@ class PowersensorMessageDispatcher:
             await self.process_plug_queue()
 
     async def _schedule_plug_removal(self, name, info):
+        """Decide when to remove a plug which has gone from zeroconf.
+
+        A plug which is still sending messages might only have dropped off
+        mDNS, so it gets the debounce time to prove otherwise. So does one
+        which has gone silent, if it has been flapping. A stable plug which
+        has gone silent is removed right away.
+        """
         _LOGGER.debug("Request to delete plug received: %s", info)
         if name in self._known_plug_names:
             mac = self._known_plug_names[name]
             if mac in self.plugs:
-                if mac in self._pending_removals:
-                    # removal for this service is already pending
-                    return
-
-                _LOGGER.debug("Scheduling removal for %s", name)
-                self._pending_removals[mac] = self._hass.async_create_background_task(
-                    self._delayed_plug_remove(name, mac),
-                    name=f"Removal-Task-For-{name}",
-                )
+                silent = not self._liveness.is_alive(mac)
+                if silent and self._flaps.is_stable(mac):
+                    _LOGGER.debug("Plug %s is gone and silent, removing", name)
+                    self._pending_removals.cancel(mac)
+                    self._remove_plug(mac)
+                elif mac not in self._pending_removals:
+                    if silent:
+                        self._gone_quiet.add(mac)
+                    debounce = self._flaps.debounce(mac)
+                    _LOGGER.debug("Scheduling removal for %s in %.0f s", name, debounce)
+                    self._pending_removals.schedule(mac, debounce)
         else:
             _LOGGER.warning(
                 "Received request to delete api for gateway with name [%s], but this name"
@@ -394,25 +597,20 @@ class PowersensorMessageDispatcher:
                 name,
             )
 
-    async def _delayed_plug_remove(self, name, mac):
-        """Actually process the removal after delay."""
-        try:
-            await asyncio.sleep(self._debounce_seconds)
-            _LOGGER.debug(
-                "Request to remove plug %s still pending after timeout. Processing remove request... ",
-                mac,
-            )
-            await self.plugs[mac].disconnect()
-            del self.plugs[mac]
+    @callback
+    def _remove_plug(self, mac: str) -> None:
+        """Tear down a plug whose removal is due."""
+        self._gone_quiet.discard(mac)
+        api = self.plugs.pop(mac, None)
+        if api is None:
+            return
+        self.connections.cancel(mac)
+        if (unsub := self._unsub_silence.pop(mac, None)) is not None:
+            unsub()
+        for name in [n for n, m in self._known_plug_names.items() if m == mac]:
             del self._known_plug_names[name]
-            _LOGGER.info("API for plug %s disconnected and removed. ", mac)
-        except asyncio.CancelledError:
-            # Task was canceled because service came back
-            _LOGGER.debug(
-                "Request to remove plug %s was cancelled by request to update, add plug or new message. ",
-                mac,
-            )
-            raise
-        finally:
-            # Either way were done with this task
-            self._pending_removals.pop(mac, None)
+        self._plug_queue.forget(mac)
+        self._hass.async_create_background_task(
+            api.disconnect(), name=f"Powersensor disconnect {mac}"
+        )
+        _LOGGER.info("API for plug %s disconnected and removed. ", mac)
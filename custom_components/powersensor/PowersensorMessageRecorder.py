@@ -0,0 +1,196 @@
+"""Capture of plug message streams to disk, and replay of such captures.
+
+A capture is an append-only sequence of length-prefixed records:
+
+    <u32 record length> <f64 timestamp> <u8 len> mac <u8 len> event <payload>
+
+with all integers little endian, and the payload being the message as compact
+JSON. A truncated final record, such as after a crash, is ignored on reading.
+
+On the event loop, recording a message only appends a shallow copy of it to a
+buffer. Encoding and writing happens in the executor, once a second, so the
+message path is not slowed down by disk I/O. Captures are rotated once they
+grow past a size limit, keeping a number of older files around.
+"""
+
+import asyncio
+from collections.abc import Iterator
+import json
+import logging
+import os
+import struct
+from time import monotonic, time
+from typing import NamedTuple, Protocol
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DEFAULT_CAPTURE_BACKUPS, DEFAULT_CAPTURE_MAX_BYTES
+
+_LOGGER = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1
+RELAYING_FOR_EVENT = "now_relaying_for"
+
+_LENGTH = struct.Struct("<I")
+_TIMESTAMP = struct.Struct("<d")
+
+
+class CapturedMessage(NamedTuple):
+    """A single message read back from a capture."""
+
+    timestamp: float
+    mac: str
+    event: str
+    message: dict
+
+
+def encode_record(timestamp: float, mac: str, event: str, message: dict) -> bytes:
+    """Encode a single capture record, including its length prefix."""
+    mac_bytes = mac.encode()
+    event_bytes = event.encode()
+    body = b"".join(
+        (
+            _TIMESTAMP.pack(timestamp),
+            bytes((len(mac_bytes),)),
+            mac_bytes,
+            bytes((len(event_bytes),)),
+            event_bytes,
+            json.dumps(message, separators=(",", ":"), default=str).encode(),
+        )
+    )
+    return _LENGTH.pack(len(body)) + body
+
+
+def read_capture(path: str) -> Iterator[CapturedMessage]:
+    """Read the messages from a capture file, in order."""
+    with open(path, "rb") as capture:
+        data = capture.read()
+    offset = 0
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            _LOGGER.warning("Ignoring truncated record at the end of %s", path)
+            return
+        body = memoryview(data)[offset : offset + length]
+        offset += length
+        (timestamp,) = _TIMESTAMP.unpack_from(body)
+        pos = _TIMESTAMP.size
+        mac = bytes(body[pos + 1 : pos + 1 + body[pos]]).decode()
+        pos += 1 + body[pos]
+        event = bytes(body[pos + 1 : pos + 1 + body[pos]]).decode()
+        pos += 1 + body[pos]
+        yield CapturedMessage(timestamp, mac, event, json.loads(bytes(body[pos:])))
+
+
+class ReplayTarget(Protocol):
+    """What captures are replayed into, normally the message dispatcher."""
+
+    async def handle_message(self, event: str, message: dict):
+        """Handle a message from a plug."""
+
+    async def handle_relaying_for(self, event: str, message: dict):
+        """Handle a potentially new sensor being reported."""
+
+
+class PowersensorMessageRecorder:
+    """Records messages passing through the dispatcher to a capture file."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        max_bytes: int = DEFAULT_CAPTURE_MAX_BYTES,
+        backups: int = DEFAULT_CAPTURE_BACKUPS,
+    ) -> None:
+        """Constructor for the recorder, appending to the capture at `path`."""
+        self._hass = hass
+        self.path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._buffer: list[tuple[float, str, str, dict]] = []
+        self._lock = asyncio.Lock()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def record(self, mac: str, event: str, message: dict) -> None:
+        """Buffer a message for writing."""
+        # Copied, as the dispatcher fills in the role as it goes
+        self._buffer.append((time(), mac, event, dict(message)))
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass,
+                FLUSH_INTERVAL,
+                HassJob(self._async_scheduled_flush, cancel_on_shutdown=True),
+            )
+
+    async def _async_scheduled_flush(self, _now) -> None:
+        self._unsub_flush = None
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Write out all buffered messages."""
+        async with self._lock:
+            records, self._buffer = self._buffer, []
+            if records:
+                await self._hass.async_add_executor_job(self._write, records)
+
+    async def async_stop(self) -> None:
+        """Stop recording, writing out anything still buffered."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self.async_flush()
+
+    def _write(self, records: list[tuple[float, str, str, dict]]) -> None:
+        """Encode and append records to the capture. Runs in the executor."""
+        data = b"".join(encode_record(*record) for record in records)
+        try:
+            if os.path.exists(self.path) and (
+                os.path.getsize(self.path) + len(data) > self._max_bytes
+            ):
+                self._rotate()
+            with open(self.path, "ab") as capture:
+                capture.write(data)
+        except OSError as err:
+            _LOGGER.error("Unable to write message capture %s: %s", self.path, err)
+
+    def _rotate(self) -> None:
+        """Shift capture.N to capture.N+1, dropping the oldest."""
+        for n in range(self._backups - 1, 0, -1):
+            source = f"{self.path}.{n}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{n + 1}")
+        if self._backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+async def async_replay(
+    dispatcher: ReplayTarget,
+    messages: Iterator[CapturedMessage],
+    speed: float | None = 1.0,
+) -> int:
+    """Feed captured messages back through a dispatcher.
+
+    Messages are replayed with their original spacing divided by `speed`, or
+    as fast as possible if `speed` is None. Returns the number replayed.
+    """
+    replayed = 0
+    started = monotonic()
+    first: float | None = None
+    for captured in messages:
+        if speed is not None:
+            if first is None:
+                first = captured.timestamp
+            delay = (captured.timestamp - first) / speed - (monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if captured.event == RELAYING_FOR_EVENT:
+            await dispatcher.handle_relaying_for(captured.event, captured.message)
+        else:
+            await dispatcher.handle_message(captured.event, captured.message)
+        replayed += 1
+    return replayed
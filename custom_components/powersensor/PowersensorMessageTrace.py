@@ -0,0 +1,70 @@
+"""Per-device traces of the most recent raw messages, for diagnostics.
+
+Tracing is opt-in. When disabled, the dispatcher holds no trace at all and the
+message path only pays for a single `is None` check. When enabled, each device
+gets a fixed-size ring buffer, allocated once when the device is first heard
+from, so recording a message never grows or shifts anything. Messages are
+copied as they are recorded, as the dispatcher fills in the role as it goes.
+"""
+
+from time import time
+from typing import Any
+
+TraceEntry = tuple[float, str, dict]  # wall clock time, event, message
+
+
+class TraceRingBuffer:
+    """Fixed-size buffer retaining the last `depth` entries."""
+
+    def __init__(self, depth: int) -> None:
+        """Constructor for the buffer. All slots are allocated up front."""
+        self._slots: list[TraceEntry | None] = [None] * depth
+        self._next = 0
+        self._full = False
+
+    def append(self, entry: TraceEntry) -> None:
+        """Store an entry, overwriting the oldest one if full."""
+        self._slots[self._next] = entry
+        self._next += 1
+        if self._next == len(self._slots):
+            self._next = 0
+            self._full = True
+
+    def entries(self) -> list[TraceEntry]:
+        """Return the retained entries, oldest first."""
+        slots = self._slots
+        if self._full:
+            ordered = slots[self._next :] + slots[: self._next]
+        else:
+            ordered = slots[: self._next]
+        return [entry for entry in ordered if entry is not None]
+
+
+class PowersensorMessageTrace:
+    """Ring buffers of recent messages, keyed by device mac."""
+
+    def __init__(self, depth: int) -> None:
+        """Constructor for the trace, retaining `depth` messages per device."""
+        self._depth = depth
+        self._buffers: dict[str, TraceRingBuffer] = {}
+
+    def record(self, mac: str, event: str, message: dict) -> None:
+        """Record a message from a device."""
+        buffer = self._buffers.get(mac)
+        if buffer is None:
+            buffer = self._buffers[mac] = TraceRingBuffer(self._depth)
+        buffer.append((time(), event, dict(message)))
+
+    def as_diagnostics(self, mac: str) -> list[dict[str, Any]]:
+        """Return the traced messages for a device, oldest first."""
+        buffer = self._buffers.get(mac)
+        if buffer is None:
+            return []
+        return [
+            {"time": when, "event": event, "message": message}
+            for when, event, message in buffer.entries()
+        ]
+
+    def macs(self) -> list[str]:
+        """Return the devices for which messages have been traced."""
+        return list(self._buffers)
@@ -0,0 +1,165 @@
+"""Lightweight metrics for the Powersensor message ingestion pipeline.
+
+Everything here is only ever touched from the event loop, so the counters
+and histograms are plain Python integers and lists without any locking. The
+hot path only increments the current window; readers roll the window lazily,
+and always report on the most recently completed one. This keeps recording a
+message down to a couple of dictionary updates.
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Callable
+import logging
+from time import monotonic
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_METRICS
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 30
+
+
+class LatencyHistogram:
+    """Log-scale histogram of durations, in seconds."""
+
+    # 10 µs up to ~5 s in powers of two, plus an overflow bucket
+    BOUNDS = tuple(1e-5 * 2**n for n in range(20))
+
+    def __init__(self) -> None:
+        """Constructor for the histogram. Starts off empty."""
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record a single duration."""
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float | None:
+        """Return an upper bound for the given percentile, or None if empty."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, bucket in zip(self.BOUNDS, self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsWindow:
+    """Metrics gathered over a single window of time."""
+
+    def __init__(self, started: float) -> None:
+        """Constructor for the window, starting at the given monotonic time."""
+        self.started = started
+        self.messages: Counter[tuple[str, str]] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.latencies: defaultdict[str, LatencyHistogram] = defaultdict(
+            LatencyHistogram
+        )
+
+
+class PowersensorMetrics:
+    """Registry of counters, latency histograms and gauges."""
+
+    def __init__(self, window: float = DEFAULT_WINDOW) -> None:
+        """Constructor for the metrics registry.
+
+        Rates and latencies are reported over windows of `window` seconds.
+        """
+        self._window = window
+        self._current = MetricsWindow(monotonic())
+        self._last: MetricsWindow | None = None
+        self._last_duration = 0.0
+        self.totals: Counter[str] = Counter()
+        self._gauges: dict[str, Callable[[], int]] = {}
+
+    @callback
+    def message(self, mac: str, event: str) -> None:
+        """Record a message from a device."""
+        self._current.messages[(mac, event)] += 1
+
+    @callback
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a named counter."""
+        self._current.counters[name] += n
+        self.totals[name] += n
+
+    @callback
+    def observe(self, name: str, seconds: float) -> None:
+        """Record how long a named operation took."""
+        self._current.latencies[name].observe(seconds)
+
+    @callback
+    def add_gauge(self, name: str, read: Callable[[], int]) -> Callable[[], None]:
+        """Register a callable reporting a current level, such as a queue depth.
+
+        Returns a callable which removes the gauge again.
+        """
+        self._gauges[name] = read
+
+        @callback
+        def remove() -> None:
+            if self._gauges.get(name) is read:
+                del self._gauges[name]
+
+        return remove
+
+    def gauge(self, name: str) -> int | None:
+        """Read a gauge, or None if not registered."""
+        read = self._gauges.get(name)
+        return None if read is None else read()
+
+    def _completed_window(self) -> tuple[MetricsWindow, float]:
+        """Return the last completed window and its length, rolling if due.
+
+        Until the first window completes, the partial current one is used.
+        """
+        now = monotonic()
+        elapsed = now - self._current.started
+        if elapsed >= self._window:
+            self._last, self._last_duration = self._current, elapsed
+            self._current = MetricsWindow(now)
+        if self._last is None:
+            return self._current, elapsed
+        return self._last, self._last_duration
+
+    def message_rate(self) -> float:
+        """Return the overall rate of messages per second."""
+        window, duration = self._completed_window()
+        if duration <= 0:
+            return 0.0
+        return sum(window.messages.values()) / duration
+
+    def message_rates(self) -> dict[str, dict[str, float]]:
+        """Return the rate of messages per second, by device and event."""
+        window, duration = self._completed_window()
+        rates: dict[str, dict[str, float]] = {}
+        if duration > 0:
+            for (mac, event), count in window.messages.items():
+                rates.setdefault(mac, {})[event] = round(count / duration, 3)
+        return rates
+
+    def latency(self, name: str) -> LatencyHistogram:
+        """Return the latency histogram for a named operation."""
+        window, _ = self._completed_window()
+        return window.latencies.get(name) or LatencyHistogram()
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant) -> PowersensorMetrics:
+    """Return the metrics registry for this Home Assistant instance."""
+    metrics: PowersensorMetrics | None = hass.data.get(DATA_METRICS)
+    if metrics is None:
+        metrics = hass.data[DATA_METRICS] = PowersensorMetrics()
+    return metrics
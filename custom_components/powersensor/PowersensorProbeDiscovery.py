@@ -0,0 +1,225 @@
+"""Active discovery of plugs, for networks where mDNS doesn't get through.
+
+Where multicast is blocked, e.g. between VLANs, zeroconf never finds any plugs.
+Instead, the hosts and address ranges configured in the options are probed
+directly. Plugs answer a "discover()" datagram on their API port with their
+address and mac, just like the legacy broadcast discovery, so each answer is
+handed to the dispatcher as if zeroconf had found the plug.
+
+Probing goes out over a single socket, with a bounded number of probes in
+flight at a time. The range is rescanned regularly, to notice new plugs and
+changed addresses. Each scan which finds nothing new doubles the time until
+the next one, so a stable fleet is left alone most of the time.
+"""
+
+import asyncio
+from collections.abc import Iterator
+from ipaddress import IPv4Network, ip_network
+import json
+import logging
+import re
+import socket
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    DEFAULT_PORT,
+    PROBE_CONCURRENCY,
+    PROBE_INTERVAL_MAX,
+    PROBE_INTERVAL_MIN,
+    PROBE_MAX_ADDRESSES,
+    PROBE_TIMEOUT,
+    ZEROCONF_ADD_PLUG_SIGNAL,
+    ZEROCONF_UPDATE_PLUG_SIGNAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE = b"discover()\n"
+PROBE_NAME_FORMAT = "Powersensor-gateway-%s-probe"
+
+
+def parse_probe_targets(text: str) -> list[IPv4Network]:
+    """Parse a list of IPv4 addresses and CIDR ranges, separated by commas or spaces.
+
+    Raises ValueError if any entry is invalid, or the ranges are too large.
+    """
+    networks = []
+    for target in re.split(r"[\s,]+", text.strip()):
+        if not target:
+            continue
+        network = ip_network(target, strict=False)
+        if not isinstance(network, IPv4Network):
+            raise ValueError(f"{target} is not an IPv4 address or range")
+        networks.append(network)
+    if sum(network.num_addresses for network in networks) > PROBE_MAX_ADDRESSES:
+        raise ValueError(f"More than {PROBE_MAX_ADDRESSES} addresses to probe")
+    return networks
+
+
+def _addresses(networks: list[IPv4Network]) -> Iterator[str]:
+    seen = set()
+    for network in networks:
+        for address in network.hosts():
+            if address not in seen:
+                seen.add(address)
+                yield str(address)
+
+
+class PowersensorProbeDiscovery(asyncio.DatagramProtocol):
+    """Finds plugs by probing configured hosts and ranges."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        networks: list[IPv4Network],
+        port: int = DEFAULT_PORT,
+        concurrency: int = PROBE_CONCURRENCY,
+        timeout: float = PROBE_TIMEOUT,
+        interval_min: float = PROBE_INTERVAL_MIN,
+        interval_max: float = PROBE_INTERVAL_MAX,
+    ) -> None:
+        """Constructor for the probe discovery of the given networks.
+
+        Up to `concurrency` probes are in flight at a time, each waiting up to
+        `timeout` seconds for an answer.
+        """
+        self._hass = hass
+        self._networks = networks
+        self._port = port
+        self._concurrency = max(1, concurrency)
+        self._timeout = timeout
+        self._interval_min = interval_min
+        self._interval_max = interval_max
+        self.interval = interval_min
+        self.plugs: dict[str, str] = {}
+        self._found: dict[str, str] = {}
+        self._waiting: dict[str, asyncio.Future] = {}
+        self._scan: asyncio.Task | None = None
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    @callback
+    def start(self) -> None:
+        """Start scanning, straight away and then periodically."""
+        self._async_start_scan()
+
+    @callback
+    def _async_start_scan(self, _now=None) -> None:
+        self._unsub_timer = None
+        self._scan = self._hass.async_create_background_task(
+            self._async_scan_and_reschedule(), "Powersensor probe scan"
+        )
+
+    async def _async_scan_and_reschedule(self) -> None:
+        try:
+            found = await self.async_scan()
+        except OSError as err:
+            _LOGGER.error("Unable to probe for plugs: %s", err)
+            found = self.plugs
+        changed = False
+        for mac, ip in found.items():
+            known = self.plugs.get(mac)
+            if known != ip:
+                changed = True
+                self._dispatch(
+                    ZEROCONF_ADD_PLUG_SIGNAL
+                    if known is None
+                    else ZEROCONF_UPDATE_PLUG_SIGNAL,
+                    mac,
+                    ip,
+                )
+        # Plugs missing from a single scan are kept, rather than removed
+        self.plugs = {**self.plugs, **found}
+        self.interval = (
+            self._interval_min
+            if changed
+            else min(self._interval_max, self.interval * 2)
+        )
+        _LOGGER.debug(
+            "Probe found %d plugs, next scan in %.0f s", len(found), self.interval
+        )
+        self._unsub_timer = async_call_later(
+            self._hass,
+            self.interval,
+            HassJob(self._async_start_scan, cancel_on_shutdown=True),
+        )
+
+    async def async_scan(self) -> dict[str, str]:
+        """Probe all configured addresses once, returning the ip of each plug by mac."""
+        self._found = {}
+        transport, _ = await self._hass.loop.create_datagram_endpoint(
+            lambda: self, local_addr=("0.0.0.0", 0), family=socket.AF_INET
+        )
+        try:
+            addresses = _addresses(self._networks)
+            await asyncio.gather(
+                *(
+                    self._async_probe(transport, addresses)
+                    for _ in range(self._concurrency)
+                )
+            )
+        finally:
+            transport.close()
+        return self._found
+
+    async def _async_probe(
+        self, transport: asyncio.DatagramTransport, addresses: Iterator[str]
+    ) -> None:
+        """Probe addresses one at a time, until none are left."""
+        for address in addresses:
+            answered = self._hass.loop.create_future()
+            self._waiting[address] = answered
+            transport.sendto(PROBE, (address, self._port))
+            try:
+                await asyncio.wait_for(answered, self._timeout)
+            except TimeoutError:
+                pass
+            finally:
+                del self._waiting[address]
+
+    @callback
+    def _dispatch(self, signal: str, mac: str, ip: str) -> None:
+        _LOGGER.info("Probe found plug %s at %s", mac, ip)
+        async_dispatcher_send(
+            self._hass,
+            signal,
+            {
+                "type": "probe",
+                "name": PROBE_NAME_FORMAT % mac,
+                "addresses": [ip],
+                "port": self._port,
+                "server": None,
+                "properties": {b"id": mac.encode()},
+            },
+        )
+
+    async def async_stop(self) -> None:
+        """Stop scanning."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._scan is not None:
+            self._scan.cancel()
+            await asyncio.gather(self._scan, return_exceptions=True)
+            self._scan = None
+
+    # DatagramProtocol support below
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Note the plugs answering a probe."""
+        for line in data.splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and isinstance(message.get("mac"), str):
+                self._found[message["mac"]] = addr[0]
+        answered = self._waiting.get(addr[0])
+        if answered is not None and not answered.done():
+            answered.set_result(None)
+
+    def error_received(self, exc: Exception) -> None:
+        """Ignore errors such as unreachable hosts, which are simply not plugs."""
+        _LOGGER.debug("Probe socket error: %s", exc)
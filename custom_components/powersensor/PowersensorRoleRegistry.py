@@ -0,0 +1,174 @@
+"""Persisted registry of the role of each Powersensor device.
+
+Roles used to be kept in the config entry, which meant every role change
+rewrote the whole config entries file. They now live in a store of their own.
+Changes are applied in memory straight away, and written out together a little
+later, so the burst of role reports at startup results in a single write. An
+update which doesn't change anything doesn't cause a write at all.
+
+Roles found in the config entry by older versions are taken over on first load.
+
+Alongside the role of each device, the devices having each role are indexed,
+so checks like "is there a solar sensor" don't need to look at every device.
+Listeners are told about every change, so they needn't poll.
+
+Plugs have roles too, so the devices known to be sensors are remembered
+separately, for recreating their entities on startup.
+"""
+
+from collections.abc import Callable, ItemsView
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .PowersensorStoreWriter import PowersensorStoreWriter
+from .const import (
+    CFG_ROLES,
+    DOMAIN,
+    ROLE_STORE_MINOR_VERSION,
+    ROLE_STORE_SAVE_DELAY,
+    ROLE_STORE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _storage_key(entry_id: str) -> str:
+    return f"{DOMAIN}.{entry_id}.roles"
+
+
+class _RoleStore(Store[dict[str, Any]]):
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict
+    ) -> dict[str, Any]:
+        # Version 1.1 only held the roles, of plugs and sensors alike
+        return {"roles": old_data, "sensors": []}
+
+
+class PowersensorRoleRegistry:
+    """The role of each device, by mac address."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Constructor for the role registry of a config entry.
+
+        Until loaded, the roles persisted in the config entry are used.
+        """
+        self._store = _RoleStore(
+            hass,
+            ROLE_STORE_VERSION,
+            _storage_key(entry.entry_id),
+            minor_version=ROLE_STORE_MINOR_VERSION,
+        )
+        self._roles: dict[str, str | None] = {}
+        self._sensors: set[str] = set()
+        self._macs_by_role: dict[str | None, set[str]] = {}
+        self._listeners: list[Callable[[str, str | None, str | None], None]] = []
+        self._writer = PowersensorStoreWriter(
+            hass, self._store, self._data_to_save, ROLE_STORE_SAVE_DELAY
+        )
+        self._index(dict(entry.data.get(CFG_ROLES, {})))
+
+    async def async_load(self) -> None:
+        """Load the persisted roles."""
+        stored = await self._store.async_load()
+        if stored is None:
+            # Take over the roles from the config entry
+            if self._roles:
+                _LOGGER.debug("Moving %d roles out of the config entry", len(self._roles))
+                self._writer.schedule()
+            return
+        self._index(stored["roles"])
+        self._sensors = set(stored["sensors"])
+
+    def _index(self, roles: dict[str, str | None]) -> None:
+        """Replace all roles, rebuilding the index."""
+        self._roles = roles
+        self._macs_by_role = {}
+        for mac, role in roles.items():
+            self._macs_by_role.setdefault(role, set()).add(mac)
+
+    def get(self, mac: str, default: str | None = None) -> str | None:
+        """Return the role of a device."""
+        return self._roles.get(mac, default)
+
+    def items(self) -> ItemsView[str, str | None]:
+        """Return the mac and role of all devices."""
+        return self._roles.items()
+
+    def has_role(self, role: str | None) -> bool:
+        """Check whether any device has the given role."""
+        return role in self._macs_by_role
+
+    def macs_with_role(self, role: str | None) -> frozenset[str]:
+        """Return the devices having the given role."""
+        return frozenset(self._macs_by_role.get(role, ()))
+
+    @property
+    def sensors(self) -> frozenset[str]:
+        """Return the devices known to be sensors."""
+        return frozenset(self._sensors)
+
+    @callback
+    def add_sensor(self, mac: str) -> None:
+        """Record that a device is a sensor."""
+        if mac not in self._sensors:
+            self._sensors.add(mac)
+            self._writer.schedule()
+
+    def __contains__(self, mac) -> bool:
+        """Check if a device has a role recorded, even if that is None."""
+        return mac in self._roles
+
+    @callback
+    def update(self, mac: str, role: str | None) -> bool:
+        """Record the role of a device. Returns whether it changed."""
+        roles = self._roles
+        if mac in roles:
+            old_role = roles[mac]
+            if old_role == role:
+                return False
+            macs = self._macs_by_role[old_role]
+            macs.discard(mac)
+            if not macs:
+                del self._macs_by_role[old_role]
+        else:
+            old_role = None
+        roles[mac] = role
+        self._macs_by_role.setdefault(role, set()).add(mac)
+        self._writer.schedule()
+        for listener in list(self._listeners):
+            listener(mac, old_role, role)
+        return True
+
+    @callback
+    def subscribe(
+        self, listener: Callable[[str, str | None, str | None], None]
+    ) -> Callable[[], None]:
+        """Register a callback for role changes, called with mac, old and new role.
+
+        Returns a callable which removes the registration again.
+        """
+        self._listeners.append(listener)
+
+        @callback
+        def unsubscribe() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
+    async def async_stop(self) -> None:
+        """Write out any pending changes now."""
+        await self._writer.async_flush()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"roles": dict(self._roles), "sensors": sorted(self._sensors)}
+
+
+async def async_remove_role_registry(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the roles of a config entry which is being removed."""
+    await Store(hass, ROLE_STORE_VERSION, _storage_key(entry_id)).async_remove()
@@ -0,0 +1,309 @@
+"""A single UDP socket shared by the connections to all plugs.
+
+By default each plug gets a PlugApi with a UDP socket, reconnect timer and
+inactivity timer of its own. With hundreds of plugs, those dominate the memory
+and file descriptor usage on small hosts. In shared mode a single socket is
+bound for the whole integration instead. Subscriptions are sent from it to each
+plug, and incoming datagrams are handed to the plug they came from.
+
+Rather than timers per plug, a single coarse periodic sweep resubscribes to
+plugs which have not answered, or have gone silent, with the same backoff as
+powersensor_local's PlugListenerUdp. The PlugApi on top, and the connection
+supervision, work unchanged.
+"""
+
+import asyncio
+from collections.abc import Iterator
+from datetime import timedelta
+import json
+import logging
+import socket
+from time import monotonic
+from typing import Any
+
+from powersensor_local import PlugApi  # type: ignore[import-untyped]
+from powersensor_local.async_event_emitter import (  # type: ignore[import-untyped]
+    AsyncEventEmitter,
+)
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DATA_SHARED_UDP
+
+_LOGGER = logging.getLogger(__name__)
+
+SUBSCRIBE = b"subscribe(60)\n"
+UNSUBSCRIBE = b"subscribe(0)\n"
+INACTIVITY_TIMEOUT = 60
+MAX_RETRY_DELAY = 5 * 60
+DEFAULT_TICK = 2
+
+
+def _parse_datagram(data: bytes) -> Iterator[dict]:
+    """Decode the JSON messages in a datagram, skipping malformed lines."""
+    for line in data.splitlines():
+        try:
+            message = json.loads(line)
+        except ValueError:
+            _LOGGER.debug("Ignoring malformed message %r", line)
+            continue
+        if isinstance(message, dict):
+            yield message
+
+
+class SharedUdpPlugListener(AsyncEventEmitter):
+    """The connection to a single plug, over the shared socket.
+
+    Stands in for PlugListenerUdp underneath a PlugApi, emitting a "message"
+    event for each event message received from the plug.
+    """
+
+    def __init__(
+        self, shared: "PowersensorSharedUdpTransport", ip: Any, port: int
+    ) -> None:
+        """Constructor for the listener of the plug at `ip` and `port`."""
+        super().__init__()
+        self._shared = shared
+        self._ip = ip
+        self._port = port
+        self.addr = (str(ip), port)
+        self.deadline = 0.0
+        self._backoff = 0
+
+    @property
+    def ip(self) -> Any:
+        """Return the IP address of the plug."""
+        return self._ip
+
+    @property
+    def port(self) -> int:
+        """Return the UDP port of the plug."""
+        return self._port
+
+    def connect(self) -> None:
+        """Start receiving the event stream of the plug."""
+        self._backoff = 0
+        self._shared.register(self)
+        self.resubscribe(monotonic())
+
+    async def disconnect(self) -> None:
+        """Stop receiving the event stream of the plug."""
+        if self._shared.is_registered(self):
+            self._shared.send(UNSUBSCRIBE, self.addr)
+            self._shared.unregister(self)
+
+    @callback
+    def send_subscribe(self) -> None:
+        """Ask the plug for (more of) its event stream."""
+        self._shared.send(SUBSCRIBE, self.addr)
+
+    @callback
+    def resubscribe(self, now: float) -> None:
+        """Subscribe, backing off further each time the plug doesn't answer."""
+        if self._backoff < 9:
+            self._backoff += 1
+        self.deadline = now + min(MAX_RETRY_DELAY, 2**self._backoff + 2)
+        self.send_subscribe()
+
+    @callback
+    def datagram_received(self, data: bytes, now: float) -> list[dict]:
+        """Handle a datagram from the plug, returning its event messages."""
+        self._backoff = 0
+        self.deadline = now + INACTIVITY_TIMEOUT
+        messages = []
+        for message in _parse_datagram(data):
+            typ = message.get("type")
+            if typ == "subscription":
+                if message.get("subtype") == "warning":
+                    self.send_subscribe()
+            elif typ != "discovery":
+                messages.append(message)
+        return messages
+
+    async def async_emit_messages(self, messages: list[dict]) -> None:
+        """Emit the messages from a datagram, in order."""
+        for message in messages:
+            await self.emit("message", message)
+
+
+class SharedUdpPlugApi(PlugApi):
+    """A PlugApi whose connection goes over the shared socket."""
+
+    def __init__(
+        self, mac: str, ip: Any, port: int, shared: "PowersensorSharedUdpTransport"
+    ) -> None:
+        """Constructor for the api of a plug, using the shared socket.
+
+        Raises TypeError if PlugApi no longer works the way this relies on.
+        """
+        super().__init__(mac=mac, ip=ip, port=port)
+        # PlugApi has no way of passing in a listener, so the (unconnected, so
+        # cheap) default one is swapped out. Should powersensor_local change
+        # how PlugApi wires up its listener, fail loudly rather than connect
+        # and then never hear from the plug.
+        default_listener = getattr(self, "_listener", None)
+        if not isinstance(default_listener, AsyncEventEmitter) or any(
+            not callable(getattr(self, name, None))
+            for name in ("_on_message", "_on_exception")
+        ):
+            raise TypeError("Unsupported PlugApi, unable to use the shared socket")
+        self._listener = SharedUdpPlugListener(shared, ip, port)
+        self._listener.subscribe("message", self._on_message)
+        self._listener.subscribe("exception", self._on_exception)
+
+
+class PowersensorSharedUdpTransport(asyncio.DatagramProtocol):
+    """The socket shared by all plugs, and the demultiplexing of its datagrams."""
+
+    def __init__(self, hass: HomeAssistant, tick: float = DEFAULT_TICK) -> None:
+        """Constructor for the shared transport.
+
+        The socket is only bound while any plug is connected. Resubscribing is
+        checked every `tick` seconds.
+        """
+        self._hass = hass
+        self._tick = timedelta(seconds=tick)
+        self._listeners: dict[tuple[str, int], SharedUdpPlugListener] = {}
+        self._transport: asyncio.DatagramTransport | None = None
+        self._opening: asyncio.Task | None = None
+        self._unsub_tick: CALLBACK_TYPE | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Check whether the socket is currently bound."""
+        return self._transport is not None
+
+    @callback
+    def register(self, listener: SharedUdpPlugListener) -> None:
+        """Start handing datagrams from a plug to its listener.
+
+        Plugs are told apart by address only, so a listener registering for an
+        address which another one holds takes over from it. Datagrams from the
+        address are then only handed to the newest listener, and the previous
+        one no longer unsubscribes the plug when disconnecting.
+        """
+        previous = self._listeners.get(listener.addr)
+        if previous is not None and previous is not listener:
+            _LOGGER.warning(
+                "Plug address %s:%s taken over by another connection",
+                *listener.addr,
+            )
+        self._listeners[listener.addr] = listener
+        if self._unsub_tick is None:
+            self._unsub_tick = async_track_time_interval(
+                self._hass,
+                self._async_sweep,
+                self._tick,
+                name="Powersensor shared socket sweep",
+                cancel_on_shutdown=True,
+            )
+        self._async_open()
+
+    def is_registered(self, listener: SharedUdpPlugListener) -> bool:
+        """Check whether datagrams are being handed to a listener."""
+        return self._listeners.get(listener.addr) is listener
+
+    @callback
+    def unregister(self, listener: SharedUdpPlugListener) -> None:
+        """Stop handing datagrams to a listener.
+
+        The socket is closed once no plug is connected anymore.
+        """
+        if self.is_registered(listener):
+            del self._listeners[listener.addr]
+            if not self._listeners:
+                self._async_close()
+
+    @callback
+    def send(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Send a datagram to a plug, if the socket is bound."""
+        if self._transport is not None:
+            self._transport.sendto(data, addr)
+
+    @callback
+    def _async_open(self) -> None:
+        opening = self._opening
+        if self._transport is None and (opening is None or opening.done()):
+            self._opening = self._hass.async_create_background_task(
+                self._async_bind(), "Powersensor shared socket bind"
+            )
+
+    async def _async_bind(self) -> None:
+        try:
+            await self._hass.loop.create_datagram_endpoint(
+                lambda: self, local_addr=("0.0.0.0", 0), family=socket.AF_INET
+            )
+        except OSError as err:
+            # Retried on the next sweep
+            _LOGGER.error("Unable to bind the shared plug socket: %s", err)
+
+    @callback
+    def _async_close(self) -> None:
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        if self._opening is not None:
+            self._opening.cancel()
+            self._opening = None
+        if self._transport is not None:
+            transport, self._transport = self._transport, None
+            transport.close()
+
+    @callback
+    def _async_sweep(self, _now=None) -> None:
+        """Resubscribe to plugs which haven't answered, or have gone silent."""
+        if self._transport is None:
+            self._async_open()
+            return
+        now = monotonic()
+        for listener in list(self._listeners.values()):
+            if listener.deadline <= now:
+                listener.resubscribe(now)
+
+    # DatagramProtocol support below
+
+    def connection_made(self, transport) -> None:
+        """Subscribe to all plugs once the socket is bound."""
+        if not self._listeners:
+            transport.close()
+            return
+        self._transport = transport
+        _LOGGER.debug(
+            "Shared plug socket bound to %s", transport.get_extra_info("sockname")
+        )
+        for listener in self._listeners.values():
+            listener.send_subscribe()
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Hand a datagram to the listener of the plug it came from."""
+        listener = self._listeners.get((addr[0], addr[1]))
+        if listener is None:
+            return
+        messages = listener.datagram_received(data, monotonic())
+        if messages:
+            self._hass.async_create_task(
+                listener.async_emit_messages(messages), eager_start=True
+            )
+
+    def error_received(self, exc: Exception) -> None:
+        """Log errors, such as plugs being unreachable."""
+        # Unanswered plugs are resubscribed to with backoff by the sweep
+        _LOGGER.debug("Shared plug socket error: %s", exc)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Have the socket bound again on the next sweep, if still needed."""
+        if self._transport is not None:
+            _LOGGER.warning("Shared plug socket closed unexpectedly: %s", exc)
+            self._transport = None
+
+
+@callback
+def async_get_shared_udp_transport(
+    hass: HomeAssistant,
+) -> PowersensorSharedUdpTransport:
+    """Return the shared plug socket for this Home Assistant instance."""
+    shared: PowersensorSharedUdpTransport | None = hass.data.get(DATA_SHARED_UDP)
+    if shared is None:
+        shared = hass.data[DATA_SHARED_UDP] = PowersensorSharedUdpTransport(hass)
+    return shared
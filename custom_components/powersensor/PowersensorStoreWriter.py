@@ -0,0 +1,78 @@
+"""Batched writes of data held by the integration to a Store.
+
+A delayed save of the Store itself calls its data function from the executor,
+while the event loop may still be changing the data. The writer instead takes
+its snapshot on the loop, once the delay has passed, and hands that over.
+"""
+
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any, Generic, TypeVar
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import CALLBACK_TYPE, Event, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+_T = TypeVar("_T", bound=Mapping[str, Any] | Sequence[Any])
+
+
+class PowersensorStoreWriter(Generic[_T]):
+    """Writes a snapshot of some data to a store, a while after it changed."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        store: Store[_T],
+        snapshot: Callable[[], _T],
+        delay: float,
+    ) -> None:
+        """Constructor for the writer, with `snapshot` called on the loop."""
+        self._hass = hass
+        self._store = store
+        self._snapshot = snapshot
+        self._delay = delay
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._unsub_final_write: CALLBACK_TYPE | None = None
+
+    @property
+    def pending(self) -> bool:
+        """Whether a write is pending."""
+        return self._unsub_timer is not None
+
+    @callback
+    def schedule(self) -> None:
+        """Write the data once the delay has passed.
+
+        Changes arriving while a write is pending simply join it, rather than
+        pushing it back. A write still pending when Home Assistant stops is
+        done right away.
+        """
+        if self._unsub_timer is not None:
+            return
+        self._unsub_timer = async_call_later(
+            self._hass,
+            self._delay,
+            HassJob(self._async_delayed_write, cancel_on_shutdown=True),
+        )
+        self._unsub_final_write = self._hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+        )
+
+    async def async_flush(self) -> None:
+        """Write the data now, if a write is pending."""
+        if self._unsub_timer is None:
+            return
+        self._unsub_timer()
+        self._unsub_timer = None
+        if self._unsub_final_write is not None:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+        await self._store.async_save(self._snapshot())
+
+    async def _async_delayed_write(self, _now) -> None:
+        await self.async_flush()
+
+    async def _async_final_write(self, _event: Event) -> None:
+        # Listeners added with async_listen_once are already gone when called
+        self._unsub_final_write = None
+        await self.async_flush()
@@ -12,16 +12,37 @@ from homeassistant.loader import async_get_integration
 
 from .config_flow import PowersensorConfigFlow
 from .const import (
+    CAPTURE_FILENAME,
+    CFG_CONNECT_CONCURRENCY,
     CFG_DEVICES,
+    CFG_PROBE_HOSTS,
+    CFG_RECORD_MESSAGES,
     CFG_ROLES,
+    CFG_SHARED_SOCKET,
+    CFG_TRACE_DEPTH,
+    DEFAULT_CONNECT_CONCURRENCY,
+    DEFAULT_TRACE_DEPTH,
     DOMAIN,
     ROLE_SOLAR,
     RT_DISPATCHER,
+    RT_OPTIONS,
+    RT_PROBE,
     RT_VHH,
     RT_ZEROCONF,
 )
 from .PowersensorDiscoveryService import PowersensorDiscoveryService
+from .PowersensorEndpointCache import (
+    PowersensorEndpointCache,
+    async_remove_endpoint_cache,
+)
 from .PowersensorMessageDispatcher import PowersensorMessageDispatcher
+from .PowersensorMessageRecorder import PowersensorMessageRecorder
+from .PowersensorProbeDiscovery import PowersensorProbeDiscovery, parse_probe_targets
+from .PowersensorRoleRegistry import (
+    PowersensorRoleRegistry,
+    async_remove_role_registry,
+)
+from .PowersensorSharedUdpTransport import async_get_shared_udp_transport
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,11 +59,39 @@ PLATFORMS: list[Platform] = [Platform.SENSOR]
 #         host =,
 #         port =,
 #     }
-#     roles = {
-#       mac = role,
+#     roles = {  # only read when first moving them to the role registry,
+#       mac = role,  # which keeps them in its own format, see below
 #     }
 #   }
 #
+# config entry.options structure:
+#   {
+#     connect_concurrency = int,
+#     trace_depth = int,
+#     record_messages = bool,
+#     shared_socket = bool,
+#     probe_hosts = str,  # IPv4 addresses and CIDR ranges
+#   }
+#
+# endpoint cache structure (in .storage, see PowersensorEndpointCache):
+#   {
+#     mac = {
+#       mac =,
+#       host =,
+#       port =,
+#       name =,
+#       last_seen = float,
+#     }
+#   }
+#
+# role registry structure (in .storage, see PowersensorRoleRegistry):
+#   {
+#     roles = {
+#       mac = role,  # plugs and sensors alike, role may be None
+#     },
+#     sensors = [mac, ...],  # the devices known to be sensors
+#   }
+#
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -60,14 +109,56 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         zeroconf_service = PowersensorDiscoveryService(hass, zeroconf_domain)
         await zeroconf_service.start()
 
+        # Load the roles of all devices
+        roles = PowersensorRoleRegistry(hass, entry)
+        await roles.async_load()
+
         # Establish our virtual household
-        with_solar = ROLE_SOLAR in entry.data.get(CFG_ROLES, {}).values()
+        with_solar = roles.has_role(ROLE_SOLAR)
         vhh = VirtualHousehold(with_solar)
 
+        # Optionally capture all messages, for later replay
+        recorder = None
+        if entry.options.get(CFG_RECORD_MESSAGES, False):
+            recorder = PowersensorMessageRecorder(
+                hass, hass.config.path(CAPTURE_FILENAME)
+            )
+
+        # Optionally connect to all plugs over a single socket
+        shared_transport = None
+        if entry.options.get(CFG_SHARED_SOCKET, False):
+            shared_transport = async_get_shared_udp_transport(hass)
+
+        # Plugs discovered after the config flow, and the latest addresses of
+        # all plugs, are remembered in the endpoint cache
+        endpoints = PowersensorEndpointCache(hass, entry.entry_id)
+        devices = {
+            **entry.data.get(CFG_DEVICES, {}),
+            **await endpoints.async_load(),
+        }
+
         # Set up message dispatcher
-        dispatcher = PowersensorMessageDispatcher(hass, entry, vhh)
-        for network_info in entry.data.get(CFG_DEVICES, {}).values():
+        dispatcher = PowersensorMessageDispatcher(
+            hass,
+            entry,
+            vhh,
+            connect_concurrency=entry.options.get(
+                CFG_CONNECT_CONCURRENCY, DEFAULT_CONNECT_CONCURRENCY
+            ),
+            trace_depth=entry.options.get(CFG_TRACE_DEPTH, DEFAULT_TRACE_DEPTH),
+            recorder=recorder,
+            endpoints=endpoints,
+            roles=roles,
+            shared_transport=shared_transport,
+        )
+        for network_info in devices.values():
             await dispatcher.enqueue_plug_for_adding(network_info)
+
+        # Optionally probe for plugs which mDNS doesn't reach
+        probe = None
+        if probe_hosts := entry.options.get(CFG_PROBE_HOSTS):
+            probe = PowersensorProbeDiscovery(hass, parse_probe_targets(probe_hosts))
+            probe.start()
     except Exception as err:
         raise ConfigEntryNotReady(f"Unexpected error during setup: {err}") from err
 
@@ -75,11 +166,21 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         RT_VHH: vhh,
         RT_DISPATCHER: dispatcher,
         RT_ZEROCONF: zeroconf_service,
+        RT_PROBE: probe,
+        RT_OPTIONS: dict(entry.options),
     }
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the integration when its options change."""
+    if entry.options != entry.runtime_data.get(RT_OPTIONS):
+        _LOGGER.debug("Options changed, reloading %s", entry.entry_id)
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("Started unloading for %s", entry.entry_id)
@@ -89,6 +190,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 await entry.runtime_data[RT_DISPATCHER].disconnect()
             if RT_ZEROCONF in entry.runtime_data:
                 await entry.runtime_data[RT_ZEROCONF].stop()
+            if entry.runtime_data.get(RT_PROBE) is not None:
+                await entry.runtime_data[RT_PROBE].async_stop()
 
     if entry.entry_id in hass.data[DOMAIN]:
         hass.data[DOMAIN].pop(entry.entry_id)
@@ -96,6 +199,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Clean up after a config entry which has been removed."""
+    await async_remove_endpoint_cache(hass, entry.entry_id)
+    await async_remove_role_registry(hass, entry.entry_id)
+
+
 async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Migrate old config entry."""
     _LOGGER.debug("Upgrading config from %s.%s", entry.version, entry.minor_version)
@@ -6,16 +6,25 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.config_entries import ConfigFlowResult
+from homeassistant.config_entries import ConfigEntry, ConfigFlowResult
+from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.selector import selector
 from homeassistant.helpers.service_info import zeroconf
 
 from .const import (
+    CFG_CONNECT_CONCURRENCY,
     CFG_DEVICES,
+    CFG_PROBE_HOSTS,
+    CFG_RECORD_MESSAGES,
     CFG_ROLES,
+    CFG_SHARED_SOCKET,
+    CFG_TRACE_DEPTH,
+    DEFAULT_CONNECT_CONCURRENCY,
     DEFAULT_PORT,
+    DEFAULT_TRACE_DEPTH,
     DOMAIN,
+    MAX_TRACE_DEPTH,
     ROLE_APPLIANCE,
     ROLE_HOUSENET,
     ROLE_SOLAR,
@@ -24,6 +33,7 @@ from .const import (
     RT_DISPATCHER,
     SENSOR_NAME_FORMAT,
 )
+from .PowersensorProbeDiscovery import parse_probe_targets
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,6 +46,14 @@ class PowersensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         """Initialize the config flow."""
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Return the options flow handler."""
+        return PowersensorOptionsFlow()
+
     async def async_step_reconfigure(
         self, user_input: dict | None = None
     ) -> ConfigFlowResult:
@@ -68,7 +86,7 @@ class PowersensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         sensor_roles = {}
         description_placeholders = {}
         for sensor_mac in dispatcher.sensors:
-            role = entry.data.get(CFG_ROLES, {}).get(sensor_mac, unknown)
+            role = dispatcher.roles.get(sensor_mac, unknown)
             sel = selector(
                 {
                     "select": {
@@ -195,3 +213,54 @@ class PowersensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return await self.async_step_confirm(
             step_id="manual_confirm", user_input=user_input
         )
+
+
+class PowersensorOptionsFlow(config_entries.OptionsFlow):
+    """Handle options for the integration."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the integration options."""
+        errors = {}
+        if user_input is not None:
+            try:
+                parse_probe_targets(user_input.get(CFG_PROBE_HOSTS, ""))
+            except ValueError:
+                errors[CFG_PROBE_HOSTS] = "invalid_probe_hosts"
+            else:
+                return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CFG_CONNECT_CONCURRENCY,
+                        default=options.get(
+                            CFG_CONNECT_CONCURRENCY, DEFAULT_CONNECT_CONCURRENCY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Required(
+                        CFG_TRACE_DEPTH,
+                        default=options.get(CFG_TRACE_DEPTH, DEFAULT_TRACE_DEPTH),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_TRACE_DEPTH)),
+                    vol.Required(
+                        CFG_RECORD_MESSAGES,
+                        default=options.get(CFG_RECORD_MESSAGES, False),
+                    ): bool,
+                    vol.Required(
+                        CFG_SHARED_SOCKET,
+                        default=options.get(CFG_SHARED_SOCKET, False),
+                    ): bool,
+                    vol.Optional(
+                        CFG_PROBE_HOSTS,
+                        description={
+                            "suggested_value": options.get(CFG_PROBE_HOSTS, "")
+                        },
+                    ): str,
+                }
+            ),
+            errors=errors,
+        )
@@ -5,10 +5,48 @@ DEFAULT_NAME = "Powersensor"
 DEFAULT_PORT = 49476
 DEFAULT_SCAN_INTERVAL = 30
 
+# Plug connection establishment and supervision
+DEFAULT_CONNECT_CONCURRENCY = 8
+DEFAULT_CONNECT_STAGGER = 0.5
+DEFAULT_FIRST_MESSAGE_TIMEOUT = 10
+DEFAULT_RECONNECT_BACKOFF_MIN = 1
+DEFAULT_RECONNECT_BACKOFF_MAX = 300
+ENDPOINT_CACHE_VERSION = 1
+ENDPOINT_CACHE_SAVE_DELAY = 10
+ENDPOINT_CACHE_MAX_AGE = 30 * 24 * 3600  # forget plugs not seen for 30 days
+ENDPOINT_CACHE_REFRESH_INTERVAL = 24 * 3600  # how often live plugs are noted
+
+# Plug removal, debounced adaptively by how much each plug flaps
+DEFAULT_REMOVAL_DEBOUNCE = 60
+REMOVAL_DEBOUNCE_MIN = 10
+REMOVAL_DEBOUNCE_MAX = 600
+FLAP_HALF_LIFE = 3600
+
+# Zeroconf discovery
+DISCOVERY_COALESCE_WINDOW = 0.5
+
+# Probing for plugs where mDNS doesn't get through
+PROBE_CONCURRENCY = 32
+PROBE_TIMEOUT = 1.0
+PROBE_INTERVAL_MIN = 60
+PROBE_INTERVAL_MAX = 3600
+PROBE_MAX_ADDRESSES = 4096
+
+# Role persistence
+ROLE_STORE_VERSION = 1
+ROLE_STORE_MINOR_VERSION = 2  # 2 added the macs known to be sensors
+ROLE_STORE_SAVE_DELAY = 10
+
+# Diagnostics
+DEFAULT_TRACE_DEPTH = 0
+MAX_TRACE_DEPTH = 500
+CAPTURE_FILENAME = "powersensor_capture.bin"
+DEFAULT_CAPTURE_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_CAPTURE_BACKUPS = 3
+
 # Internal signals
 CREATE_PLUG_SIGNAL = f"{DOMAIN}_create_plug"
 CREATE_SENSOR_SIGNAL = f"{DOMAIN}_create_sensor"
-DATA_UPDATE_SIGNAL_FMT_MAC_EVENT = f"{DOMAIN}_data_update_%s_%s"
 ROLE_UPDATE_SIGNAL = f"{DOMAIN}_update_role"
 PLUG_ADDED_TO_HA_SIGNAL = f"{DOMAIN}_plug_added_to_homeassistant"
 SENSOR_ADDED_TO_HA_SIGNAL = f"{DOMAIN}_sensor_added_to_homeassistant"
@@ -17,6 +55,25 @@ ZEROCONF_ADD_PLUG_SIGNAL = f"{DOMAIN}_zeroconf_add_plug"
 ZEROCONF_REMOVE_PLUG_SIGNAL = f"{DOMAIN}_zeroconf_remove_plug"
 ZEROCONF_UPDATE_PLUG_SIGNAL = f"{DOMAIN}_zeroconf_update_plug"
 
+# Device router events which don't come from the devices themselves
+ROLE_UPDATE_EVENT = "role_update"
+
+# Data events plugs can be asked for. The base ones are always asked for, as
+# the virtual household, role tracking and liveness depend on them. The others
+# only while an entity is listening to them.
+PLUG_EVENTS = frozenset(
+    {
+        "average_flow",
+        "average_power",
+        "average_power_components",
+        "battery_level",
+        "radio_signal_quality",
+        "summation_energy",
+        "summation_volume",
+    }
+)
+BASE_PLUG_EVENTS = frozenset({"average_power", "summation_energy"})
+
 # Formatting, would've liked to have been able to have this translatable
 SENSOR_NAME_FORMAT = "Powersensor Sensor (ID: %s) ⚡"
 
@@ -24,14 +81,29 @@ SENSOR_NAME_FORMAT = "Powersensor Sensor (ID: %s) ⚡"
 CFG_DEVICES = "devices"
 CFG_ROLES = "roles"
 
+# Config entry option keys
+CFG_CONNECT_CONCURRENCY = "connect_concurrency"
+CFG_TRACE_DEPTH = "trace_depth"
+CFG_RECORD_MESSAGES = "record_messages"
+CFG_SHARED_SOCKET = "shared_socket"
+CFG_PROBE_HOSTS = "probe_hosts"
+
 # Role names (fixed, as-received from plug API)
 ROLE_APPLIANCE = "appliance"
 ROLE_HOUSENET = "house-net"
 ROLE_SOLAR = "solar"
 ROLE_WATER = "water"
 
+# hass.data keys
+DATA_LIVENESS = f"{DOMAIN}_liveness"
+DATA_METRICS = f"{DOMAIN}_metrics"
+DATA_ROUTER = f"{DOMAIN}_router"
+DATA_SHARED_UDP = f"{DOMAIN}_shared_udp"
+
 # runtime_data keys
 RT_DISPATCHER = "dispatcher"
+RT_OPTIONS = "options"
+RT_PROBE = "probe"
 RT_VHH = "vhh"
 RT_VHH_LOCK = "vhh_update_lock"
 RT_VHH_MAINS_ADDED = "vhh_main_added"
@@ -0,0 +1,59 @@
+"""Diagnostics support for the Powersensor integration.
+
+The addresses of plugs, and those configured for probing, are redacted. Macs
+are kept, as they are what every device, trace and metric is keyed by, and
+only identify the hardware rather than where to reach it.
+"""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+
+from .const import CFG_PROBE_HOSTS, DOMAIN, RT_DISPATCHER
+from .PowersensorMessageDispatcher import PowersensorMessageDispatcher
+from .PowersensorMetrics import async_get_metrics
+
+TO_REDACT = {"host", "ip", CFG_PROBE_HOSTS}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    dispatcher: PowersensorMessageDispatcher = entry.runtime_data[RT_DISPATCHER]
+    metrics = async_get_metrics(hass)
+    return async_redact_data(
+        {
+            "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+            "dispatcher": dispatcher.as_diagnostics(),
+            "metrics": {
+                "message_rates": metrics.message_rates(),
+                "totals": dict(metrics.totals),
+            },
+        },
+        TO_REDACT,
+    )
+
+
+async def async_get_device_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry, device: DeviceEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a device."""
+    dispatcher: PowersensorMessageDispatcher = entry.runtime_data[RT_DISPATCHER]
+    rates = async_get_metrics(hass).message_rates()
+    # Plugs and sensors are identified by their mac, the virtual devices by
+    # fixed names like "vhh", which aren't known as devices
+    return async_redact_data(
+        {
+            mac: {
+                **dispatcher.device_as_diagnostics(mac),
+                "message_rates": rates.get(mac, {}),
+            }
+            for domain, mac in device.identifiers
+            if domain == DOMAIN and dispatcher.is_known_device(mac)
+        },
+        TO_REDACT,
+    )
@@ -1,21 +1,28 @@
 """A generic abstract class which both PowersensorPlugs and PowersensorSensors subclass to share common methods."""
 from dataclasses import dataclass
-from datetime import timedelta
 import logging
+from time import perf_counter
 from typing import Generic, TypeVar, Callable
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor import SensorEntityDescription
 from homeassistant.const import EntityCategory
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HassJob, HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from homeassistant.helpers.event import async_track_point_in_utc_time
-from homeassistant.util.dt import utcnow
+from homeassistant.helpers.event import async_call_later
 
-from ..const import DATA_UPDATE_SIGNAL_FMT_MAC_EVENT, DOMAIN, ROLE_UPDATE_SIGNAL
+from ..const import DOMAIN, ROLE_UPDATE_EVENT
+from ..PowersensorDeviceRouter import async_get_router
+from ..PowersensorLivenessTracker import DEFAULT_TIMEOUT, async_get_liveness_tracker
+from ..PowersensorMetrics import async_get_metrics
 from .PlugMeasurements import PlugMeasurements
+from .PowersensorRestoreSensor import PowersensorRestoreSensor
 from .SensorMeasurements import SensorMeasurements
+from .StateWriteThrottle import (
+    DEFAULT_THROTTLE,
+    StateWriteThrottle,
+    StateWriteThrottleConfig,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,8 +33,9 @@ class PowersensorSensorEntityDescription(SensorEntityDescription):
     conversion_function: Callable | None = None
     event: str | None = None
     message_key: str | None = None
+    throttle: StateWriteThrottleConfig = DEFAULT_THROTTLE
 
-class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
+class PowersensorEntity(PowersensorRestoreSensor, Generic[MeasurementType]):
     """Base class for all Powersensor entities."""
 
     def __init__(
@@ -37,19 +45,17 @@ class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
         role: str,
         input_config: dict[MeasurementType, PowersensorSensorEntityDescription],
         measurement_type: MeasurementType,
-        timeout_seconds: int = 60,
     ) -> None:
         """Initialize the sensor."""
         self._role = role
         self._has_recently_received_update_message = False
         self._attr_native_value = 0.0
         self._hass = hass
+        self._metrics = async_get_metrics(hass)
         self._mac = mac
         self._model = "PowersensorDevice"
         self._device_name = f"Powersensor Device (ID: {self._mac})"
         self._measurement_name : str | None = None
-        self._remove_unavailability_tracker = None
-        self._timeout = timedelta(seconds=timeout_seconds)  # Adjust as needed
 
         self.measurement_type: MeasurementType = measurement_type
         self.entity_description = input_config[measurement_type]
@@ -59,9 +65,14 @@ class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
         self._attr_unique_id = f"powersensor_{mac}_{measurement_type}"
         self._attr_device_info = self.device_info
 
-        self._signal = DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (mac, config.event)
+        self._event = config.event or ""
         self._message_key = config.message_key
         self._message_callback = config.conversion_function
+        self._throttle = StateWriteThrottle(
+            config.throttle,
+            config.suggested_display_precision,
+            self.async_write_ha_state,
+        )
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -70,62 +81,72 @@ class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
 
     @property
     def available(self) -> bool:
-        """Does data exist for this sensor type."""
-        return self._has_recently_received_update_message
-
-    def _schedule_unavailable(self):
-        """Schedule entity to become unavailable."""
-        if self._remove_unavailability_tracker:
-            self._remove_unavailability_tracker()
+        """Does data exist for this sensor type, be it fresh or restored."""
+        return self._has_recently_received_update_message or self._stale
 
-        self._remove_unavailability_tracker = async_track_point_in_utc_time(
-            self._hass, self._async_make_unavailable, utcnow() + self._timeout
-        )
-
-    async def _async_make_unavailable(self, _now):
-        """Mark entity as unavailable."""
-        self._has_recently_received_update_message = False
-        self.async_write_ha_state()
+    @callback
+    def _async_make_unavailable(self):
+        """Mark entity as unavailable, once the device has stopped reporting."""
+        if self._has_recently_received_update_message or self._stale:
+            self._has_recently_received_update_message = False
+            self._stale = False
+            self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         """Subscribe to messages when added to home assistant."""
         self._has_recently_received_update_message = False
         self.async_on_remove(
-            async_dispatcher_connect(self._hass, self._signal, self._handle_update)
+            async_get_router(self._hass).subscribe(
+                self._mac, self._event, self._handle_update
+            )
+        )
+        self.async_on_remove(self._throttle.cancel)
+        self.async_on_remove(
+            async_get_liveness_tracker(self._hass).subscribe(
+                self._mac, self._async_make_unavailable
+            )
         )
         self.async_on_remove(
-            async_dispatcher_connect(
-                self._hass, ROLE_UPDATE_SIGNAL, self._handle_role_update
+            async_get_router(self._hass).subscribe(
+                self._mac, ROLE_UPDATE_EVENT, self._handle_role_update
             )
         )
+        # A restored value stays available until the device is expected to have
+        # reported again. Timed here rather than by touching the liveness
+        # tracker, which would take the device for one that is reporting.
+        if await self._async_restore():
+            self.async_on_remove(
+                async_call_later(
+                    self._hass,
+                    DEFAULT_TIMEOUT,
+                    HassJob(self._async_expire_restored, cancel_on_shutdown=True),
+                )
+            )
 
-    async def async_will_remove_from_hass(self):
-        """Clean up."""
-        if self._remove_unavailability_tracker:
-            self._remove_unavailability_tracker()
+    @callback
+    def _async_expire_restored(self, _now) -> None:
+        """Drop a restored value the device hasn't followed up on in time."""
+        if self._stale:
+            self._stale = False
+            self.async_write_ha_state()
 
     def _rename_based_on_role(self):
         return False
 
     @callback
-    def _handle_role_update(self, mac: str, role: str):
-        if self._mac != mac or self._role == role:
+    def _handle_role_update(self, event: str, message: dict):
+        """Apply a new role of the device to this entity.
+
+        Renamed entities add themselves to the message's "renamed" list, so the
+        registries can be updated once for the whole device.
+        """
+        role = message["role"]
+        if self._role == role:
             return
 
         self._role = role
-        name_updated = self._rename_based_on_role()
-
-        if name_updated:
-            device_registry = dr.async_get(self._hass)
-            device = device_registry.async_get_device(identifiers={(DOMAIN, self._mac)})
-
-            if device and device.name != self._device_name:
-                # Update the device name
-                device_registry.async_update_device(device.id, name=self._device_name)
-
-            entity_registry = er.async_get(self._hass)
-            entity_registry.async_update_entity(self.entity_id, name=self._attr_name)
-
+        if self._rename_based_on_role():
+            message["renamed"].append(self)
             self.async_write_ha_state()
 
     @callback
@@ -134,7 +155,10 @@ class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
 
         # event is not presently used, but is passed to maintain flexibility for future development
 
+        started = perf_counter()
+        was_available = self._has_recently_received_update_message
         self._has_recently_received_update_message = True
+        self._mark_fresh()
 
         if self._message_key in message:
             if self._message_callback:
@@ -143,6 +167,26 @@ class PowersensorEntity(SensorEntity, Generic[MeasurementType]):
                 )
             else:
                 self._attr_native_value = message[self._message_key]
-        self._schedule_unavailable()
 
-        self.async_write_ha_state()
+        # Always write when becoming available or fresh, otherwise leave it to
+        # the throttle
+        self._throttle.async_update(
+            self._hass, self._attr_native_value, force=not was_available
+        )
+        self._metrics.observe("entity_update", perf_counter() - started)
+
+
+@callback
+def async_rename_device(
+    hass: HomeAssistant, mac: str, entities: list[PowersensorEntity]
+) -> None:
+    """Update the registries after entities of a device were renamed."""
+    device_name = entities[0]._device_name
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device(identifiers={(DOMAIN, mac)})
+    if device and device.name != device_name:
+        device_registry.async_update_device(device.id, name=device_name)
+
+    entity_registry = er.async_get(hass)
+    for entity in entities:
+        entity_registry.async_update_entity(entity.entity_id, name=entity._attr_name)
@@ -2,13 +2,19 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Callable
 
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass, SensorEntityDescription
+from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass, SensorEntityDescription
 from homeassistant.const import UnitOfPower, UnitOfEnergy
 from homeassistant.helpers.device_registry import DeviceInfo
 
 from powersensor_local import VirtualHousehold # type: ignore[import-untyped]
 
 from ..const import DOMAIN
+from .PowersensorRestoreSensor import PowersensorRestoreSensor
+from .StateWriteThrottle import (
+    DEFAULT_THROTTLE,
+    StateWriteThrottle,
+    StateWriteThrottleConfig,
+)
 
 class HouseholdMeasurements(Enum):
     POWER_HOME_USE = 1
@@ -37,11 +43,12 @@ ProductionMeasurements = [
 class PowersensorVirtualHouseholdSensorEntityDescription(SensorEntityDescription):
     formatter: Callable
     event: str
+    throttle: StateWriteThrottleConfig = DEFAULT_THROTTLE
 
 FMT_INT = lambda f: int(f)
 FMT_WS_TO_KWH = lambda f: float(f)/3600000
 
-class PowersensorHouseholdEntity(SensorEntity):
+class PowersensorHouseholdEntity(PowersensorRestoreSensor):
     """Powersensor Virtual Household entity"""
 
     should_poll = False
@@ -125,6 +132,11 @@ class PowersensorHouseholdEntity(SensorEntity):
         self._attr_unique_id = f"{DOMAIN}_vhh_{self._config.event}"
 
         self.entity_description = self._config
+        self._throttle = StateWriteThrottle(
+            self._config.throttle,
+            self._config.suggested_display_precision,
+            self.async_write_ha_state,
+        )
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -137,9 +149,11 @@ class PowersensorHouseholdEntity(SensorEntity):
 
     async def async_added_to_hass(self):
         self._vhh.subscribe(self._config.event, self._on_event)
+        await self._async_restore()
 
     async def async_will_remove_from_hass(self):
         self._vhh.unsubscribe(self._config.event, self._on_event)
+        self._throttle.cancel()
 
     async def _on_event(self, _, msg):
         val = None
@@ -153,4 +167,6 @@ class PowersensorHouseholdEntity(SensorEntity):
                 val = msg[key]
         if val is not None:
             self._attr_native_value = self._config.formatter(val)
-            self.async_write_ha_state()
+            self._throttle.async_update(
+                self.hass, self._attr_native_value, force=self._mark_fresh()
+            )
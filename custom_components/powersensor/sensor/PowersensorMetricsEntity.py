@@ -0,0 +1,140 @@
+"""Diagnostic entities reporting on the integration's own message handling."""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.helpers.device_registry import DeviceInfo
+
+from ..const import DOMAIN
+from ..PowersensorMetrics import LatencyHistogram, PowersensorMetrics
+
+
+class MetricsMeasurements(Enum):
+    MESSAGE_RATE = 1
+    MESSAGE_LATENCY = 2
+    ENTITY_UPDATE_LATENCY = 3
+    IGNORED_RELAYS = 4
+    RECONNECTS = 5
+    PLUG_QUEUE_DEPTH = 6
+    CONNECT_QUEUE_DEPTH = 7
+    SUPERSEDED_MESSAGES = 8
+
+
+@dataclass(frozen=True, kw_only=True)
+class PowersensorMetricsEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[PowersensorMetrics], Any]
+    attributes_fn: Callable[[PowersensorMetrics], dict[str, Any]] | None = None
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _latency_attributes(histogram: LatencyHistogram) -> dict[str, Any]:
+    return {
+        "p50": _ms(histogram.percentile(50)),
+        "p99": _ms(histogram.percentile(99)),
+        "max": _ms(histogram.max),
+        "count": histogram.count,
+    }
+
+
+def _latency_description(key: str, name: str) -> PowersensorMetricsEntityDescription:
+    return PowersensorMetricsEntityDescription(
+        key=key,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda m: _ms(m.latency(name).percentile(95)),
+        attributes_fn=lambda m: _latency_attributes(m.latency(name)),
+    )
+
+
+class PowersensorMetricsEntity(SensorEntity):
+    """Powersensor integration metrics entity"""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # Detail is for inspection only, and would just bloat the recorder
+    _unrecorded_attributes = frozenset({"by_device", "p50", "p99", "max", "count"})
+
+    _ENTITY_CONFIGS = {
+        MetricsMeasurements.MESSAGE_RATE: PowersensorMetricsEntityDescription(
+            key="Message rate",
+            native_unit_of_measurement="msg/s",
+            state_class=SensorStateClass.MEASUREMENT,
+            suggested_display_precision=1,
+            value_fn=lambda m: round(m.message_rate(), 3),
+            attributes_fn=lambda m: {"by_device": m.message_rates()},
+        ),
+        MetricsMeasurements.MESSAGE_LATENCY: _latency_description(
+            "Message handling latency", "handle_message"
+        ),
+        MetricsMeasurements.ENTITY_UPDATE_LATENCY: _latency_description(
+            "Entity update latency", "entity_update"
+        ),
+        MetricsMeasurements.IGNORED_RELAYS: PowersensorMetricsEntityDescription(
+            key="Ignored relays",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda m: m.totals["relays_ignored"],
+        ),
+        MetricsMeasurements.RECONNECTS: PowersensorMetricsEntityDescription(
+            key="Plug reconnects",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda m: m.totals["reconnects"],
+        ),
+        MetricsMeasurements.PLUG_QUEUE_DEPTH: PowersensorMetricsEntityDescription(
+            key="Plug queue depth",
+            state_class=SensorStateClass.MEASUREMENT,
+            value_fn=lambda m: m.gauge("plug_queue"),
+        ),
+        MetricsMeasurements.CONNECT_QUEUE_DEPTH: PowersensorMetricsEntityDescription(
+            key="Connection queue depth",
+            state_class=SensorStateClass.MEASUREMENT,
+            value_fn=lambda m: m.gauge("connect_queue"),
+        ),
+        MetricsMeasurements.SUPERSEDED_MESSAGES: PowersensorMetricsEntityDescription(
+            key="Superseded messages",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda m: m.totals["messages_superseded"],
+        ),
+    }
+
+    def __init__(
+        self, metrics: PowersensorMetrics, measurement_type: MetricsMeasurements
+    ) -> None:
+        """Initialize the entity."""
+        self._metrics = metrics
+        self._config = self._ENTITY_CONFIGS[measurement_type]
+
+        self._attr_name = self._config.key
+        self._attr_unique_id = f"{DOMAIN}_integration_{measurement_type.name.lower()}"
+
+        self.entity_description = self._config
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return {
+            'identifiers': {(DOMAIN, "integration")},
+            'manufacturer': "Powersensor",
+            'model': "Integration",
+            'name': "Powersensor Integration",
+        }
+
+    async def async_update(self) -> None:
+        """Read the latest values from the metrics registry."""
+        self._attr_native_value = self._config.value_fn(self._metrics)
+        if self._config.attributes_fn is not None:
+            self._attr_extra_state_attributes = self._config.attributes_fn(
+                self._metrics
+            )
@@ -15,10 +15,16 @@ from homeassistant.helpers.device_registry import DeviceInfo
 
 from .PlugMeasurements import PlugMeasurements
 from .PowersensorEntity import PowersensorEntity, PowersensorSensorEntityDescription
+from .StateWriteThrottle import StateWriteThrottleConfig
 from ..const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
+# The power components are reported as often as the power itself, but are
+# rarely of interest at that rate, so limit how often they hit the recorder.
+_COMPONENTS_THROTTLE = StateWriteThrottleConfig(min_interval=10)
+_VOLTAGE_THROTTLE = StateWriteThrottleConfig(deadband_abs=0.5, min_interval=10)
+
 
 _config: dict[PlugMeasurements, PowersensorSensorEntityDescription] = {
     PlugMeasurements.WATTS:
@@ -41,6 +47,7 @@ _config: dict[PlugMeasurements, PowersensorSensorEntityDescription] = {
             event = "average_power_components",
             message_key = "volts",
             entity_registry_visible_default = False,
+            throttle = _VOLTAGE_THROTTLE,
         ),
     PlugMeasurements.APPARENT_CURRENT: PowersensorSensorEntityDescription(
             key = "Apparent Current",
@@ -50,7 +57,8 @@ _config: dict[PlugMeasurements, PowersensorSensorEntityDescription] = {
             suggested_display_precision = 2,
             event = "average_power_components",
             message_key = "apparent_current",
-            entity_registry_visible_default = False),
+            entity_registry_visible_default = False,
+            throttle = _COMPONENTS_THROTTLE),
     PlugMeasurements.ACTIVE_CURRENT:  PowersensorSensorEntityDescription(
             key = "Active Current",
             device_class = SensorDeviceClass.CURRENT,
@@ -59,7 +67,8 @@ _config: dict[PlugMeasurements, PowersensorSensorEntityDescription] = {
             suggested_display_precision = 2,
             event = "average_power_components",
             message_key = "active_current",
-            entity_registry_visible_default = False),
+            entity_registry_visible_default = False,
+            throttle = _COMPONENTS_THROTTLE),
     PlugMeasurements.REACTIVE_CURRENT:  PowersensorSensorEntityDescription(
             key = "Reactive Current",
             device_class = SensorDeviceClass.CURRENT,
@@ -68,7 +77,8 @@ _config: dict[PlugMeasurements, PowersensorSensorEntityDescription] = {
             suggested_display_precision = 2,
             event = "average_power_components",
             message_key = "reactive_current",
-            entity_registry_visible_default = False),
+            entity_registry_visible_default = False,
+            throttle = _COMPONENTS_THROTTLE),
     PlugMeasurements.SUMMATION_ENERGY: PowersensorSensorEntityDescription(
             key = "Total Energy",
             device_class = SensorDeviceClass.ENERGY,
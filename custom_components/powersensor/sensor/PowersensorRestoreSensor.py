@@ -0,0 +1,82 @@
+"""Restoring of the last known value of Powersensor entities across restarts.
+
+Home Assistant reads the states saved by all restorable entities in a single
+load at startup, so restoring each entity is only an in-memory lookup. A
+restored value is shown straight away, flagged as stale along with when the
+device was last heard from, until fresh data arrives.
+"""
+from dataclasses import dataclass
+from time import time
+from typing import Any, Self
+
+from homeassistant.components.sensor import RestoreSensor, SensorExtraStoredData
+import homeassistant.util.dt as dt_util
+
+ATTR_STALE = "stale"
+ATTR_LAST_MESSAGE_AT = "last_message_at"
+
+
+@dataclass
+class PowersensorExtraStoredData(SensorExtraStoredData):
+    """Sensor data to restore, including when it was last received."""
+
+    last_message_at: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a dict representation of the stored data."""
+        return {**super().as_dict(), ATTR_LAST_MESSAGE_AT: self.last_message_at}
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize the stored data from a dict."""
+        data = super().from_dict(restored)
+        if data is not None:
+            data.last_message_at = restored.get(ATTR_LAST_MESSAGE_AT)
+        return data
+
+
+class PowersensorRestoreSensor(RestoreSensor):
+    """Sensor which restores its last value, as stale, on startup."""
+
+    _unrecorded_attributes = frozenset({ATTR_STALE, ATTR_LAST_MESSAGE_AT})
+    _stale = False
+    _last_message_at: float | None = None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Flag a restored value, until fresh data arrives."""
+        if not self._stale:
+            return None
+        last_message_at = None
+        if self._last_message_at is not None:
+            last_message_at = dt_util.utc_from_timestamp(
+                self._last_message_at
+            ).isoformat()
+        return {ATTR_STALE: True, ATTR_LAST_MESSAGE_AT: last_message_at}
+
+    @property
+    def extra_restore_state_data(self) -> PowersensorExtraStoredData:
+        """Return the data to restore on the next startup."""
+        return PowersensorExtraStoredData(
+            self.native_value, self.native_unit_of_measurement, self._last_message_at
+        )
+
+    def _mark_fresh(self) -> bool:
+        """Note that data has just arrived. Returns whether it was stale."""
+        was_stale = self._stale
+        self._stale = False
+        self._last_message_at = time()
+        return was_stale
+
+    async def _async_restore(self) -> bool:
+        """Restore the last known value, if any. Returns whether it was."""
+        restored = await self.async_get_last_extra_data()
+        if restored is None:
+            return False
+        data = PowersensorExtraStoredData.from_dict(restored.as_dict())
+        if data is None or data.native_value is None:
+            return False
+        self._attr_native_value = data.native_value
+        self._last_message_at = data.last_message_at
+        self._stale = True
+        return True
@@ -0,0 +1,108 @@
+"""Throttling of Home Assistant state writes for frequently reporting measurements."""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from time import monotonic
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class StateWriteThrottleConfig:
+    """Per-measurement state write throttling settings.
+
+    A new value is only written once it differs from the last written value
+    at the entity's display precision, and by more than both the absolute and
+    relative deadbands. Changes are written at most once per `min_interval`
+    seconds, while the latest value is always written at least once every
+    `heartbeat_interval` seconds.
+    """
+
+    deadband_abs: float = 0.0
+    deadband_rel: float = 0.0
+    min_interval: float = 0.0
+    heartbeat_interval: float = 300.0
+
+
+DEFAULT_THROTTLE = StateWriteThrottleConfig()
+
+
+class StateWriteThrottle:
+    """Decides when a new value warrants a state write."""
+
+    def __init__(
+        self,
+        config: StateWriteThrottleConfig,
+        display_precision: int | None,
+        write: Callable[[], None],
+    ) -> None:
+        """Constructor for the throttle. `write` performs the actual state write."""
+        self._config = config
+        self._precision = display_precision
+        self._write = write
+        self._last_value: Any = None
+        self._latest: Any = None
+        self._last_write: float | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    def _has_changed(self, value: Any) -> bool:
+        last = self._last_value
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return value != last
+        if self._precision is not None and round(value, self._precision) == round(
+            last, self._precision
+        ):
+            return False
+        delta = abs(value - last)
+        return (
+            delta > self._config.deadband_abs
+            and delta > self._config.deadband_rel * abs(last)
+        )
+
+    @callback
+    def async_update(self, hass: HomeAssistant, value: Any, force: bool = False) -> None:
+        """Handle a new value, writing state now, later, or not at all."""
+        now = monotonic()
+        last_write = self._last_write
+        self._latest = value
+        if (
+            force
+            or last_write is None
+            or now - last_write >= self._config.heartbeat_interval
+        ):
+            self._flush(value, now)
+        elif not self._has_changed(value):
+            return
+        elif now - last_write >= self._config.min_interval:
+            self._flush(value, now)
+        elif self._unsub_flush is None:
+            # Make sure a suppressed change still gets written, even if no
+            # further messages arrive.
+            self._unsub_flush = async_call_later(
+                hass,
+                last_write + self._config.min_interval - now,
+                HassJob(self._async_deferred_flush, cancel_on_shutdown=True),
+            )
+
+    @callback
+    def _async_deferred_flush(self, _now) -> None:
+        self._unsub_flush = None
+        self._flush(self._latest, monotonic())
+
+    def _flush(self, value: Any, now: float) -> None:
+        self.cancel()
+        self._last_value = value
+        self._last_write = now
+        self._write()
+
+    @callback
+    def cancel(self) -> None:
+        """Cancel any pending deferred write."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import logging
+from typing import Any
 
+from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
@@ -15,8 +16,6 @@ from homeassistant.helpers.dispatcher import (
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from ..const import (
-    # Used config entry fields
-    CFG_ROLES,
     # Used signals
     CREATE_PLUG_SIGNAL,
     CREATE_SENSOR_SIGNAL,
@@ -25,6 +24,7 @@ from ..const import (
     ROLE_APPLIANCE,
     ROLE_HOUSENET,
     ROLE_SOLAR,
+    ROLE_UPDATE_EVENT,
     ROLE_UPDATE_SIGNAL,
     # Used runtime_data entries
     RT_DISPATCHER,
@@ -35,13 +35,17 @@ from ..const import (
     SENSOR_ADDED_TO_HA_SIGNAL,
     UPDATE_VHH_SIGNAL,
 )
+from ..PowersensorDeviceRouter import async_get_router
 from ..PowersensorMessageDispatcher import PowersensorMessageDispatcher
+from ..PowersensorMetrics import async_get_metrics
 from .PlugMeasurements import PlugMeasurements
+from .PowersensorEntity import PowersensorEntity, async_rename_device
 from .PowersensorHouseholdEntity import (
     ConsumptionMeasurements,
     PowersensorHouseholdEntity,
     ProductionMeasurements,
 )
+from .PowersensorMetricsEntity import MetricsMeasurements, PowersensorMetricsEntity
 from .PowersensorPlugEntity import PowersensorPlugEntity
 from .PowersensorSensorEntity import PowersensorSensorEntity
 from .SensorMeasurements import SensorMeasurements
@@ -64,36 +68,46 @@ async def async_setup_entry(
 
     plug_role = ROLE_APPLIANCE
 
+    roles = dispatcher.roles
+
     def with_solar():
         """Checks whether any known sensor has the solar role."""
-        return ROLE_SOLAR in entry.data.get(CFG_ROLES, {}).values()
+        return roles.has_role(ROLE_SOLAR)
 
     def with_mains():
         """Checks whether any known sensor has the house-net role."""
-        return ROLE_HOUSENET in entry.data.get(CFG_ROLES, {}).values()
+        return roles.has_role(ROLE_HOUSENET)
 
     #
     # Role update support
     #
+    router = async_get_router(hass)
+
     async def handle_role_update(mac_address: str, new_role: str):
-        """Persists role updates and signals for VHH update if needed."""
-        new_data = copy.deepcopy({ **entry.data })
-        if CFG_ROLES not in new_data.keys():
-            new_data[CFG_ROLES] = {}
-        roles = new_data[CFG_ROLES]
-        old_role = roles.get(mac_address, None)
-        if old_role is None or old_role != new_role:
+        """Persists role updates, and applies them to the device's entities."""
+        old_role = roles.get(mac_address)
+        if roles.update(mac_address, new_role):
             _LOGGER.debug(
                     "Updating role for %s from %s to %s",
                     mac_address,
                     old_role,
                     new_role,
                 )
-            roles[mac_address] = new_role
-            hass.config_entries.async_update_entry(entry, data=new_data)
+
+        # Entities may have been created with a role other than the persisted
+        # one, so they're told even if the registry didn't change
+        renamed: list[PowersensorEntity] = []
+        router.route(
+            mac_address, (ROLE_UPDATE_EVENT, {"role": new_role, "renamed": renamed})
+        )
+        if renamed:
+            async_rename_device(hass, mac_address, renamed)
 
         # TODO: for house-net/solar/appliance <-> water we'd need to change the entities too
 
+    @callback
+    def handle_role_change(mac_address: str, old_role: str | None, new_role: str | None):
+        """Signals for VHH update if needed."""
         # Note: we don't currently support dynamically removing/disabling VHH
         # entities if a solar/house-net sensor disappears.
         if new_role in [ROLE_SOLAR, ROLE_HOUSENET]:
@@ -102,13 +116,14 @@ async def async_setup_entry(
     entry.async_on_unload(
         async_dispatcher_connect(hass, ROLE_UPDATE_SIGNAL, handle_role_update)
     )
+    entry.async_on_unload(roles.subscribe(handle_role_change))
 
     #
     # Automatic sensor discovery
     #
-    async def handle_discovered_sensor(sensor_mac: str, sensor_role: str):
-        """Registers sensor entities, signals sensor added plus VHH update if needed."""
-        new_sensors = [
+    def sensor_entities(sensor_mac: str, sensor_role: str):
+        """Returns the entities of a sensor."""
+        return [
             PowersensorSensorEntity(
                 hass, sensor_mac, sensor_role, SensorMeasurements.Battery
             ),
@@ -125,7 +140,10 @@ async def async_setup_entry(
                 hass, sensor_mac, sensor_role, SensorMeasurements.RSSI
             ),
         ]
-        async_add_entities(new_sensors, True)
+
+    async def handle_discovered_sensor(sensor_mac: str, sensor_role: str):
+        """Registers sensor entities, signals sensor added plus VHH update if needed."""
+        async_add_entities(sensor_entities(sensor_mac, sensor_role), True)
         async_dispatcher_send(hass, SENSOR_ADDED_TO_HA_SIGNAL, sensor_mac, sensor_role)
 
         if (sensor_role == ROLE_SOLAR and with_mains()) or sensor_role == ROLE_HOUSENET:
@@ -138,9 +156,9 @@ async def async_setup_entry(
     #
     # Plug handling
     #
-    async def create_plug(plug_mac_address: str, new_plug_role: str):
-        """Registers sensor entities."""
-        this_plug_sensors = [
+    def plug_entities(plug_mac_address: str, new_plug_role: str):
+        """Returns the entities of a plug."""
+        return [
             PowersensorPlugEntity(hass, plug_mac_address, new_plug_role, PlugMeasurements.WATTS),
             PowersensorPlugEntity(
                 hass, plug_mac_address, new_plug_role, PlugMeasurements.VOLTAGE
@@ -160,10 +178,9 @@ async def async_setup_entry(
             PowersensorPlugEntity(hass, plug_mac_address, new_plug_role, PlugMeasurements.ROLE),
         ]
 
-        async_add_entities(this_plug_sensors, True)
-
-    for plug_mac in dispatcher.plugs:
-        await create_plug(plug_mac, plug_role)
+    async def create_plug(plug_mac_address: str, new_plug_role: str):
+        """Registers sensor entities."""
+        async_add_entities(plug_entities(plug_mac_address, new_plug_role), True)
 
     #
     # Automatic plug discovery
@@ -180,51 +197,49 @@ async def async_setup_entry(
     entry.async_on_unload(
         async_dispatcher_connect(hass, CREATE_PLUG_SIGNAL, handle_discovered_plug)
     )
-    await dispatcher.process_plug_queue()
-
-    # Possibly unnecessary but will add sensors where the messages came in early
-    # Hopefully keeps wait time less than 30s
-    for mac, role in dispatcher.on_start_sensor_queue.items():
-        await handle_discovered_sensor(mac, role)
 
     #
     # Virtual household support
     #
+    def household_entities():
+        """Returns the VHH entities newly enabled by solar/house-net availability."""
+        if not with_mains():
+            _LOGGER.debug("No house-net, VHH not yet operational")
+            return [] # No VHH until we have at least house-net
+
+        mains_added = entry.runtime_data[RT_VHH_MAINS_ADDED]
+        solar_added = entry.runtime_data[RT_VHH_SOLAR_ADDED]
+
+        new_entities = []
+
+        if with_mains() and not mains_added:
+            _LOGGER.debug("Enabling mains components in virtual household")
+            new_entities.extend(
+                [
+                    PowersensorHouseholdEntity(vhh, measurement_type)
+                    for measurement_type in ConsumptionMeasurements
+                ]
+            )
+
+            entry.runtime_data[RT_VHH_MAINS_ADDED] = True
+
+        if with_solar() and not solar_added:
+            _LOGGER.debug("Enabling solar components in virtual household")
+            new_entities.extend(
+                [
+                    PowersensorHouseholdEntity(vhh, solar_measurement_type)
+                    for solar_measurement_type in ProductionMeasurements
+                ]
+            )
+            entry.runtime_data[RT_VHH_SOLAR_ADDED] = True
+
+        return new_entities
+
     async def update_virtual_household_entities():
         """Enables VHH entities based on solar/house-net availability."""
         async with entry.runtime_data[RT_VHH_LOCK]:
-            if not with_mains():
-                _LOGGER.debug("No house-net, VHH not yet operational")
-                return # No VHH until we have at least house-net
-
-            mains_added = entry.runtime_data[RT_VHH_MAINS_ADDED]
-            solar_added = entry.runtime_data[RT_VHH_SOLAR_ADDED]
-
-            household_entities = []
-
-            if with_mains() and not mains_added:
-                _LOGGER.debug("Enabling mains components in virtual household")
-                household_entities.extend(
-                    [
-                        PowersensorHouseholdEntity(vhh, measurement_type)
-                        for measurement_type in ConsumptionMeasurements
-                    ]
-                )
-
-                entry.runtime_data[RT_VHH_MAINS_ADDED] = True
-
-            if with_solar() and not solar_added:
-                _LOGGER.debug("Enabling solar components in virtual household")
-                household_entities.extend(
-                    [
-                        PowersensorHouseholdEntity(vhh, solar_measurement_type)
-                        for solar_measurement_type in ProductionMeasurements
-                    ]
-                )
-                entry.runtime_data[RT_VHH_SOLAR_ADDED] = True
-
-            if len(household_entities) > 0:
-                async_add_entities(household_entities)
+            if new_entities := household_entities():
+                async_add_entities(new_entities)
 
     entry.async_on_unload(
         async_dispatcher_connect(
@@ -232,4 +247,30 @@ async def async_setup_entry(
         )
     )
 
-    await update_virtual_household_entities()
+    #
+    # Startup
+    #
+    # Everything already known is added in one go, so the entities are back
+    # straight away rather than as each device gets around to reporting. That
+    # covers every device we have ever seen relayed as a sensor, plus any whose
+    # messages came in before we got here.
+    known_sensors: dict[str, Any] = {mac: roles.get(mac) for mac in roles.sensors}
+    known_sensors.update(dispatcher.on_start_sensor_queue)
+
+    metrics = async_get_metrics(hass)
+    startup_entities: list[SensorEntity] = [
+        PowersensorMetricsEntity(metrics, measurement_type)
+        for measurement_type in MetricsMeasurements
+    ]
+    for plug_mac in dispatcher.plugs:
+        startup_entities.extend(plug_entities(plug_mac, plug_role))
+    for sensor_mac, sensor_role in known_sensors.items():
+        startup_entities.extend(sensor_entities(sensor_mac, sensor_role))
+    async with entry.runtime_data[RT_VHH_LOCK]:
+        startup_entities.extend(household_entities())
+    async_add_entities(startup_entities, True)
+
+    for sensor_mac, sensor_role in known_sensors.items():
+        async_dispatcher_send(hass, SENSOR_ADDED_TO_HA_SIGNAL, sensor_mac, sensor_role)
+
+    await dispatcher.process_plug_queue()
@@ -0,0 +1,15 @@
+#!/bin/bash
+# Runs the benchmarks, writing the results to benchmarks/results.json.
+# Pass --benchmark-json=<file> to write them elsewhere, e.g. to compare runs.
+set -euo pipefail
+rootdir="$(realpath "$(dirname "$0")/..")"
+benchdir="${rootdir}/benchmarks"
+cd "${rootdir}"
+export PYTHONDONTWRITEBYTECODE=1
+export PYTHONPATH="${rootdir}:${benchdir}"
+pytest \
+  --asyncio-mode=auto \
+  --capture=no \
+  -p no:cacheprovider \
+  "${benchdir}" \
+  "$@"
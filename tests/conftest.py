@@ -3,6 +3,7 @@
 from powersensor_local import PlugListenerUdp
 import pytest
 import zeroconf
+import zeroconf.asyncio
 
 from custom_components.powersensor.config_flow import PowersensorConfigFlow
 from custom_components.powersensor.const import DOMAIN
@@ -36,10 +37,14 @@ def no_zeroconf(monkeypatch: pytest.MonkeyPatch) -> None:
 
     monkeypatch.setattr(homeassistant.components.zeroconf, "async_get_instance", no_zc)
 
-    def empty_zc_init(self, service_type, listener, _):
+    def empty_zc_init(self, zc, service_type, handlers):
         pass
 
-    monkeypatch.setattr(zeroconf.ServiceBrowser, "__init__", empty_zc_init)
+    async def no_cancel(self):
+        pass
+
+    monkeypatch.setattr(zeroconf.asyncio.AsyncServiceBrowser, "__init__", empty_zc_init)
+    monkeypatch.setattr(zeroconf.asyncio.AsyncServiceBrowser, "async_cancel", no_cancel)
 
 
 @pytest.fixture
@@ -72,6 +77,7 @@ def def_config_entry():
 
     class MockDispatcher:
         sensors = ["coo1eat5", "cafebabe", "d3adB33f"]
+        roles = dict(entry.data["roles"])
 
     entry.runtime_data = {"dispatcher": MockDispatcher()}
     return entry
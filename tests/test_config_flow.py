@@ -14,6 +14,11 @@ from homeassistant import config_entries
 import custom_components.powersensor
 from custom_components.powersensor import PowersensorConfigFlow
 from custom_components.powersensor.const import (
+    CFG_CONNECT_CONCURRENCY,
+    CFG_RECORD_MESSAGES,
+    CFG_PROBE_HOSTS,
+    CFG_SHARED_SOCKET,
+    CFG_TRACE_DEPTH,
     DOMAIN,
     ROLE_UPDATE_SIGNAL,
     RT_DISPATCHER,
@@ -507,3 +512,41 @@ async def test_abort_due_to_missing_dispatcher(
         },
     )
     assert result["type"] == FlowResultType.ABORT
+
+
+async def test_options_flow(hass: HomeAssistant, def_config_entry) -> None:
+    """Tests updating the integration options."""
+    def_config_entry.add_to_hass(hass)
+    result = await hass.config_entries.options.async_init(def_config_entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CFG_CONNECT_CONCURRENCY: 4,
+            CFG_TRACE_DEPTH: 20,
+            CFG_RECORD_MESSAGES: True,
+            CFG_SHARED_SOCKET: True,
+            CFG_PROBE_HOSTS: "192.168.20.0/16",
+        },
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CFG_PROBE_HOSTS: "invalid_probe_hosts"}
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CFG_CONNECT_CONCURRENCY: 4,
+            CFG_TRACE_DEPTH: 20,
+            CFG_RECORD_MESSAGES: True,
+            CFG_SHARED_SOCKET: True,
+            CFG_PROBE_HOSTS: "192.168.20.0/24",
+        },
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert def_config_entry.options[CFG_CONNECT_CONCURRENCY] == 4
+    assert def_config_entry.options[CFG_TRACE_DEPTH] == 20
+    assert def_config_entry.options[CFG_RECORD_MESSAGES] is True
+    assert def_config_entry.options[CFG_SHARED_SOCKET] is True
+    assert def_config_entry.options[CFG_PROBE_HOSTS] == "192.168.20.0/24"
@@ -0,0 +1,109 @@
+"""Tests related to the per-device message router."""
+
+from unittest.mock import Mock, call
+
+import pytest
+
+from custom_components.powersensor.PowersensorDeviceRouter import (
+    PowersensorDeviceRouter,
+    async_get_router,
+)
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+@pytest.mark.asyncio
+async def test_router_is_shared(hass: HomeAssistant) -> None:
+    """Test that a single router is used per Home Assistant instance."""
+    router = async_get_router(hass)
+    assert isinstance(router, PowersensorDeviceRouter)
+    assert async_get_router(hass) is router
+
+
+def test_router_delivers_to_device_handlers() -> None:
+    """Test routing of messages to subscribed handlers.
+
+    This test verifies that:
+    - All handlers for a device and event receive the message, in order.
+    - Multiple updates are delivered in a single call.
+    - Handlers for other devices or events are not called.
+    """
+    router = PowersensorDeviceRouter()
+    power_a = Mock()
+    power_b = Mock()
+    role = Mock()
+    other = Mock()
+    router.subscribe(MAC, "average_power", power_a)
+    router.subscribe(MAC, "average_power", power_b)
+    router.subscribe(MAC, "role", role)
+    router.subscribe(OTHER_MAC, "average_power", other)
+
+    message = {"mac": MAC, "watts": 12}
+    router.route(MAC, ("average_power", message), ("role", {"role": None}))
+    power_a.assert_called_once_with("average_power", message)
+    power_b.assert_called_once_with("average_power", message)
+    role.assert_called_once_with("role", {"role": None})
+    other.assert_not_called()
+
+    # unknown devices and events are silently ignored
+    router.route("unknown", ("average_power", message))
+    router.route(MAC, ("summation_energy", message))
+    assert power_a.call_count == 1
+
+
+def test_router_unsubscribe() -> None:
+    """Test removal of handlers from the routing table.
+
+    This test verifies that:
+    - An unsubscribed handler no longer receives messages.
+    - The device is dropped from the table once its last handler is removed.
+    - Unsubscribing twice is harmless.
+    """
+    router = PowersensorDeviceRouter()
+    first = Mock()
+    second = Mock()
+    unsub_first = router.subscribe(MAC, "average_power", first)
+    unsub_second = router.subscribe(MAC, "average_power", second)
+    assert router.has_routes(MAC)
+
+    unsub_first()
+    router.route(MAC, ("average_power", {}))
+    first.assert_not_called()
+    assert second.call_args_list == [call("average_power", {})]
+
+    unsub_second()
+    assert not router.has_routes(MAC)
+    unsub_second()
+    assert not router.has_routes(MAC)
+
+
+def test_router_routed_events() -> None:
+    """Test tracking of the events any entity is listening to.
+
+    This test verifies that:
+    - Events are routed while any device has a handler for them.
+    - Listeners are only told when an event is first or no longer routed.
+    - Removed listeners are no longer told.
+    """
+    router = PowersensorDeviceRouter()
+    listener = Mock()
+    unsub_listener = router.subscribe_routed_events(listener)
+
+    unsub_a = router.subscribe(MAC, "battery_level", Mock())
+    unsub_b = router.subscribe(OTHER_MAC, "battery_level", Mock())
+    assert router.routed_events() == {"battery_level"}
+    assert listener.call_count == 1
+
+    unsub_a()
+    assert router.routed_events() == {"battery_level"}
+    assert listener.call_count == 1
+    unsub_b()
+    assert router.routed_events() == frozenset()
+    assert listener.call_count == 2
+
+    unsub_listener()
+    unsub_listener()
+    router.subscribe(MAC, "battery_level", Mock())
+    assert listener.call_count == 2
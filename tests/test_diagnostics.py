@@ -0,0 +1,154 @@
+"""Tests related to the diagnostics download and per-device message traces."""
+
+from ipaddress import ip_address
+from unittest.mock import Mock
+
+from powersensor_local import VirtualHousehold
+import pytest
+
+from custom_components.powersensor.const import (
+    CFG_DEVICES,
+    CFG_PROBE_HOSTS,
+    CFG_ROLES,
+    CFG_TRACE_DEPTH,
+    DOMAIN,
+    RT_DISPATCHER,
+)
+from custom_components.powersensor.diagnostics import (
+    async_get_config_entry_diagnostics,
+    async_get_device_diagnostics,
+)
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from custom_components.powersensor.PowersensorMessageTrace import TraceRingBuffer
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.core import HomeAssistant
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+MAC = "a4cf1218f158"
+SENSOR_MAC = "a4cf1218f159"
+
+
+def test_trace_ring_buffer() -> None:
+    """Test that the ring buffer retains the most recent entries, oldest first."""
+    buffer = TraceRingBuffer(3)
+    assert buffer.entries() == []
+    for n in range(2):
+        buffer.append((n, "event", {}))
+    assert [entry[0] for entry in buffer.entries()] == [0, 1]
+    for n in range(2, 5):
+        buffer.append((n, "event", {}))
+    assert [entry[0] for entry in buffer.entries()] == [2, 3, 4]
+
+
+async def make_dispatcher(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, trace_depth: int
+) -> tuple[PowersensorMessageDispatcher, MockConfigEntry]:
+    """Return a dispatcher with a plug relaying for a sensor, and its entry."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CFG_DEVICES: {MAC: {"host": "192.168.0.33", "port": 49476, "mac": MAC}},
+            CFG_ROLES: {},
+        },
+        options={CFG_TRACE_DEPTH: trace_depth, CFG_PROBE_HOSTS: "192.168.1.0/24"},
+    )
+    dispatcher = PowersensorMessageDispatcher(
+        hass, entry, VirtualHousehold(False), trace_depth=trace_depth
+    )
+    monkeypatch.setattr(dispatcher.connections, "request_connect", Mock())
+    dispatcher._create_api(MAC, ip_address("192.168.0.33"), 49476, "plug")
+    await dispatcher._record_relay(MAC, "now_relaying_for", {})
+    await dispatcher._record_relay(MAC, "now_relaying_for", {"mac": SENSOR_MAC})
+    for watts in range(3):
+        await dispatcher.handle_message(
+            "average_power",
+            {"mac": SENSOR_MAC, "device_type": "sensor", "role": "solar", "watts": watts},
+        )
+    entry.runtime_data = {RT_DISPATCHER: dispatcher}
+    return dispatcher, entry
+
+
+@pytest.mark.asyncio
+async def test_config_entry_diagnostics(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the config entry diagnostics download.
+
+    This test verifies that:
+    - The dispatcher's view of plugs, sensors and relays is included.
+    - Addresses of plugs, and to probe, are redacted.
+    - Only the configured number of recent messages are traced per device.
+    - Messages are traced as received, without the role filled in.
+    - Message rate counters are included.
+    """
+    dispatcher, entry = await make_dispatcher(hass, monkeypatch, trace_depth=2)
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diagnostics["entry"]["options"] == {
+        CFG_TRACE_DEPTH: 2,
+        CFG_PROBE_HOSTS: REDACTED,
+    }
+    assert diagnostics["entry"]["data"][CFG_DEVICES][MAC] == {
+        "host": REDACTED,
+        "port": 49476,
+        "mac": MAC,
+    }
+    state = diagnostics["dispatcher"]
+    assert state["plugs"] == {MAC: {"host": REDACTED, "port": 49476}}
+    assert state["known_plugs"] == [MAC]
+    assert state["sensors"] == {SENSOR_MAC: "solar"}
+    assert state["relays"] == {SENSOR_MAC: MAC}
+    assert state["plug_queue"] == {"queued": [], "states": {MAC: "CONNECTED"}}
+    trace = state["traces"][SENSOR_MAC]
+    assert [entry["message"]["watts"] for entry in trace] == [1, 2]
+    assert dispatcher.device_as_diagnostics(MAC)["trace"] == []
+    assert diagnostics["metrics"]["message_rates"][SENSOR_MAC]["average_power"] > 0
+
+    message = {"mac": MAC, "device_type": "plug", "watts": 5}
+    await dispatcher.handle_message("average_power", message)
+    assert message["role"] is None
+    traced = dispatcher.device_as_diagnostics(MAC)["trace"][0]["message"]
+    assert traced == {"mac": MAC, "device_type": "plug", "watts": 5}
+    await dispatcher.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_device_diagnostics(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the device diagnostics download.
+
+    This test verifies that:
+    - A plug reports the devices it relays for, and a sensor the relaying plug.
+    - No messages are traced when tracing is disabled.
+    - Devices without a known mac, like the household and integration views,
+      report nothing.
+    """
+    dispatcher, entry = await make_dispatcher(hass, monkeypatch, trace_depth=0)
+    plug = Mock(identifiers={(DOMAIN, MAC)})
+    sensor = Mock(identifiers={(DOMAIN, SENSOR_MAC), ("other", "id")})
+
+    diagnostics = await async_get_device_diagnostics(hass, entry, plug)
+    assert diagnostics[MAC]["plug"] == {"host": REDACTED, "port": 49476}
+    assert diagnostics[MAC]["relaying_for"] == [SENSOR_MAC]
+    assert diagnostics[MAC]["plug_queue_state"] == "CONNECTED"
+
+    diagnostics = await async_get_device_diagnostics(hass, entry, sensor)
+    assert list(diagnostics) == [SENSOR_MAC]
+    assert diagnostics[SENSOR_MAC]["plug"] is None
+    assert diagnostics[SENSOR_MAC]["relayed_by"] == MAC
+    assert diagnostics[SENSOR_MAC]["sensor_role"] == "solar"
+    assert diagnostics[SENSOR_MAC]["trace"] == []
+    assert diagnostics[SENSOR_MAC]["message_rates"]["average_power"] > 0
+    assert (await async_get_config_entry_diagnostics(hass, entry))["dispatcher"][
+        "traces"
+    ] == {}
+
+    assert await async_get_device_diagnostics(hass, entry, Mock(identifiers=set())) == {}
+    for virtual in ("vhh", "integration"):
+        device = Mock(identifiers={(DOMAIN, virtual)})
+        assert await async_get_device_diagnostics(hass, entry, device) == {}
+    await dispatcher.disconnect()
@@ -4,11 +4,10 @@ import asyncio
 import importlib
 from ipaddress import ip_address
 import logging
-from unittest.mock import Mock, call
+from unittest.mock import AsyncMock, Mock, call
 
-from asyncmock import AsyncMock
 import pytest
-from zeroconf import ServiceInfo
+from zeroconf import ServiceInfo, ServiceStateChange
 
 from custom_components.powersensor import PowersensorDiscoveryService
 from custom_components.powersensor.const import (
@@ -40,6 +39,37 @@ def mock_service_info():
     )
 
 
+def _zc_returning(info) -> Mock:
+    """Create a mock zeroconf instance answering lookups with `info`."""
+    mock_zc = Mock()
+    mock_zc.async_get_service_info = AsyncMock(return_value=info)
+    return mock_zc
+
+
+async def _batch_done(service: PowersensorServiceListener) -> None:
+    """Wait for the batch of queued service changes to be handled."""
+    if service._batch is not None:
+        await service._batch
+
+
+async def _report(
+    hass: HomeAssistant,
+    service: PowersensorServiceListener,
+    zc,
+    info: ServiceInfo,
+    *state_changes: ServiceStateChange,
+) -> None:
+    """Report service changes as the browser would, and let the batch run."""
+    for state_change in state_changes:
+        service.async_on_service_state_change(
+            zeroconf=zc,
+            service_type=info.type,
+            name=info.name,
+            state_change=state_change,
+        )
+    await _batch_done(service)
+
+
 @pytest.mark.asyncio
 async def test_discovery_add(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
@@ -47,204 +77,195 @@ async def test_discovery_add(
     """Test adding of services during Zeroconf discovery.
 
     This test verifies that:
-    - The `add_service` method retrieves the correct service info from Zeroconf.
-    - The added service trigger
+    - Service changes are only queued when reported, and handled on the next loop iteration.
+    - The correct service info is looked up from Zeroconf.
+    - The added service triggers the add signal.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
     service = PowersensorServiceListener(hass)
-    mock_zc = Mock()
     zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
+    mock_zc = _zc_returning(zc_info)
 
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
+    service.async_on_service_state_change(
+        mock_zc, zc_info.type, zc_info.name, ServiceStateChange.Added
+    )
+    mock_zc.async_get_service_info.assert_not_called()
+    mock_send.assert_not_called()
 
-    await hass.async_block_till_done()
-    await hass.async_block_till_done()
+    await _batch_done(service)
 
+    mock_zc.async_get_service_info.assert_awaited_once_with(
+        zc_info.type, zc_info.name, timeout=3000
+    )
     mock_send.assert_called_once_with(
         ZEROCONF_ADD_PLUG_SIGNAL, service._plugs[zc_info.name]
     )
+    assert service._plugs[zc_info.name]["addresses"] == ["192.168.0.33"]
 
 
 @pytest.mark.asyncio
-async def test_discovery_add_and_remove(
+async def test_discovery_batch(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
 ) -> None:
-    """Test adding and removing of services during Zeroconf discovery.
+    """Test coalescing of a burst of service changes.
 
     This test verifies that:
-    - The `add_service` method retrieves the correct service info from Zeroconf.
-    - The added service triggers the correct signal when sent to Home Assistant.
-    - The `remove_service` method removes the service correctly after a short debounce period.
+    - Changes reported within the window are handled in a single batch.
+    - Only the last change of each service counts.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=3)
-    mock_zc = Mock()
+    service = PowersensorServiceListener(hass, coalesce_window=0.2)
     zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
+    mock_zc = _zc_returning(zc_info)
 
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
-
-    await hass.async_block_till_done()
-    await hass.async_block_till_done()
+    service.async_on_service_state_change(
+        mock_zc, zc_info.type, zc_info.name, ServiceStateChange.Added
+    )
+    await asyncio.sleep(0.1)
+    await _report(
+        hass,
+        service,
+        mock_zc,
+        zc_info,
+        ServiceStateChange.Updated,
+        ServiceStateChange.Removed,
+        ServiceStateChange.Updated,
+    )
 
+    mock_zc.async_get_service_info.assert_awaited_once()
     mock_send.assert_called_once_with(
         ZEROCONF_ADD_PLUG_SIGNAL, service._plugs[zc_info.name]
     )
 
-    # reset mock_send
-    mock_send = Mock()
-    monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # cache plug data for checking
-    data = service._plugs[zc_info.name].copy()
-
-    service.remove_service(mock_zc, zc_info.type, zc_info.name)
-
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
+    # A removal followed by a return within the window goes unnoticed
+    mock_send.reset_mock()
+    await _report(
+        hass,
+        service,
+        mock_zc,
+        zc_info,
+        ServiceStateChange.Removed,
+        ServiceStateChange.Added,
+    )
     mock_send.assert_not_called()
-    await asyncio.sleep(service._debounce_seconds + 1)
-
-    for _ in range(3):
-        await hass.async_block_till_done()
-    mock_send.assert_called_once_with(ZEROCONF_REMOVE_PLUG_SIGNAL, zc_info.name, data)
 
 
 @pytest.mark.asyncio
-async def test_discovery_remove_without_add(
+async def test_discovery_update_unchanged(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
 ) -> None:
-    """Test removing of services during Zeroconf discovery without adding first.
+    """Test repeated announcements of an unchanged service.
 
     This test verifies that:
-    - The `remove_service` method does not call get_service_info if no add occurred.
-    - The `remove_service` method triggers the correct signal when sent to Home Assistant after a short debounce period.
+    - Updates which don't change the endpoint aren't signalled.
+    - A change of the properties alone is signalled.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=3)
-    mock_zc = Mock()
+    service = PowersensorServiceListener(hass, coalesce_window=0)
     zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
+    mock_zc = _zc_returning(zc_info)
 
-    service.remove_service(mock_zc, zc_info.type, zc_info.name)
-    # mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_not_called()
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Added)
+    mock_send.reset_mock()
+    for _ in range(3):
+        await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Updated)
     mock_send.assert_not_called()
-    await asyncio.sleep(service._debounce_seconds + 1)
 
-    for _ in range(3):
-        await hass.async_block_till_done()
-    mock_send.assert_called_once_with(ZEROCONF_REMOVE_PLUG_SIGNAL, zc_info.name, None)
+    changed_info = ServiceInfo(
+        addresses=[ip_address("192.168.0.33").packed],
+        server=f"Powersensor-gateway-{MAC}-civet.local.",
+        name=f"Powersensor-gateway-{MAC}-civet._powersensor._udp.local.",
+        port=49476,
+        type_="_powersensor._udp.local.",
+        properties={
+            "version": "2",
+            "id": f"{MAC}",
+        },
+    )
+    mock_zc.async_get_service_info.return_value = changed_info
+    await _report(hass, service, mock_zc, changed_info, ServiceStateChange.Updated)
+    mock_send.assert_called_once_with(
+        ZEROCONF_UPDATE_PLUG_SIGNAL, service._plugs[zc_info.name]
+    )
+    assert service._plugs[zc_info.name]["properties"][b"version"] == b"2"
 
 
 @pytest.mark.asyncio
-async def test_discovery_remove_cancel(
+async def test_discovery_add_without_info(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
 ) -> None:
-    """Test cancelling of service removal during Zeroconf discovery.
+    """Test adding of services whose info can't be retrieved.
 
     This test verifies that:
-    - The `remove_service` method does not trigger dispatch when called after an add.
-    - The `get_service_info` method is called twice if add and remove are called in sequence.
+    - No signal is sent when the lookup fails.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=3)
+    service = PowersensorServiceListener(hass)
     mock_zc = Mock()
-    zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
+    mock_zc.async_get_service_info = AsyncMock(side_effect=TimeoutError)
 
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
+    await _report(hass, service, mock_zc, mock_service_info, ServiceStateChange.Added)
 
-    await hass.async_block_till_done()
-    await hass.async_block_till_done()
-
-    mock_send.assert_called_once_with(
-        ZEROCONF_ADD_PLUG_SIGNAL, service._plugs[zc_info.name]
-    )
-
-    # reset mock_send
-    mock_send = Mock()
-    monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-
-    # ensure we start from a known state
-    assert len(service._pending_removals) == 0
-
-    service.remove_service(mock_zc, zc_info.type, zc_info.name)
-
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
     mock_send.assert_not_called()
-    assert len(service._pending_removals) == 1
-
-    # give the remove a head start before triggering the cancellation
-    await asyncio.sleep(0.5)
-
-    # re-add the service, which should cancel the pending remove
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    assert mock_zc.get_service_info.call_count == 2
-    mock_zc.get_service_info.assert_has_calls(
-        [call(zc_info.type, zc_info.name), call(zc_info.type, zc_info.name)]
-    )
-
-    # let the removal task do its cancellation stuff
-    await asyncio.sleep(0.5)
-    assert len(service._pending_removals) == 0
+    assert service._plugs == {}
 
 
 @pytest.mark.asyncio
-async def test_discovery_add_and_two_remove_calls(
+async def test_discovery_add_and_remove(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
 ) -> None:
-    """Test adding and removing of services during Zeroconf discovery with multiple remove calls.
+    """Test adding and removing of services during Zeroconf discovery.
 
     This test verifies that:
-    - The `remove_service` method does not trigger dispatch when called immediately after an add.
-    - The `remove_service` method triggers the correct signal after a short debounce period.
-    - Multiple remove calls are properly handled by the service.
+    - No service info is looked up for a removal.
+    - The removal is signalled straight away, with the last known plug data.
+    - A service coming back afterwards is signalled as added again.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=2)
-    mock_zc = Mock()
+    service = PowersensorServiceListener(hass, coalesce_window=0)
     zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
+    mock_zc = _zc_returning(zc_info)
 
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Added)
+    mock_send.reset_mock()
+    # cache plug data for checking
+    data = service._plugs[zc_info.name].copy()
 
-    await hass.async_block_till_done()
-    await hass.async_block_till_done()
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Removed)
+    mock_zc.async_get_service_info.assert_awaited_once()
+    mock_send.assert_called_once_with(ZEROCONF_REMOVE_PLUG_SIGNAL, zc_info.name, data)
+    assert zc_info.name not in service._plugs
 
+    mock_send.reset_mock()
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Added)
     mock_send.assert_called_once_with(
         ZEROCONF_ADD_PLUG_SIGNAL, service._plugs[zc_info.name]
     )
 
-    # reset mock_send
+
+@pytest.mark.asyncio
+async def test_discovery_remove_without_add(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
+) -> None:
+    """Test removing of services during Zeroconf discovery without adding first.
+
+    This test verifies that:
+    - The removal is signalled without plug data.
+    """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # cache plug data for checking
-    data = service._plugs[zc_info.name].copy()
-
-    service.remove_service(mock_zc, zc_info.type, zc_info.name)
+    service = PowersensorServiceListener(hass, coalesce_window=0)
+    zc_info = mock_service_info
+    mock_zc = _zc_returning(zc_info)
 
-    # mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
-    mock_send.assert_not_called()
-    await asyncio.sleep(service._debounce_seconds // 2 + 1)
-    service.remove_service(mock_zc, zc_info.type, zc_info.name)
-    await asyncio.sleep(service._debounce_seconds // 2 + 1)
-    for _ in range(3):
-        await hass.async_block_till_done()
-    mock_send.assert_called_once_with(ZEROCONF_REMOVE_PLUG_SIGNAL, zc_info.name, data)
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Removed)
+    mock_zc.async_get_service_info.assert_not_called()
+    mock_send.assert_called_once_with(ZEROCONF_REMOVE_PLUG_SIGNAL, zc_info.name, None)
 
 
 @pytest.mark.asyncio
@@ -254,30 +275,18 @@ async def test_discovery_update(
     """Test updating of services during Zeroconf discovery.
 
     This test verifies that:
-    - The `update_service` method triggers the correct signal when called after an add.
+    - An update triggers the correct signal when called after an add.
     - Service properties are updated correctly with new values from Zeroconf.
     """
     mock_send = Mock()
     monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=2)
-    mock_zc = Mock()
+    service = PowersensorServiceListener(hass)
     zc_info = mock_service_info
-    mock_zc.get_service_info.return_value = zc_info
-
-    service.add_service(mock_zc, zc_info.type, zc_info.name)
-    mock_zc.get_service_info.assert_called_once_with(zc_info.type, zc_info.name)
+    mock_zc = _zc_returning(zc_info)
 
-    await hass.async_block_till_done()
-    await hass.async_block_till_done()
-
-    mock_send.assert_called_once_with(
-        ZEROCONF_ADD_PLUG_SIGNAL, service._plugs[zc_info.name]
-    )
+    await _report(hass, service, mock_zc, zc_info, ServiceStateChange.Added)
+    mock_send.reset_mock()
 
-    # reset mock_send
-    mock_send = Mock()
-    monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
     updated_service_info = ServiceInfo(
         addresses=[ip_address("192.168.0.34").packed],
         server=f"Powersensor-gateway-{MAC}-civet.local.",
@@ -289,12 +298,10 @@ async def test_discovery_update(
             "id": f"{MAC}",
         },
     )
-    mock_zc.get_service_info.return_value = updated_service_info
-    service.update_service(
-        mock_zc, updated_service_info.type, updated_service_info.name
+    mock_zc.async_get_service_info.return_value = updated_service_info
+    await _report(
+        hass, service, mock_zc, updated_service_info, ServiceStateChange.Updated
     )
-    for _ in range(3):
-        await hass.async_block_till_done()
     mock_send.assert_called_once_with(
         ZEROCONF_UPDATE_PLUG_SIGNAL, service._plugs[zc_info.name]
     )
@@ -303,6 +310,32 @@ async def test_discovery_update(
     assert service._plugs[zc_info.name]["addresses"][0] == "192.168.0.34"
 
 
+@pytest.mark.asyncio
+async def test_discovery_listener_stop(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, mock_service_info
+) -> None:
+    """Test stopping of the listener.
+
+    This test verifies that:
+    - Queued changes are dropped.
+    """
+    mock_send = Mock()
+    monkeypatch.setattr(PowersensorServiceListener, "dispatch", mock_send)
+    service = PowersensorServiceListener(hass)
+    zc_info = mock_service_info
+    mock_zc = _zc_returning(zc_info)
+
+    service.async_on_service_state_change(
+        mock_zc, zc_info.type, zc_info.name, ServiceStateChange.Added
+    )
+    await service.async_stop()
+    await hass.async_block_till_done()
+
+    mock_zc.async_get_service_info.assert_not_called()
+    mock_send.assert_not_called()
+    assert service._batch is None
+
+
 @pytest.mark.asyncio
 async def test_discovery_dispatcher(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
@@ -317,7 +350,7 @@ async def test_discovery_dispatcher(
     )
     mock_send = Mock()
     monkeypatch.setattr(mod, "async_dispatcher_send", mock_send)
-    service = mod.PowersensorServiceListener(hass, debounce_timeout=4)
+    service = mod.PowersensorServiceListener(hass)
     service.dispatch("mock_signal", 1, 2, 3, 4)
     mock_send.assert_called_once_with(hass, "mock_signal", 1, 2, 3, 4)
 
@@ -329,11 +362,10 @@ async def test_discovery_get_service_info(
     """Test retrieval of service info during Zeroconf discovery.
 
     This test verifies that:
-    - The `_async_get_service_info` method correctly retrieves and stores service info.
-    - Service discoveries are properly filtered by name.
+    - The `_async_get_service_info` method returns the service info.
+    - Expected lookup errors result in no info.
     """
-    # set debounce timeout very short for testing
-    service = PowersensorServiceListener(hass, debounce_timeout=5)
+    service = PowersensorServiceListener(hass)
     mock_zc = AsyncMock()
     zc_info = mock_service_info
 
@@ -344,13 +376,14 @@ async def test_discovery_get_service_info(
 
     mock_zc.async_get_service_info.side_effect = custom_call_rules
 
-    await service._async_get_service_info(mock_zc, zc_info.type, zc_info.name)
-
-    assert zc_info.name in service._discoveries
-    assert service._discoveries[zc_info.name] == zc_info
-
-    await service._async_get_service_info(mock_zc, zc_info.type, "garbage_name")
-    assert "garbage_name" not in service._discoveries
+    assert (
+        await service._async_get_service_info(mock_zc, zc_info.type, zc_info.name)
+        == zc_info
+    )
+    assert (
+        await service._async_get_service_info(mock_zc, zc_info.type, "garbage_name")
+        is None
+    )
 
 
 @pytest.mark.asyncio
@@ -372,18 +405,53 @@ async def test_discovery_service_early_exit(
 
 
 @pytest.mark.asyncio
-async def test_discovery_service_stop_with_canceled_task(
+async def test_discovery_service_start_stop(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test starting and stopping of the discovery service.
+
+    This test verifies that:
+    - The `start` method browses with the listener's handler.
+    - The `stop` method cancels the browser and stops the listener.
+    """
+    mod = importlib.import_module(
+        "custom_components.powersensor.PowersensorDiscoveryService"
+    )
+    browser = Mock()
+    browser.async_cancel = AsyncMock()
+    mock_browser = Mock(return_value=browser)
+    monkeypatch.setattr(mod, "AsyncServiceBrowser", mock_browser)
+    service = PowersensorDiscoveryService(hass)
+
+    await service.start()
+    assert service.running
+    listener = service.listener
+    assert listener is not None
+    mock_browser.assert_called_once_with(
+        None,
+        "_powersensor._tcp.local.",
+        handlers=[listener.async_on_service_state_change],
+    )
+
+    await service.stop()
+    browser.async_cancel.assert_awaited_once()
+    assert not service.running
+    assert service.browser is None
+    assert service.listener is None
+
+
+@pytest.mark.asyncio
+async def test_discovery_service_stop_with_zc(
     hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    """Test stopping of the discovery service with an active task.
+    """Test stopping of the discovery service holding a zeroconf instance.
 
     This test verifies that:
-    - The `stop` method correctly cancels and stops the running task.
+    - The `stop` method releases the zeroconf instance.
     """
     service = PowersensorDiscoveryService(hass)
     service.running = True
     service.zc = Mock()
-    service._task = asyncio.create_task(asyncio.sleep(25))
     await service.stop()
     assert service.zc is None
     assert not service.running
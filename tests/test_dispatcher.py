@@ -12,9 +12,9 @@ from custom_components.powersensor.const import (
     CFG_ROLES,
     CREATE_PLUG_SIGNAL,
     CREATE_SENSOR_SIGNAL,
-    DATA_UPDATE_SIGNAL_FMT_MAC_EVENT,
     ROLE_UPDATE_SIGNAL,
 )
+from custom_components.powersensor.PowersensorDeviceRouter import async_get_router
 from homeassistant.core import HomeAssistant
 
 MAC = "a4cf1218f158"
@@ -24,7 +24,9 @@ logging.getLogger().setLevel(logging.CRITICAL)
 
 
 @pytest.fixture
-def monkey_patched_dispatcher(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch):
+async def monkey_patched_dispatcher(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+):
     """Return a PowersensorMessageDispatcher instance with its dependencies monkey-patched.
 
     This fixture sets up a dispatcher with a mock dispatcher connect and send function,
@@ -32,7 +34,7 @@ def monkey_patched_dispatcher(hass: HomeAssistant, monkeypatch: pytest.MonkeyPat
     the Home Assistant instance is also patched to create tasks synchronously.
     """
 
-    def create_task(coroutine, name=None):
+    def create_task(coroutine, name=None, eager_start=True):
         return asyncio.create_task(coroutine)
 
     monkeypatch.setattr(hass, "async_create_background_task", create_task)
@@ -55,13 +57,14 @@ def monkey_patched_dispatcher(hass: HomeAssistant, monkeypatch: pytest.MonkeyPat
     entry = Mock()
     entry.data = {CFG_ROLES: {}}
     dispatcher = powersensor_dispatcher_module.PowersensorMessageDispatcher(
-        hass, entry, vhh, debounce_timeout=2
+        hass, entry, vhh, debounce_timeout=2, debounce_bounds=(1, 8)
     )
     if not hasattr(dispatcher, "dispatch_send_reference"):
         object.__setattr__(dispatcher, "dispatch_send_reference", {})
     dispatcher.dispatch_send_reference = async_dispatcher_send
 
-    return dispatcher
+    yield dispatcher
+    await dispatcher.disconnect()
 
 
 @pytest.fixture
@@ -216,6 +219,44 @@ async def test_dispatcher_monitor_plug_queue_error_handling(
     assert not dispatcher.plugs
 
 
+@pytest.mark.asyncio
+async def test_dispatcher_shared_plug_api_unsupported(
+    monkeypatch: pytest.MonkeyPatch, monkey_patched_dispatcher, network_info
+) -> None:
+    """Test that plugs fall back to their own sockets when sharing one fails.
+
+    This test verifies that:
+    - The plug queue carries on, with plugs getting a plain PlugApi.
+    - Sharing isn't attempted again for later plugs.
+    """
+    dispatcher = monkey_patched_dispatcher
+    powersensor_dispatcher_module = importlib.import_module(
+        "custom_components.powersensor.PowersensorMessageDispatcher"
+    )
+    shared_plug_api = Mock(side_effect=TypeError("Unsupported PlugApi"))
+    monkeypatch.setattr(
+        powersensor_dispatcher_module, "SharedUdpPlugApi", shared_plug_api
+    )
+    dispatcher._shared_transport = Mock()
+
+    other_mac = "a4cf1218f159"
+    other_info = {**network_info, "mac": other_mac, "name": "other"}
+    dispatcher._known_plugs.update((MAC, other_mac))
+    await dispatcher.enqueue_plug_for_adding(network_info)
+    await dispatcher.enqueue_plug_for_adding(other_info)
+    await dispatcher.process_plug_queue()
+    for _ in range(3):
+        await dispatcher._hass.async_block_till_done()
+
+    assert set(dispatcher.plugs) == {MAC, other_mac}
+    assert all(
+        type(api) is powersensor_dispatcher_module.PlugApi
+        for api in dispatcher.plugs.values()
+    )
+    assert shared_plug_api.call_count == 1
+    assert dispatcher._shared_transport is None
+
+
 @pytest.mark.asyncio
 async def test_dispatcher_handle_plug_exception(
     monkeypatch: pytest.MonkeyPatch, monkey_patched_dispatcher, network_info
@@ -224,8 +265,8 @@ async def test_dispatcher_handle_plug_exception(
 
     This test verifies that:
     - The `handle_exception` method does not crash when passed an exception.
+    - A plug exception has the plug's connection re-established.
     """
-    # for now, I pointlessly verify this does not crash
     powersensor_dispatcher_module = importlib.import_module(
         "custom_components.powersensor.PowersensorMessageDispatcher"
     )
@@ -233,6 +274,12 @@ async def test_dispatcher_handle_plug_exception(
         "exception", NotImplementedError
     )
 
+    dispatcher = monkey_patched_dispatcher
+    report_failure = Mock()
+    monkeypatch.setattr(dispatcher.connections, "report_failure", report_failure)
+    await dispatcher._handle_plug_exception(MAC, "exception", OSError("reset"))
+    report_failure.assert_called_once_with(MAC, "exception: reset")
+
 
 @pytest.mark.asyncio
 async def test_dispatcher_removal(
@@ -244,61 +291,139 @@ async def test_dispatcher_removal(
     """Test removal of plugs from Home Assistant via the dispatcher.
 
     This test verifies that:
-    - A plug can be removed when not yet added.
-    - A plug can be removed after being added.
-    - Pending removal tasks can be cancelled and removed.
-    - Interrupting a pending removal task prevents it from completing.
+    - Removing a plug which was never added is ignored.
+    - A plug which has already gone silent is removed straight away.
+    - A plug which is still alive is only removed after the debounce time.
+    - Pending removals can be cancelled, all or just one.
+    - A stable plug failing while its removal is pending is removed straight away.
+    - Plugs coming back after going quiet or from zeroconf count as flapping,
+      and flapping plugs which go quiet are kept for their whole debounce.
     """
     dispatcher = monkey_patched_dispatcher
+    hass = dispatcher._hass
+
+    async def goodbye():
+        await dispatcher._schedule_plug_removal(
+            network_info["name"], zeroconf_discovery_info
+        )
+        await hass.async_block_till_done()
 
     # test removal of plug not added
-    await dispatcher._schedule_plug_removal(
-        network_info["name"], zeroconf_discovery_info
-    )
-    await asyncio.sleep(dispatcher._debounce_seconds + 1)
-    for _ in range(3):
-        await dispatcher._hass.async_block_till_done()
+    await goodbye()
+    assert MAC not in dispatcher._pending_removals
 
+    # a silent plug goes straight away
+    await follow_normal_add_sequence(dispatcher, network_info)
+    await goodbye()
     assert MAC not in dispatcher.plugs
+    assert network_info["name"] not in dispatcher._known_plug_names
 
+    # a live plug is given the debounce time
     await follow_normal_add_sequence(dispatcher, network_info)
+    dispatcher._liveness.touch(MAC)
+    await goodbye()
+    assert MAC in dispatcher._pending_removals
+    await dispatcher.stop_pending_removal_tasks()
+    await asyncio.sleep(dispatcher._flaps.debounce(MAC) + 0.5)
+    await hass.async_block_till_done()
+    # the removal should not have happened if it was interrupted
+    assert MAC in dispatcher.plugs
 
-    await dispatcher._schedule_plug_removal(
-        network_info["name"], zeroconf_discovery_info
-    )
-    await asyncio.sleep(dispatcher._debounce_seconds + 1)
-    for _ in range(3):
-        await dispatcher._hass.async_block_till_done()
+    # cancel just one mac, which a plug still talking after its goodbye does
+    # without counting as flapping
+    await goodbye()
+    await goodbye()
+    await dispatcher.cancel_any_pending_removal(MAC, "test-cancellation")
+    assert MAC not in dispatcher._pending_removals
+    assert dispatcher.device_as_diagnostics(MAC)["flaps"]["flaps"] == 0
+
+    # a stable plug failing while gone goes straight away
+    await goodbye()
+    await dispatcher._handle_plug_exception(MAC, "exception", OSError("reset"))
+    await hass.async_block_till_done()
     assert MAC not in dispatcher.plugs
+    assert MAC not in dispatcher._pending_removals
 
+    # the debounce time running out
     await follow_normal_add_sequence(dispatcher, network_info)
-    assert MAC in dispatcher.plugs
-    await dispatcher._schedule_plug_removal(
-        network_info["name"], zeroconf_discovery_info
-    )
+    dispatcher._liveness.touch(MAC)
+    await goodbye()
+    await asyncio.sleep(dispatcher._flaps.debounce(MAC) + 0.5)
+    await hass.async_block_till_done()
+    assert MAC not in dispatcher.plugs
 
-    await asyncio.sleep(dispatcher._debounce_seconds // 2)
-    await dispatcher.stop_pending_removal_tasks()
-    await asyncio.sleep(dispatcher._debounce_seconds // 2 + 1)
-    for _ in range(3):
-        await dispatcher._hass.async_block_till_done()
-    # the removal should not have happened if it was interrupted
+    # reappearing in zeroconf while gone counts as flapping, so the plug gets
+    # more time from now on
+    await follow_normal_add_sequence(dispatcher, network_info)
+    dispatcher._liveness.touch(MAC)
+    await goodbye()
+    await dispatcher.cancel_any_pending_removal(MAC, "test", rediscovered=True)
+    assert dispatcher.device_as_diagnostics(MAC)["flaps"]["flaps"] == 1
+    assert dispatcher.as_diagnostics()["flaps"][MAC]["removal_debounce"] > 1
+
+    # a flapping plug failing, or already silent, while gone is given its
+    # debounce, and coming back counts as flapping again
+    await goodbye()
+    await dispatcher._handle_plug_exception(MAC, "exception", OSError("reset"))
+    await hass.async_block_till_done()
     assert MAC in dispatcher.plugs
+    await dispatcher.cancel_any_pending_removal(MAC, "test")
+    assert dispatcher.device_as_diagnostics(MAC)["flaps"]["flaps"] == 2
+    dispatcher._liveness._last_seen.pop(MAC, None)
+    assert not dispatcher._liveness.is_alive(MAC)
+    await goodbye()
+    assert MAC in dispatcher._pending_removals
+    assert MAC in dispatcher.plugs
+    await dispatcher.stop_pending_removal_tasks()
+
+    # a removal becoming due for a plug which is already gone is harmless
+    dispatcher._remove_plug(MAC)
+    dispatcher._remove_plug(MAC)
 
-    # cancel just one mac
-    await dispatcher._schedule_plug_removal(
-        network_info["name"], zeroconf_discovery_info
+
+@pytest.mark.asyncio
+async def test_dispatcher_flapping_plug_kept_while_quiet(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a flapping plug going quiet after its goodbye isn't removed early.
+
+    This test verifies that:
+    - Going silent for longer than the liveness timeout doesn't cut short the
+      flap-derived debounce of a plug which keeps flapping.
+    - Coming back within the debounce counts as another flap.
+    """
+    liveness_module = importlib.import_module(
+        "custom_components.powersensor.PowersensorLivenessTracker"
     )
-    await dispatcher._schedule_plug_removal(
-        network_info["name"], zeroconf_discovery_info
+    now = 1000.0
+    monkeypatch.setattr(liveness_module, "monotonic", lambda: now)
+    dispatcher_module = importlib.import_module(
+        "custom_components.powersensor.PowersensorMessageDispatcher"
     )
-    await asyncio.sleep(dispatcher._debounce_seconds // 2)
-    await dispatcher.cancel_any_pending_removal(MAC, "test-cancellation")
-    await asyncio.sleep(dispatcher._debounce_seconds // 2 + 1)
-    for _ in range(3):
-        await dispatcher._hass.async_block_till_done()
-    # the removal should not have happened if it was interrupted
+    entry = Mock()
+    entry.data = {CFG_ROLES: {}}
+    dispatcher = dispatcher_module.PowersensorMessageDispatcher(
+        hass, entry, dispatcher_module.VirtualHousehold(False)
+    )
+    monkeypatch.setattr(dispatcher.connections, "request_connect", Mock())
+    name = f"Powersensor-gateway-{MAC}-civet._powersensor._udp.local."
+    dispatcher._create_api(MAC, ip_address("192.168.0.33"), 49476, name)
+    for _ in range(4):
+        dispatcher._flaps.record_flap(MAC)
+    debounce = dispatcher._flaps.debounce(MAC)
+    assert debounce > 60
+
+    dispatcher._liveness.touch(MAC)
+    await dispatcher._schedule_plug_removal(name, {})
+    now += 61
+    dispatcher._liveness._async_sweep()
+    await hass.async_block_till_done()
     assert MAC in dispatcher.plugs
+    assert MAC in dispatcher._pending_removals
+
+    await dispatcher.cancel_any_pending_removal(MAC, "test")
+    assert dispatcher.device_as_diagnostics(MAC)["flaps"]["flaps"] == 5
+    await dispatcher.disconnect()
 
 
 @pytest.mark.asyncio
@@ -310,6 +435,7 @@ async def test_dispatcher_handle_relaying_for(
     This test verifies that:
     - Relay events are ignored when no device type or mac is specified.
     - Relay events trigger dispatches with the correct signal and arguments.
+    - Only devices relayed as sensors are remembered as sensors.
     """
     dispatcher = monkey_patched_dispatcher
     await dispatcher.handle_relaying_for(
@@ -324,9 +450,11 @@ async def test_dispatcher_handle_relaying_for(
         "test-event", {"mac": MAC, "device_type": "plug"}
     )
     assert dispatcher.dispatch_send_reference.call_count == 0
+    assert dispatcher.roles.sensors == frozenset()
     await dispatcher.handle_relaying_for(
         "test-event", {"mac": MAC, "device_type": "sensor", "role": "house-net"}
     )
+    assert dispatcher.roles.sensors == {MAC}
     assert dispatcher.dispatch_send_reference.call_count == 1
     assert dispatcher.dispatch_send_reference.call_args_list[0] == call(
         dispatcher._hass, CREATE_SENSOR_SIGNAL, MAC, "house-net"
@@ -374,7 +502,7 @@ async def test_dispatcher_handle_relaying_for_unknown_role_with_stored_role(
       role gets said configured role applied after creation
     """
     dispatcher = monkey_patched_dispatcher
-    dispatcher._entry.data[CFG_ROLES][MAC] = 'house-net'
+    dispatcher.roles.update(MAC, 'house-net')
     await dispatcher.handle_relaying_for("test-event", {'mac': MAC, 'device_type': 'sensor', 'role': 'unknown'})
     assert dispatcher.dispatch_send_reference.call_count == 2
     assert dispatcher.dispatch_send_reference.call_args_list[0] == call(dispatcher._hass, CREATE_SENSOR_SIGNAL, MAC, None)
@@ -388,49 +516,57 @@ async def test_dispatcher_handle_message(
     """Test handling of messages by the dispatcher.
 
     This test verifies that:
-    - The `handle_message` method sends the correct signals when receiving sensor data.
+    - The `handle_message` method sends the role update signal when receiving sensor data.
+    - The message and a synthesised role message are routed to the device's entities.
     """
     dispatcher = monkey_patched_dispatcher
+    route = Mock()
+    monkeypatch.setattr(dispatcher._router, "route", route)
     role = "house-net"
     event = "average_power"
     message = {"mac": MAC, "device_type": "sensor", "role": role}
     await dispatcher.handle_message(event, message)
-    assert dispatcher.dispatch_send_reference.call_count == 3
+    assert dispatcher.dispatch_send_reference.call_count == 1
     assert dispatcher.dispatch_send_reference.call_args_list[0] == call(
         dispatcher._hass, ROLE_UPDATE_SIGNAL, MAC, role
     )
-    assert dispatcher.dispatch_send_reference.call_args_list[1] == call(
-        dispatcher._hass,
-        DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (MAC, event),
-        event,
-        message,
-    )
-    assert dispatcher.dispatch_send_reference.call_args_list[2] == call(
-        dispatcher._hass,
-        DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (MAC, "role"),
-        "role",
-        {"role": role},
-    )
+    route.assert_called_once_with(MAC, (event, message), ("role", {"role": role}))
+
     event = "summation_energy"
     await dispatcher.handle_message(event, message)
-    assert dispatcher.dispatch_send_reference.call_count == 6
-    assert dispatcher.dispatch_send_reference.call_args_list[3] == call(
+    assert dispatcher.dispatch_send_reference.call_count == 2
+    assert dispatcher.dispatch_send_reference.call_args_list[1] == call(
         dispatcher._hass, ROLE_UPDATE_SIGNAL, MAC, role
     )
-    assert dispatcher.dispatch_send_reference.call_args_list[4] == call(
-        dispatcher._hass,
-        DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (MAC, event),
-        event,
-        message,
-    )
-    assert dispatcher.dispatch_send_reference.call_args_list[5] == call(
-        dispatcher._hass,
-        DATA_UPDATE_SIGNAL_FMT_MAC_EVENT % (MAC, "role"),
-        "role",
-        {"role": role},
+    assert route.call_count == 2
+    assert route.call_args_list[1] == call(
+        MAC, (event, message), ("role", {"role": role})
     )
 
 
+@pytest.mark.asyncio
+async def test_dispatcher_post_message(
+    monkeypatch: pytest.MonkeyPatch, monkey_patched_dispatcher
+) -> None:
+    """Test that plug messages are handled in batches, latest value first.
+
+    This test verifies that:
+    - Posting a message doesn't handle it straight away.
+    - Only the latest message of a device and event is handled.
+    """
+    dispatcher = monkey_patched_dispatcher
+    route = Mock()
+    monkeypatch.setattr(dispatcher._router, "route", route)
+    for watts in (1, 2):
+        await dispatcher._post_message(
+            "average_power", {"mac": MAC, "device_type": "plug", "watts": watts}
+        )
+    route.assert_not_called()
+    await dispatcher._hass.async_block_till_done(wait_background_tasks=True)
+    route.assert_called_once()
+    assert route.call_args.args[1][1]["watts"] == 2
+
+
 @pytest.mark.asyncio
 async def test_dispatcher_acknowledge_added_to_homeassistant(
     monkeypatch: pytest.MonkeyPatch, monkey_patched_dispatcher
@@ -509,3 +645,66 @@ async def test_dispatcher_plug_updated(
     await dispatcher.plugs[MAC].disconnect()
     del dispatcher.plugs[MAC]
     await dispatcher._plug_updated(zeroconf_discovery_info)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_plug_added_when_connected(
+    monkey_patched_dispatcher, network_info, zeroconf_discovery_info
+) -> None:
+    """Test zeroconf announcing a plug which is already connected.
+
+    This test verifies that:
+    - A plug connected at an unchanged address is left alone.
+    - A plug connected at a stale address, e.g. from the endpoint cache, is
+      reconnected at its new address.
+    - No new entities are requested in either case.
+    """
+    dispatcher = monkey_patched_dispatcher
+    await follow_normal_add_sequence(dispatcher, network_info)
+    api = dispatcher.plugs[MAC]
+
+    await dispatcher._plug_added(zeroconf_discovery_info)
+    assert dispatcher.plugs[MAC] is api
+
+    zeroconf_discovery_info["addresses"] = [ip_address("192.168.0.34")]
+    await dispatcher._plug_added(zeroconf_discovery_info)
+    assert dispatcher.plugs[MAC] is not api
+    assert dispatcher.plugs[MAC].ip_address == ip_address("192.168.0.34")
+    assert dispatcher.dispatch_send_reference.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_plug_events_follow_entities(
+    monkey_patched_dispatcher, network_info
+) -> None:
+    """Test that plugs are only asked for events entities listen to.
+
+    This test verifies that:
+    - New plugs are only subscribed to the base events.
+    - Plugs are subscribed to an event while an entity listens to it, and
+      unsubscribed again once none does.
+    - Routes for events plugs don't emit are ignored.
+    """
+    dispatcher = monkey_patched_dispatcher
+    await follow_normal_add_sequence(dispatcher, network_info)
+    api = dispatcher.plugs[MAC]
+
+    def subscribed():
+        return {
+            event
+            for event, listeners in api._listeners.items()
+            if dispatcher._post_message in listeners
+        }
+
+    assert subscribed() == {"average_power", "summation_energy"}
+
+    router = async_get_router(dispatcher._hass)
+    unsub_role = router.subscribe(MAC, "role", Mock())
+    unsub_battery = router.subscribe(MAC, "battery_level", Mock())
+    unsub_power = router.subscribe(MAC, "average_power", Mock())
+    assert subscribed() == {"average_power", "summation_energy", "battery_level"}
+
+    unsub_battery()
+    unsub_power()
+    unsub_role()
+    assert subscribed() == {"average_power", "summation_energy"}
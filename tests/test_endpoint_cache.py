@@ -0,0 +1,147 @@
+"""Tests related to the persisted cache of plug endpoints."""
+
+from datetime import timedelta
+import importlib
+from time import time
+from typing import Any
+from unittest.mock import Mock
+
+from powersensor_local import VirtualHousehold
+import pytest
+
+from custom_components.powersensor.const import (
+    CFG_ROLES,
+    DOMAIN,
+    ENDPOINT_CACHE_MAX_AGE,
+)
+from custom_components.powersensor.PowersensorEndpointCache import (
+    PowersensorEndpointCache,
+    async_remove_endpoint_cache,
+)
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+KEY = f"{DOMAIN}.test.endpoints"
+NAME = f"Powersensor-gateway-{MAC}-civet._powersensor._udp.local."
+
+
+def stored(endpoints: dict) -> dict[str, Any]:
+    """Return storage contents holding the given endpoints."""
+    return {"version": 1, "minor_version": 1, "key": KEY, "data": endpoints}
+
+
+@pytest.mark.asyncio
+async def test_endpoint_cache_load(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that loading the cache forgets plugs not seen for a long time."""
+    cache = PowersensorEndpointCache(hass, "test")
+    assert await cache.async_load() == {}
+
+    recent = {"mac": MAC, "host": "192.168.0.33", "port": 49476, "name": NAME}
+    recent["last_seen"] = time()
+    old = {**recent, "mac": OTHER_MAC, "last_seen": time() - ENDPOINT_CACHE_MAX_AGE - 1}
+    hass_storage[KEY] = stored({MAC: recent, OTHER_MAC: old})
+    assert await cache.async_load() == {MAC: recent}
+
+
+@pytest.mark.asyncio
+async def test_endpoint_cache_batches_writes(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that a burst of updates is written out once, after a delay."""
+    cache = PowersensorEndpointCache(hass, "test")
+    await cache.async_load()
+    cache.update(MAC, "192.168.0.33", 49476, NAME)
+    cache.update(MAC, "192.168.0.34", 49476, NAME)
+    cache.update(OTHER_MAC, "192.168.0.35", 49476, "other")
+    assert KEY not in hass_storage
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    data = hass_storage[KEY]["data"]
+    assert data[MAC]["host"] == "192.168.0.34"
+    assert data[OTHER_MAC]["name"] == "other"
+
+    # What is written is a snapshot, unaffected by later updates
+    cache.update(MAC, "192.168.0.36", 49476, NAME)
+    await cache.async_stop()
+    written = hass_storage[KEY]["data"]
+    cache.update(MAC, "192.168.0.37", 49476, NAME)
+    assert written[MAC]["host"] == "192.168.0.36"
+    await cache.async_stop()
+
+    # Nothing left to write
+    hass_storage.pop(KEY)
+    await cache.async_stop()
+    assert KEY not in hass_storage
+
+    await async_remove_endpoint_cache(hass, "test")
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_updates_endpoint_cache(
+    hass: HomeAssistant, hass_storage: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that connecting to a plug updates the cache, written out on stop."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}}, entry_id="test")
+    cache = PowersensorEndpointCache(hass, "test")
+    dispatcher = PowersensorMessageDispatcher(
+        hass, entry, VirtualHousehold(False), endpoints=cache
+    )
+    monkeypatch.setattr(dispatcher.connections, "request_connect", Mock())
+    dispatcher._create_api(MAC, "192.168.0.33", 49476, NAME)
+    await dispatcher.disconnect()
+
+    endpoint = hass_storage[KEY]["data"][MAC]
+    assert endpoint["host"] == "192.168.0.33"
+    assert endpoint["name"] == NAME
+
+
+@pytest.mark.asyncio
+async def test_endpoint_cache_keeps_connected_plugs(
+    hass: HomeAssistant, hass_storage: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that plugs staying connected past the max age aren't forgotten.
+
+    This test verifies that:
+    - Messages from a plug only refresh its last seen time about once a day.
+    - A plug connected for longer than the max age is still loaded on restart.
+    """
+    mod = importlib.import_module(
+        "custom_components.powersensor.PowersensorEndpointCache"
+    )
+    started = time()
+    monkeypatch.setattr(mod, "time", lambda: started)
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}}, entry_id="test")
+    cache = PowersensorEndpointCache(hass, "test")
+    dispatcher = PowersensorMessageDispatcher(
+        hass, entry, VirtualHousehold(False), endpoints=cache
+    )
+    monkeypatch.setattr(dispatcher.connections, "request_connect", Mock())
+    dispatcher._create_api(MAC, "192.168.0.33", 49476, NAME)
+    await cache.async_stop()
+
+    message = {"mac": MAC, "device_type": "plug", "watts": 1}
+    hass_storage.pop(KEY)
+    await dispatcher.handle_message("average_power", message)
+    await cache.async_stop()
+    assert KEY not in hass_storage
+
+    for days in range(1, 32):
+        monkeypatch.setattr(mod, "time", lambda days=days: started + days * 86400)
+        await dispatcher.handle_message("average_power", message)
+    cache.touch(OTHER_MAC)
+    await dispatcher.disconnect()
+    assert hass_storage[KEY]["data"][MAC]["last_seen"] == started + 31 * 86400
+    assert list(await PowersensorEndpointCache(hass, "test").async_load()) == [MAC]
@@ -4,15 +4,36 @@ This module contains unit tests to verify the functionality of the power sensor
 component, including setup, migration, and entry management.
 """
 
+from ipaddress import IPv4Network
+from time import time
+from unittest.mock import AsyncMock, Mock, call
+
 import pytest
 
 from custom_components.powersensor import (
+    _async_update_listener,
     async_migrate_entry,
+    async_remove_entry,
     async_setup_entry,
     async_unload_entry,
 )
 from custom_components.powersensor.config_flow import PowersensorConfigFlow
-from custom_components.powersensor.const import DOMAIN
+from custom_components.powersensor.const import (
+    CFG_CONNECT_CONCURRENCY,
+    CFG_PROBE_HOSTS,
+    CFG_RECORD_MESSAGES,
+    CFG_SHARED_SOCKET,
+    DOMAIN,
+    RT_DISPATCHER,
+    RT_OPTIONS,
+    RT_PROBE,
+)
+from custom_components.powersensor.PowersensorProbeDiscovery import (
+    PowersensorProbeDiscovery,
+)
+from custom_components.powersensor.PowersensorSharedUdpTransport import (
+    async_get_shared_udp_transport,
+)
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.loader import (
@@ -104,6 +125,86 @@ async def test_setup_unload_and_reload_entry(
     assert def_config_entry.entry_id not in hass.data[DOMAIN]
 
 
+async def test_setup_with_recording(
+    hass: HomeAssistant, hass_data, def_config_entry
+) -> None:
+    """Test that enabling recording gives the dispatcher a recorder."""
+    def_config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(
+        def_config_entry, options={CFG_RECORD_MESSAGES: True}
+    )
+    assert await async_setup_entry(hass, def_config_entry)
+    recorder = def_config_entry.runtime_data[RT_DISPATCHER]._recorder
+    assert recorder is not None
+    assert recorder.path == hass.config.path("powersensor_capture.bin")
+    assert await async_unload_entry(hass, def_config_entry)
+
+
+async def test_setup_with_shared_socket(
+    hass: HomeAssistant, hass_data, def_config_entry
+) -> None:
+    """Test that the shared socket option connects plugs over the shared socket."""
+    def_config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(
+        def_config_entry, options={CFG_SHARED_SOCKET: True}
+    )
+    assert await async_setup_entry(hass, def_config_entry)
+    dispatcher = def_config_entry.runtime_data[RT_DISPATCHER]
+    assert dispatcher._shared_transport is async_get_shared_udp_transport(hass)
+    assert await async_unload_entry(hass, def_config_entry)
+
+
+async def test_setup_with_probe_hosts(
+    hass: HomeAssistant, hass_data, def_config_entry, monkeypatch
+) -> None:
+    """Test that configured probe hosts are probed for plugs, until unloaded."""
+    start = Mock()
+    stop = AsyncMock()
+    monkeypatch.setattr(PowersensorProbeDiscovery, "start", start)
+    monkeypatch.setattr(PowersensorProbeDiscovery, "async_stop", stop)
+    def_config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(
+        def_config_entry, options={CFG_PROBE_HOSTS: "192.168.20.0/24"}
+    )
+    assert await async_setup_entry(hass, def_config_entry)
+    probe = def_config_entry.runtime_data[RT_PROBE]
+    assert probe._networks == [IPv4Network("192.168.20.0/24")]
+    start.assert_called_once()
+    assert await async_unload_entry(hass, def_config_entry)
+    stop.assert_awaited_once()
+
+
+async def test_setup_from_endpoint_cache(
+    hass: HomeAssistant, hass_data, hass_storage, def_config_entry, monkeypatch
+) -> None:
+    """Test that plugs are queued from the endpoint cache, which overrides entry data."""
+    cached = {
+        "mac": "0123456789abcd",
+        "host": "192.168.0.34",
+        "port": 49476,
+        "name": "test-plug",
+        "last_seen": time(),
+    }
+    later = {**cached, "mac": "0123456789abce", "name": "later-plug"}
+    hass_storage["powersensor.test.endpoints"] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": "powersensor.test.endpoints",
+        "data": {cached["mac"]: cached, later["mac"]: later},
+    }
+    enqueue = AsyncMock()
+    monkeypatch.setattr(
+        "custom_components.powersensor.PowersensorMessageDispatcher.enqueue_plug_for_adding",
+        enqueue,
+    )
+    assert await async_setup_entry(hass, def_config_entry)
+    assert enqueue.await_args_list == [call(cached), call(later)]
+    assert await async_unload_entry(hass, def_config_entry)
+
+    await async_remove_entry(hass, def_config_entry)
+    await hass.async_block_till_done()
+    assert "powersensor.test.endpoints" not in hass_storage
+
 
 async def test_setup_exception(
     hass: HomeAssistant, hass_data, def_config_entry, monkeypatch
@@ -122,3 +223,23 @@ async def test_setup_exception(
         assert await async_setup_entry(hass, def_config_entry)
 
     assert ERRKEY in str(excinfo.value)
+
+
+async def test_options_update_reloads(
+    hass: HomeAssistant, def_config_entry, monkeypatch
+) -> None:
+    """Test that only option changes reload the entry."""
+    reload = AsyncMock()
+    monkeypatch.setattr(hass.config_entries, "async_reload", reload)
+    def_config_entry.add_to_hass(hass)
+    def_config_entry.runtime_data = {RT_OPTIONS: {}}
+
+    # e.g. a role update
+    await _async_update_listener(hass, def_config_entry)
+    reload.assert_not_called()
+
+    hass.config_entries.async_update_entry(
+        def_config_entry, options={CFG_CONNECT_CONCURRENCY: 2}
+    )
+    await _async_update_listener(hass, def_config_entry)
+    reload.assert_called_once_with(def_config_entry.entry_id)
@@ -0,0 +1,101 @@
+"""Tests related to the integration wide device liveness tracker."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from custom_components.powersensor import PowersensorLivenessTracker as liveness_module
+from custom_components.powersensor.PowersensorLivenessTracker import (
+    PowersensorLivenessTracker,
+    async_get_liveness_tracker,
+)
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    """Provide a controllable monotonic clock for the liveness tracker."""
+    now = [1000.0]
+    monkeypatch.setattr(liveness_module, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_liveness_tracker_is_shared(hass: HomeAssistant) -> None:
+    """Test that a single liveness tracker is used per Home Assistant instance."""
+    tracker = async_get_liveness_tracker(hass)
+    assert isinstance(tracker, PowersensorLivenessTracker)
+    assert async_get_liveness_tracker(hass) is tracker
+
+
+@pytest.mark.asyncio
+async def test_liveness_tracker_expiry(hass: HomeAssistant, clock) -> None:
+    """Test expiry of silent devices.
+
+    This test verifies that:
+    - The periodic sweep only runs while devices are being tracked.
+    - Only devices silent for longer than the timeout are expired.
+    - All listeners of an expired device are notified, exactly once.
+    """
+    tracker = PowersensorLivenessTracker(hass, timeout=60, tick=5)
+    first = Mock()
+    second = Mock()
+    other = Mock()
+    tracker.subscribe(MAC, first)
+    tracker.subscribe(MAC, second)
+    tracker.subscribe(OTHER_MAC, other)
+    assert tracker._unsub_tick is None
+
+    tracker.touch(MAC)
+    assert tracker._unsub_tick is not None
+    clock[0] += 30
+    tracker.touch(OTHER_MAC)
+    clock[0] += 20
+    tracker.touch(MAC)  # moves MAC behind OTHER_MAC
+    assert list(tracker._last_seen) == [OTHER_MAC, MAC]
+
+    clock[0] += 45
+    tracker._async_sweep()
+    other.assert_called_once_with()
+    first.assert_not_called()
+    assert not tracker.is_alive(OTHER_MAC)
+    assert tracker.is_alive(MAC)
+
+    clock[0] += 20
+    tracker._async_sweep()
+    first.assert_called_once_with()
+    second.assert_called_once_with()
+    assert tracker._unsub_tick is None
+
+    tracker._async_sweep()
+    assert first.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_liveness_tracker_unsubscribe(hass: HomeAssistant, clock) -> None:
+    """Test removal of expiry listeners.
+
+    This test verifies that:
+    - Unsubscribed listeners are not notified.
+    - Unsubscribing twice is harmless.
+    - Stopping the tracker cancels the periodic sweep.
+    """
+    tracker = PowersensorLivenessTracker(hass)
+    listener = Mock()
+    unsubscribe = tracker.subscribe(MAC, listener)
+    unsubscribe()
+    unsubscribe()
+    assert MAC not in tracker._listeners
+
+    tracker.touch(MAC)
+    clock[0] += 120
+    tracker._async_sweep()
+    listener.assert_not_called()
+
+    tracker.touch(MAC)
+    tracker.stop()
+    assert tracker._unsub_tick is None
+    tracker.stop()
@@ -0,0 +1,75 @@
+"""Tests related to the latest-value mailboxes in front of message handling."""
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, call
+
+import pytest
+
+from custom_components.powersensor.PowersensorMailbox import PowersensorMailbox
+from custom_components.powersensor.PowersensorMetrics import async_get_metrics
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+@pytest.mark.asyncio
+async def test_mailbox_latest_value_wins(hass: HomeAssistant) -> None:
+    """Test that messages are handled in batches, keeping only the latest.
+
+    This test verifies that:
+    - Nothing is handled while posting, only on the next loop iteration.
+    - Only the latest message of each device and event is handled, in order
+      of arrival, and superseded messages are counted.
+    - Messages posted while draining are handled in the same drain.
+    """
+    handled = []
+
+    async def handler(event, message):
+        handled.append((event, message["n"]))
+        if message["n"] == 3:
+            mailbox.post(MAC, "average_power", {"n": 5})
+
+    mailbox = PowersensorMailbox(hass, handler)
+    mailbox.post(MAC, "average_power", {"n": 1})
+    mailbox.post(OTHER_MAC, "average_power", {"n": 2})
+    mailbox.post(MAC, "summation_energy", {"n": 3})
+    mailbox.post(MAC, "average_power", {"n": 4})
+    assert len(mailbox) == 3
+    assert handled == []
+
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert handled == [
+        ("average_power", 2),
+        ("summation_energy", 3),
+        ("average_power", 4),
+        ("average_power", 5),
+    ]
+    assert len(mailbox) == 0
+    assert async_get_metrics(hass).totals["messages_superseded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_mailbox_errors_and_stop(hass: HomeAssistant, caplog) -> None:
+    """Test that handler errors are logged, and stopping drops waiting messages."""
+    handler = AsyncMock(side_effect=[ValueError("boom"), None])
+    mailbox = PowersensorMailbox(hass, handler)
+    mailbox.post(MAC, "average_power", {"n": 1})
+    mailbox.post(OTHER_MAC, "average_power", {"n": 2})
+    with caplog.at_level(logging.ERROR):
+        await hass.async_block_till_done(wait_background_tasks=True)
+    assert "Error handling average_power from a4cf1218f158" in caplog.text
+    assert handler.await_args_list[1] == call("average_power", {"n": 2})
+
+    # stopping while a drain is waiting for the handler
+    blocked = asyncio.Event()
+    handler = AsyncMock(side_effect=blocked.wait)
+    mailbox = PowersensorMailbox(hass, handler)
+    mailbox.post(MAC, "average_power", {"n": 1})
+    await asyncio.sleep(0)
+    mailbox.post(MAC, "average_power", {"n": 2})
+    await mailbox.async_stop()
+    assert len(mailbox) == 0
+    handler.assert_awaited_once_with("average_power", {"n": 1})
+    await mailbox.async_stop()
@@ -0,0 +1,163 @@
+"""Tests related to recording plug message streams, and replaying captures."""
+
+from datetime import timedelta
+import logging
+import os
+from time import monotonic
+from unittest.mock import AsyncMock, Mock
+
+from powersensor_local import VirtualHousehold
+import pytest
+
+from custom_components.powersensor.const import CFG_ROLES, DOMAIN
+from custom_components.powersensor.PowersensorMessageDispatcher import (
+    PowersensorMessageDispatcher,
+)
+from custom_components.powersensor.PowersensorMessageRecorder import (
+    CapturedMessage,
+    PowersensorMessageRecorder,
+    async_replay,
+    encode_record,
+    read_capture,
+)
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+MAC = "a4cf1218f158"
+SENSOR_MAC = "a4cf1218f159"
+
+
+def test_capture_round_trip(tmp_path) -> None:
+    """Test that records read back as written."""
+    path = tmp_path / "capture.bin"
+    path.write_bytes(
+        encode_record(1.5, MAC, "average_power", {"mac": MAC, "watts": 12.5})
+        + encode_record(2.5, "", "now_relaying_for", {"device_type": "plug"})
+    )
+    assert list(read_capture(str(path))) == [
+        CapturedMessage(1.5, MAC, "average_power", {"mac": MAC, "watts": 12.5}),
+        CapturedMessage(2.5, "", "now_relaying_for", {"device_type": "plug"}),
+    ]
+
+
+def test_capture_truncated(tmp_path, caplog: pytest.LogCaptureFixture) -> None:
+    """Test that a partially written final record is skipped with a warning."""
+    path = tmp_path / "capture.bin"
+    record = encode_record(1.0, MAC, "average_power", {"watts": 1})
+    path.write_bytes(record + record[:-3])
+    with caplog.at_level(logging.WARNING):
+        assert len(list(read_capture(str(path)))) == 1
+    assert "truncated" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_recorder_flush(hass: HomeAssistant, tmp_path) -> None:
+    """Test that buffered messages are written out once a second."""
+    path = str(tmp_path / "capture.bin")
+    recorder = PowersensorMessageRecorder(hass, path)
+    message = {"mac": MAC, "watts": 1}
+    recorder.record(MAC, "average_power", message)
+    message["role"] = "solar"  # changes after recording don't leak in
+    recorder.record(MAC, "average_power", {"mac": MAC, "watts": 2})
+    assert not os.path.exists(path)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    await hass.async_block_till_done()
+    assert [m.message for m in read_capture(path)] == [
+        {"mac": MAC, "watts": 1},
+        {"mac": MAC, "watts": 2},
+    ]
+
+    # Stopping writes out whatever is left, without waiting
+    recorder.record(MAC, "average_power", {"mac": MAC, "watts": 3})
+    await recorder.async_stop()
+    assert len(list(read_capture(path))) == 3
+    await recorder.async_stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backups", [0, 2])
+async def test_recorder_rotation(
+    hass: HomeAssistant, tmp_path, backups: int
+) -> None:
+    """Test that captures are rotated, keeping the configured number of backups."""
+    path = str(tmp_path / "capture.bin")
+    size = len(encode_record(0.0, MAC, "average_power", {"watts": 0}))
+    recorder = PowersensorMessageRecorder(hass, path, max_bytes=size, backups=backups)
+    for watts in range(4):
+        recorder.record(MAC, "average_power", {"watts": watts})
+        await recorder.async_flush()
+
+    assert [m.message["watts"] for m in read_capture(path)] == [3]
+    for n in range(1, backups + 1):
+        assert [m.message["watts"] for m in read_capture(f"{path}.{n}")] == [3 - n]
+    assert not os.path.exists(f"{path}.{backups + 1}")
+
+
+@pytest.mark.asyncio
+async def test_recorder_write_error(
+    hass: HomeAssistant, tmp_path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test that failing to write a capture is logged, not raised."""
+    recorder = PowersensorMessageRecorder(hass, str(tmp_path / "missing" / "c.bin"))
+    recorder.record(MAC, "average_power", {"watts": 1})
+    await recorder.async_stop()
+    assert "Unable to write message capture" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_records(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    """Test that the dispatcher records messages and relays, and replays them."""
+    path = str(tmp_path / "capture.bin")
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}})
+    dispatcher = PowersensorMessageDispatcher(
+        hass,
+        entry,
+        VirtualHousehold(False),
+        recorder=PowersensorMessageRecorder(hass, path),
+    )
+    await dispatcher.handle_relaying_for(
+        "now_relaying_for", {"mac": SENSOR_MAC, "device_type": "sensor"}
+    )
+    await dispatcher.handle_relaying_for("now_relaying_for", {"device_type": "plug"})
+    await dispatcher.handle_message(
+        "average_power", {"mac": SENSOR_MAC, "device_type": "sensor", "watts": 1}
+    )
+    await dispatcher.disconnect()
+
+    captured = list(read_capture(path))
+    assert [(m.mac, m.event) for m in captured] == [
+        (SENSOR_MAC, "now_relaying_for"),
+        ("", "now_relaying_for"),
+        (SENSOR_MAC, "average_power"),
+    ]
+
+    replay_target = Mock(
+        handle_relaying_for=AsyncMock(), handle_message=AsyncMock()
+    )
+    assert await async_replay(replay_target, iter(captured), speed=None) == 3
+    assert replay_target.handle_relaying_for.await_count == 2
+    replay_target.handle_message.assert_awaited_once_with(
+        "average_power", captured[2].message
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_speed() -> None:
+    """Test that replay keeps the original spacing, scaled by the speed."""
+    messages = [
+        CapturedMessage(100.0, MAC, "average_power", {}),
+        CapturedMessage(100.02, MAC, "average_power", {}),
+        CapturedMessage(100.08, MAC, "average_power", {}),
+    ]
+    dispatcher = Mock(handle_message=AsyncMock())
+    started = monotonic()
+    assert await async_replay(dispatcher, iter(messages), speed=2) == 3
+    assert monotonic() - started >= 0.04
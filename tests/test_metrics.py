@@ -0,0 +1,140 @@
+"""Tests related to the integration metrics registry and its diagnostic entities."""
+
+import pytest
+
+from custom_components.powersensor import PowersensorMetrics as metrics_module
+from custom_components.powersensor.PowersensorMetrics import (
+    LatencyHistogram,
+    PowersensorMetrics,
+    async_get_metrics,
+)
+from custom_components.powersensor.sensor.PowersensorMetricsEntity import (
+    MetricsMeasurements,
+    PowersensorMetricsEntity,
+)
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    """Provide a controllable monotonic clock for the metrics registry."""
+    now = [1000.0]
+    monkeypatch.setattr(metrics_module, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_metrics_is_shared(hass: HomeAssistant) -> None:
+    """Test that a single metrics registry is used per Home Assistant instance."""
+    metrics = async_get_metrics(hass)
+    assert isinstance(metrics, PowersensorMetrics)
+    assert async_get_metrics(hass) is metrics
+
+
+def test_latency_histogram() -> None:
+    """Test percentiles reported by the latency histogram.
+
+    This test verifies that:
+    - An empty histogram has no percentiles.
+    - Percentiles are reported as bucket upper bounds, capped by the maximum.
+    - Durations beyond the largest bucket are reported as the maximum.
+    """
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+
+    for _ in range(98):
+        histogram.observe(0.001)
+    histogram.observe(0.01)
+    assert histogram.percentile(50) == pytest.approx(0.00128)
+    assert histogram.percentile(99) == pytest.approx(0.01)
+
+    histogram.observe(60)
+    assert histogram.count == 100
+    assert histogram.percentile(100) == 60
+    assert histogram.max == 60
+
+
+def test_metrics_windows(clock) -> None:
+    """Test windowed reporting of the metrics registry.
+
+    This test verifies that:
+    - The partial first window is reported until a window completes.
+    - Afterwards the last completed window is reported, by device and event.
+    - Counter totals and gauges are kept across windows.
+    """
+    metrics = PowersensorMetrics(window=30)
+    assert metrics.message_rate() == 0.0
+    assert metrics.message_rates() == {}
+    assert metrics.latency("handle_message").count == 0
+
+    clock[0] += 10
+    for _ in range(20):
+        metrics.message(MAC, "average_power")
+    metrics.message(OTHER_MAC, "battery_level")
+    metrics.observe("handle_message", 0.002)
+    metrics.count("reconnects")
+    assert metrics.message_rate() == pytest.approx(2.1)
+
+    clock[0] += 20
+    assert metrics.message_rates() == {
+        MAC: {"average_power": pytest.approx(0.667)},
+        OTHER_MAC: {"battery_level": pytest.approx(0.033)},
+    }
+    metrics.message(MAC, "average_power")
+    metrics.count("reconnects", 2)
+    assert metrics.latency("handle_message").count == 1
+    assert metrics.totals["reconnects"] == 3
+
+    remove = metrics.add_gauge("plug_queue", lambda: 4)
+    assert metrics.gauge("plug_queue") == 4
+    metrics.add_gauge("plug_queue", lambda: 5)
+    remove()  # replaced, so no longer removes anything
+    assert metrics.gauge("plug_queue") == 5
+    assert metrics.gauge("connect_queue") is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_entities(clock) -> None:
+    """Test the diagnostic entities reporting metrics.
+
+    This test verifies that:
+    - All metrics entities belong to the integration device and are diagnostic.
+    - Values and attributes are read from the metrics registry on update.
+    """
+    metrics = PowersensorMetrics()
+    metrics.message(MAC, "average_power")
+    metrics.observe("handle_message", 0.0005)
+    metrics.count("relays_ignored")
+    metrics.add_gauge("plug_queue", lambda: 2)
+    clock[0] += 1
+
+    entities = {
+        measurement_type: PowersensorMetricsEntity(metrics, measurement_type)
+        for measurement_type in MetricsMeasurements
+    }
+    for entity in entities.values():
+        assert entity.entity_category == EntityCategory.DIAGNOSTIC
+        assert entity.device_info["name"] == "Powersensor Integration"
+        await entity.async_update()
+
+    rate = entities[MetricsMeasurements.MESSAGE_RATE]
+    assert rate.native_value == 1.0
+    assert rate.extra_state_attributes == {"by_device": {MAC: {"average_power": 1.0}}}
+    latency = entities[MetricsMeasurements.MESSAGE_LATENCY]
+    assert latency.native_value == 0.5
+    assert latency.extra_state_attributes == {
+        "p50": 0.5,
+        "p99": 0.5,
+        "max": 0.5,
+        "count": 1,
+    }
+    assert entities[MetricsMeasurements.ENTITY_UPDATE_LATENCY].native_value is None
+    assert entities[MetricsMeasurements.IGNORED_RELAYS].native_value == 1
+    assert entities[MetricsMeasurements.RECONNECTS].native_value == 0
+    assert entities[MetricsMeasurements.PLUG_QUEUE_DEPTH].native_value == 2
+    assert entities[MetricsMeasurements.CONNECT_QUEUE_DEPTH].native_value is None
+    assert entities[MetricsMeasurements.SUPERSEDED_MESSAGES].native_value == 0
@@ -0,0 +1,267 @@
+"""Tests related to bounded-concurrency plug connection establishment."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from custom_components.powersensor import PlugConnectionManager as manager_module
+from custom_components.powersensor.PlugConnectionManager import PlugConnectionManager
+from custom_components.powersensor.PowersensorLivenessTracker import (
+    async_get_liveness_tracker,
+)
+from homeassistant.core import HomeAssistant
+
+MACS = [f"a4cf1218f1{n:02}" for n in range(5)]
+
+
+@pytest.fixture(autouse=True)
+def no_stagger(monkeypatch: pytest.MonkeyPatch):
+    """Remove the random stagger delay so tests run deterministically."""
+    monkeypatch.setattr(manager_module.random, "uniform", lambda a, b: 0)
+
+
+def make_api() -> Mock:
+    """Return a mock PlugApi."""
+    return Mock(disconnect=AsyncMock())
+
+
+async def settle():
+    """Let the connection workers run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_connections_bounded_concurrency(hass: HomeAssistant) -> None:
+    """Test that only a limited number of plugs connect at the same time.
+
+    This test verifies that:
+    - No more than `concurrency` connections are in progress at once.
+    - A first message frees up a slot for the next queued plug.
+    - Time to first message is recorded per plug.
+    """
+    manager = PlugConnectionManager(hass, concurrency=2, first_message_timeout=30)
+    apis = {mac: make_api() for mac in MACS}
+    for mac, api in apis.items():
+        manager.request_connect(mac, api)
+    await settle()
+
+    connected = [mac for mac, api in apis.items() if api.connect.called]
+    assert connected == MACS[:2]
+    assert manager.time_to_first_message(MACS[0]) is None
+
+    manager.message_received(MACS[0])
+    manager.message_received(MACS[0])  # later messages are ignored
+    await settle()
+    assert apis[MACS[2]].connect.called
+    assert not apis[MACS[3]].connect.called
+    assert manager.time_to_first_message(MACS[0]) is not None
+    assert manager.time_to_first_message("unknown") is None
+
+    await manager.stop()
+    assert not manager._workers
+
+
+@pytest.mark.asyncio
+async def test_connections_first_message_timeout(hass: HomeAssistant) -> None:
+    """Test that a silent plug only holds its slot until the timeout.
+
+    This test verifies that:
+    - The next plug is connected once the first message timeout expires.
+    - Replacing a queued plug's API only connects the newest one.
+    """
+    manager = PlugConnectionManager(hass, concurrency=1, first_message_timeout=0.1)
+    first = make_api()
+    replaced = make_api()
+    second = make_api()
+    manager.request_connect(MACS[0], first)
+    manager.request_connect(MACS[1], replaced)
+    manager.request_connect(MACS[1], second)
+    await settle()
+    assert first.connect.called
+    assert not second.connect.called
+
+    await asyncio.sleep(0.2)
+    await settle()
+    assert second.connect.called
+    assert not replaced.connect.called
+    assert manager.time_to_first_message(MACS[0]) is None
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_connections_overlapping_attempts(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test two connection attempts for the same plug overlapping.
+
+    This test verifies that:
+    - The older attempt timing out leaves the newer attempt awaiting.
+    - The workers of both attempts finish cleanly.
+    """
+    call_later = Mock()
+    monkeypatch.setattr(manager_module, "async_call_later", call_later)
+    manager = PlugConnectionManager(hass, concurrency=2, first_message_timeout=0.1)
+    older = make_api()
+    newer = make_api()
+    manager.request_connect(MACS[0], older)
+    await settle()
+    workers = set(manager._workers)
+    await asyncio.sleep(0.05)
+    manager.request_connect(MACS[0], newer)
+    await settle()
+    workers |= manager._workers
+    assert older.connect.called
+    assert newer.connect.called
+
+    await asyncio.sleep(0.07)
+    assert MACS[0] in manager._awaiting_first_message
+    call_later.assert_not_called()
+
+    await asyncio.sleep(0.05)
+    await settle()
+    assert MACS[0] not in manager._awaiting_first_message
+    call_later.assert_called_once()
+    assert len(workers) == 2
+    assert all(task.done() and task.exception() is None for task in workers)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_connections_cancel(hass: HomeAssistant) -> None:
+    """Test cancelling of connection requests.
+
+    This test verifies that:
+    - A queued plug which is cancelled never gets connected.
+    - Cancelling a connecting plug frees its slot.
+    """
+    manager = PlugConnectionManager(hass, concurrency=1, first_message_timeout=30)
+    apis = {mac: make_api() for mac in MACS[:3]}
+    for mac, api in apis.items():
+        manager.request_connect(mac, api)
+    await settle()
+    manager.cancel(MACS[1])
+    manager.cancel(MACS[0])
+    await settle()
+
+    assert not apis[MACS[1]].connect.called
+    assert apis[MACS[2]].connect.called
+    assert MACS[0] not in manager.stats
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_connections_stale_after_stagger(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test plugs changing while a worker waits out the stagger delay.
+
+    This test verifies that:
+    - A plug cancelled during the stagger delay is not connected.
+    - A plug given a new API during the stagger delay only connects the new one.
+    """
+    monkeypatch.setattr(manager_module.random, "uniform", lambda a, b: b)
+    manager = PlugConnectionManager(
+        hass, concurrency=1, stagger=0.05, first_message_timeout=30
+    )
+    cancelled = make_api()
+    stale = make_api()
+    replacement = make_api()
+    manager.request_connect(MACS[0], cancelled)
+    manager.request_connect(MACS[1], stale)
+    await settle()
+    manager.cancel(MACS[0])
+    await asyncio.sleep(0.07)
+    await settle()
+    assert not cancelled.connect.called
+
+    manager.request_connect(MACS[1], replacement)
+    await asyncio.sleep(0.15)
+    await settle()
+    assert not stale.connect.called
+    assert replacement.connect.call_count == 1
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_connections_reconnect_backoff(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test reconnecting failed plugs with exponential backoff.
+
+    This test verifies that:
+    - Each consecutive failure doubles the reconnect delay, up to a maximum.
+    - Failures are ignored while connecting, or with a reconnect scheduled.
+    - A reconnect disconnects and reconnects the plug, keeping its stats.
+    - A first message resets the backoff, and starts the uptime.
+    """
+    monkeypatch.setattr(manager_module.random, "uniform", lambda a, b: b)
+    call_later = Mock()
+    monkeypatch.setattr(manager_module, "async_call_later", call_later)
+    manager = PlugConnectionManager(
+        hass, stagger=0, first_message_timeout=0.01, backoff_min=1, backoff_max=5
+    )
+    api = make_api()
+    manager.request_connect(MACS[0], api)
+    manager.report_failure(MACS[0], "still connecting")
+
+    delays = []
+    for _ in range(4):
+        await asyncio.sleep(0.03)
+        manager.report_failure(MACS[0], "test")  # already scheduled
+        (_, delay, job), _ = call_later.call_args
+        delays.append(delay)
+        await job.target()
+    assert delays == [1, 2, 4, 5]
+    assert call_later.call_count == 4
+    assert api.disconnect.await_count == 4
+    stats = manager.stats[MACS[0]]
+    assert stats.reconnects == 4
+    assert stats.failures == 4
+    assert stats.uptime is None
+
+    await settle()
+    manager.message_received(MACS[0])
+    assert stats.failures == 0
+    assert stats.uptime is not None
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_connections_supervision(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test detection of failed plug connections.
+
+    This test verifies that:
+    - A plug which never sends a first message is reconnected.
+    - A plug which goes silent is reconnected.
+    - A plug cancelled while a reconnect is scheduled is left alone.
+    """
+    call_later = Mock()
+    monkeypatch.setattr(manager_module, "async_call_later", call_later)
+    manager = PlugConnectionManager(hass, first_message_timeout=0.01)
+    api = make_api()
+    manager.request_connect(MACS[0], api)
+    await asyncio.sleep(0.05)
+    assert call_later.call_count == 1
+    (_, _, job), _ = call_later.call_args
+    await job.target()
+    await settle()
+    manager.message_received(MACS[0])
+    assert api.connect.call_count == 2
+
+    async_get_liveness_tracker(hass)._listeners[MACS[0]][0]()
+    assert call_later.call_count == 2
+    manager.report_failure("unknown", "test")
+    assert call_later.call_count == 2
+
+    unsub = call_later.return_value
+    manager.cancel(MACS[0])
+    unsub.assert_called_once()
+    assert MACS[0] not in async_get_liveness_tracker(hass)._listeners
+    (_, _, job), _ = call_later.call_args
+    await job.target()
+    assert api.disconnect.await_count == 1
+    await manager.stop()
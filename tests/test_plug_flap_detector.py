@@ -0,0 +1,64 @@
+"""Tests related to the per plug flap detection."""
+
+import importlib
+
+import pytest
+
+from custom_components.powersensor.PlugFlapDetector import PlugFlapDetector
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+def test_flap_detector_debounce(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test adapting of the removal debounce.
+
+    This test verifies that:
+    - Plugs without history get half the base debounce.
+    - Flaps and connection drops grow the debounce, up to the maximum.
+    - The score decays with the half life, shrinking the debounce again.
+    - The debounce is never below the minimum.
+    - Plugs are stable until they flap, and again once the score has decayed.
+    """
+    mod = importlib.import_module("custom_components.powersensor.PlugFlapDetector")
+    now = 1000.0
+    monkeypatch.setattr(mod, "monotonic", lambda: now)
+    detector = PlugFlapDetector(base=60, minimum=20, maximum=300, half_life=100)
+
+    assert detector.score(MAC) == 0
+    assert detector.debounce(MAC) == 30
+    assert detector.is_stable(MAC)
+
+    detector.record_flap(MAC)
+    assert detector.debounce(MAC) == pytest.approx(60)
+    assert not detector.is_stable(MAC)
+    detector.record_drop(MAC)
+    detector.record_drop(MAC)
+    assert detector.score(MAC) == pytest.approx(2)
+    assert detector.debounce(MAC) == pytest.approx(120)
+    assert detector.debounce(OTHER_MAC) == 30
+
+    for _ in range(5):
+        detector.record_flap(MAC)
+    assert detector.debounce(MAC) == 300
+    assert detector.as_diagnostics(MAC) == {
+        "score": 7,
+        "flaps": 6,
+        "drops": 2,
+        "removal_debounce": 300,
+    }
+
+    now += 500
+    assert detector.score(MAC) == pytest.approx(7 / 32)
+    assert not detector.is_stable(MAC)
+    now += 1000
+    assert detector.debounce(MAC) == pytest.approx(30, abs=0.01)
+    assert detector.is_stable(MAC)
+    assert detector.as_diagnostics(OTHER_MAC) == {
+        "score": 0,
+        "flaps": 0,
+        "drops": 0,
+        "removal_debounce": 30,
+    }
+
+    assert PlugFlapDetector(base=30, minimum=20).debounce(MAC) == 20
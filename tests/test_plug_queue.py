@@ -0,0 +1,76 @@
+"""Tests related to the ordered queue of plugs waiting to be added."""
+
+import asyncio
+
+import pytest
+
+from custom_components.powersensor.PlugQueue import PlugQueue, PlugState
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+PLUG = (MAC, "192.168.0.33", 49476, "plug")
+OTHER_PLUG = (OTHER_MAC, "192.168.0.34", 49476, "other-plug")
+
+
+def test_plug_queue_order_and_dedup() -> None:
+    """Test ordering and de-duplication of queued plugs.
+
+    This test verifies that:
+    - Plugs are handed out in the order they were first queued.
+    - Re-queueing a waiting plug refreshes its details without duplicating it.
+    - Taking from an empty queue raises a KeyError.
+    """
+    queue = PlugQueue()
+    assert not queue
+    assert queue.put(PLUG)
+    assert queue.put(OTHER_PLUG)
+    updated = (MAC, "192.168.0.35", 49476, "plug")
+    assert queue.put(updated)
+    assert len(queue) == 2
+    assert MAC in queue
+
+    assert queue.get_nowait() == updated
+    assert queue.get_nowait() == OTHER_PLUG
+    assert MAC not in queue
+    with pytest.raises(KeyError):
+        queue.get_nowait()
+
+
+def test_plug_queue_states() -> None:
+    """Test tracking of per-plug progress.
+
+    This test verifies that:
+    - Queued plugs are pending.
+    - Plugs being created cannot be queued again.
+    - Connected plugs queued again stay connected.
+    - Forgotten plugs lose their state and leave the queue.
+    """
+    queue = PlugQueue()
+    assert queue.state(MAC) is None
+    queue.put(PLUG)
+    assert queue.state(MAC) == PlugState.PENDING
+
+    queue.get_nowait()
+    queue.set_state(MAC, PlugState.CREATING)
+    assert not queue.put(PLUG)
+    assert not queue
+
+    queue.set_state(MAC, PlugState.CONNECTED)
+    assert queue.put(PLUG)
+    assert MAC in queue
+    assert queue.state(MAC) == PlugState.CONNECTED
+    queue.forget(MAC)
+    assert queue.state(MAC) is None
+    assert not queue
+
+
+@pytest.mark.asyncio
+async def test_plug_queue_get_waits() -> None:
+    """Test that `get` waits for a plug to be queued."""
+    queue = PlugQueue()
+    getter = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not getter.done()
+
+    queue.put(PLUG)
+    assert await asyncio.wait_for(getter, 1) == PLUG
@@ -0,0 +1,71 @@
+"""Tests related to the deadline based scheduling of plug removals."""
+
+import asyncio
+from unittest.mock import Mock, call
+
+import pytest
+
+from custom_components.powersensor.PlugRemovalScheduler import PlugRemovalScheduler
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+@pytest.mark.asyncio
+async def test_removal_scheduler_due(hass: HomeAssistant) -> None:
+    """Test removals becoming due.
+
+    This test verifies that:
+    - Each removal is due after its own delay, in order, with a single timer.
+    - A pending removal is only ever brought forward, not pushed back.
+    """
+    on_due = Mock()
+    scheduler = PlugRemovalScheduler(hass, on_due)
+    scheduler.schedule(MAC, 0.3)
+    scheduler.schedule(OTHER_MAC, 0.1)
+    scheduler.schedule(OTHER_MAC, 1)
+    assert len(scheduler) == 2
+    assert MAC in scheduler
+    assert sorted(scheduler) == [MAC, OTHER_MAC]
+
+    await asyncio.sleep(0.2)
+    await hass.async_block_till_done()
+    on_due.assert_called_once_with(OTHER_MAC)
+    assert OTHER_MAC not in scheduler
+
+    await asyncio.sleep(0.2)
+    await hass.async_block_till_done()
+    assert on_due.call_args_list == [call(OTHER_MAC), call(MAC)]
+    assert not scheduler
+
+
+@pytest.mark.asyncio
+async def test_removal_scheduler_cancel(hass: HomeAssistant) -> None:
+    """Test cancelling of removals.
+
+    This test verifies that:
+    - A cancelled removal never becomes due, and the others still do.
+    - Cancelling reports whether a removal was pending.
+    - Stopping cancels all removals.
+    """
+    on_due = Mock()
+    scheduler = PlugRemovalScheduler(hass, on_due)
+    scheduler.schedule(MAC, 0.1)
+    scheduler.schedule(OTHER_MAC, 0.2)
+    assert scheduler.cancel(MAC)
+    assert not scheduler.cancel(MAC)
+
+    await asyncio.sleep(0.3)
+    await hass.async_block_till_done()
+    on_due.assert_called_once_with(OTHER_MAC)
+
+    on_due.reset_mock()
+    scheduler.schedule(MAC, 0.1)
+    assert scheduler.cancel(MAC)
+    scheduler.schedule(MAC, 0.1)
+    scheduler.schedule(OTHER_MAC, 0)
+    scheduler.stop()
+    await asyncio.sleep(0.2)
+    await hass.async_block_till_done()
+    on_due.assert_not_called()
@@ -1,5 +1,6 @@
 """Tests covering the generic/abstract Powersensor Entity class and subclasses."""
 
+from datetime import timedelta
 import importlib
 from unittest.mock import Mock
 
@@ -7,6 +8,9 @@ from powersensor_local import VirtualHousehold
 import pytest
 
 from custom_components.powersensor.const import DOMAIN
+from custom_components.powersensor.PowersensorLivenessTracker import (
+    async_get_liveness_tracker,
+)
 from custom_components.powersensor.sensor.PowersensorEntity import (
     PowersensorEntity, PowersensorSensorEntityDescription,
 )
@@ -14,13 +18,22 @@ from custom_components.powersensor.sensor.PowersensorHouseholdEntity import (
     HouseholdMeasurements,
     PowersensorHouseholdEntity,
 )
+from custom_components.powersensor.sensor.PowersensorRestoreSensor import (
+    PowersensorExtraStoredData,
+)
 from custom_components.powersensor.sensor.PowersensorSensorEntity import (
     PowersensorSensorEntity,
 )
 from custom_components.powersensor.sensor.SensorMeasurements import (
     SensorMeasurements,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, State
+import homeassistant.util.dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    async_fire_time_changed,
+    mock_restore_cache_with_extra_data,
+)
 
 MAC = "a4cf1218f158"
 
@@ -86,29 +99,25 @@ async def test_generic_powersensor_entity(
         hass, MAC, "house-net", _config, SensorMeasurements.SUMMATION_ENERGY
     )
     assert not entity.available
-    assert entity._remove_unavailability_tracker is None
     entity._handle_update("event", {})
     assert entity.available
 
-    entity._schedule_unavailable()
-    assert entity._remove_unavailability_tracker is not None
-    entity._handle_update("event", {})
-    assert entity._remove_unavailability_tracker is not None
-    assert callable(entity._remove_unavailability_tracker)
-
-    await entity._async_make_unavailable(None)
+    entity._async_make_unavailable()
+    assert not entity.available
+    # repeated expiry is a no-op
+    entity._async_make_unavailable()
     assert not entity.available
 
     # this should not be implemented for generics and "renaming" should fail and be false
     assert not entity._rename_based_on_role()
-    entity._handle_role_update(MAC + "garbage", "solar")
-    # should not have gotten renamed
+    renamed: list = []
+    entity._handle_role_update("role_update", {"role": "house-net", "renamed": renamed})
     assert entity._role == "house-net"
 
-    # to trigger renaming logic for abstract clas we need to
-    entity._handle_role_update(MAC, "solar")
-    # should now be solar
+    # the role changes, but the abstract class isn't renamed
+    entity._handle_role_update("role_update", {"role": "solar", "renamed": renamed})
     assert entity._role == "solar"
+    assert renamed == []
 
 
 @pytest.mark.asyncio
@@ -189,20 +198,28 @@ async def test_entity_removal(
     """Test removal of PowersensorSensorEntity.
 
     This test verifies that:
-    - The entity's unavailability tracker is correctly scheduled.
-    - The entity's unavailability tracker is called when removing from Home Assistant.
+    - The entity is marked unavailable when its device stops reporting.
+    - The entity stops listening for device expiry when removed from Home Assistant.
     """
+    monkeypatch.setattr(PowersensorEntity, "async_write_ha_state", Mock())
+    tracker = async_get_liveness_tracker(hass)
     entity = PowersensorSensorEntity(
         hass, MAC, "house-net", SensorMeasurements.SUMMATION_ENERGY
     )
+    await entity.async_added_to_hass()
     entity._has_recently_received_update_message = True  # make available
 
-    assert entity._remove_unavailability_tracker is None
-    entity._schedule_unavailable()
-    assert entity._remove_unavailability_tracker is not None
-    entity._remove_unavailability_tracker = Mock()
-    await entity.async_will_remove_from_hass()
-    entity._remove_unavailability_tracker.assert_called_once_with()
+    tracker.touch(MAC)
+    tracker._last_seen[MAC] -= tracker._timeout
+    tracker._async_sweep()
+    assert not entity.available
+
+    entity._has_recently_received_update_message = True
+    entity._call_on_remove_callbacks()
+    tracker.touch(MAC)
+    tracker._last_seen[MAC] -= tracker._timeout
+    tracker._async_sweep()
+    assert entity.available
 
 
 @pytest.mark.asyncio
@@ -213,7 +230,7 @@ async def test_powersensor_sensor_handle_role_update(
 
     This test verifies that:
     - The entity's name and device name are correctly updated based on the new role.
-    - The Home Assistant registry is accessed when handling the update.
+    - The Home Assistant registries are updated once for the device.
     """
 
     powersensor_entity_module = importlib.import_module(
@@ -247,11 +264,30 @@ async def test_powersensor_sensor_handle_role_update(
     assert entity._device_name == "bad_name"
     assert entity._attr_name == f"bad_name {entity._measurement_name}"
 
-    entity._handle_role_update(MAC, "solar")
+    other = powersensor_sensor_entity_module.PowersensorSensorEntity(
+        hass, MAC, "house-net", SensorMeasurements.WATTS
+    )
+    renamed: list = []
+    for e in (entity, other):
+        e._handle_role_update("role_update", {"role": "solar", "renamed": renamed})
+    assert renamed == [entity, other]
 
     assert entity._device_name == "Powersensor Solar Sensor ☀️"
     assert entity._attr_name == f"Powersensor Solar Sensor ☀️ {entity._measurement_name}"
+    assert write_state.call_count == 2
+
+    powersensor_entity_module.async_rename_device(hass, MAC, renamed)
+    assert dr.async_get.call_count == 1
+    device_registry.async_update_device.assert_called_once_with(
+        device.id, name="Powersensor Solar Sensor ☀️"
+    )
     assert er.async_get.call_count == 1
+    assert er.async_get.return_value.async_update_entity.call_count == 2
+
+    # no device registry update when the name already matches
+    device.name = "Powersensor Solar Sensor ☀️"
+    powersensor_entity_module.async_rename_device(hass, MAC, renamed)
+    assert device_registry.async_update_device.call_count == 1
     # try adding it to hass directly
     await entity.async_added_to_hass()
 
@@ -294,3 +330,108 @@ async def test_powersensor_entity_handle_update(
     entity._handle_update(None, message)
     assert entity._has_recently_received_update_message
     assert entity.native_value == 123456789
+
+
+@pytest.mark.asyncio
+async def test_restore_last_value(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test restoring entities' last known values on startup.
+
+    This test verifies that:
+    - Restored entities are available straight away, flagged as stale.
+    - Fresh data clears the stale flag, and is saved for the next restore.
+    - Restored entities still expire if their device doesn't report.
+    - Missing or unusable saved data leaves entities unavailable.
+    """
+    monkeypatch.setattr(PowersensorEntity, "async_write_ha_state", Mock())
+    monkeypatch.setattr(
+        PowersensorHouseholdEntity, "async_write_ha_state", lambda self: None
+    )
+    mock_restore_cache_with_extra_data(
+        hass,
+        [
+            (
+                State("sensor.watts", "1234"),
+                {
+                    "native_value": 1234.0,
+                    "native_unit_of_measurement": "W",
+                    "last_message_at": 1700000000.0,
+                },
+            ),
+            (
+                State("sensor.vhh", "12"),
+                {"native_value": 12, "native_unit_of_measurement": "W"},
+            ),
+            (
+                State("sensor.unknown", "unknown"),
+                {"native_value": None, "native_unit_of_measurement": "W"},
+            ),
+            (State("sensor.invalid", "1"), {"native_value": 1}),
+        ],
+    )
+    tracker = async_get_liveness_tracker(hass)
+
+    def make_entity(entity_id):
+        entity = PowersensorSensorEntity(
+            hass, MAC, "house-net", SensorMeasurements.WATTS
+        )
+        entity.hass = hass
+        entity.entity_id = entity_id
+        return entity
+
+    entity = make_entity("sensor.watts")
+    await entity.async_added_to_hass()
+    assert entity.available
+    assert entity.native_value == 1234.0
+    assert entity.extra_state_attributes == {
+        "stale": True,
+        "last_message_at": "2023-11-14T22:13:20+00:00",
+    }
+    # Not taken for a device that is reporting
+    assert not tracker.is_alive(MAC)
+
+    entity._handle_update("average_power", {"watts": 10})
+    assert entity.available
+    assert entity.extra_state_attributes is None
+    restore_data = entity.extra_restore_state_data.as_dict()
+    assert restore_data["native_value"] == 10
+    assert PowersensorExtraStoredData.from_dict(restore_data) == (
+        entity.extra_restore_state_data
+    )
+
+    # Fresh data outlasts the restored value's expiry
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert entity.available
+
+    # A restored value expires if the device doesn't report, or goes silent
+    for expire in ("timer", "silence"):
+        entity = make_entity("sensor.watts")
+        await entity.async_added_to_hass()
+        assert entity.available
+        if expire == "timer":
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+            await hass.async_block_till_done()
+        else:
+            entity._async_make_unavailable()
+        assert not entity.available
+
+    for entity_id in ("sensor.unknown", "sensor.invalid", "sensor.missing"):
+        entity = make_entity(entity_id)
+        await entity.async_added_to_hass()
+        assert not entity.available
+        assert entity.extra_state_attributes is None
+
+    household = PowersensorHouseholdEntity(
+        VirtualHousehold(False), HouseholdMeasurements.POWER_FROM_GRID
+    )
+    household.hass = hass
+    household.entity_id = "sensor.vhh"
+    await household.async_added_to_hass()
+    assert household.native_value == 12
+    assert household.extra_state_attributes == {"stale": True, "last_message_at": None}
+    await household._on_event("from_grid", {"watts": 5})
+    assert household.native_value == 5
+    assert household.extra_state_attributes is None
+    await household.async_will_remove_from_hass()
@@ -0,0 +1,159 @@
+"""Tests related to probing for plugs where mDNS doesn't get through."""
+
+import asyncio
+import importlib
+from ipaddress import IPv4Network
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from custom_components.powersensor.const import (
+    ZEROCONF_ADD_PLUG_SIGNAL,
+    ZEROCONF_UPDATE_PLUG_SIGNAL,
+)
+from custom_components.powersensor.PowersensorProbeDiscovery import (
+    PROBE,
+    PowersensorProbeDiscovery,
+    _addresses,
+    parse_probe_targets,
+)
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+
+
+class FakePlug(asyncio.DatagramProtocol):
+    """A local socket standing in for a plug, answering probes."""
+
+    def __init__(self) -> None:
+        """Constructor for the fake plug."""
+        self.transport: asyncio.DatagramTransport | None = None
+        self.probes = 0
+
+    def connection_made(self, transport) -> None:
+        """Remember the socket."""
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        """Answer probes like a plug does."""
+        assert data == PROBE
+        assert self.transport is not None
+        self.probes += 1
+        answer = json.dumps({"type": "discovery", "ip": addr[0], "mac": MAC})
+        self.transport.sendto(b"garbage\n[1]\n" + answer.encode(), addr)
+
+
+@pytest.fixture
+async def plug(socket_enabled):
+    """Return a fake plug listening on a local port."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        FakePlug, local_addr=("127.0.0.1", 0)
+    )
+    yield protocol
+    transport.close()
+
+
+def test_parse_probe_targets() -> None:
+    """Test parsing of the addresses to probe.
+
+    This test verifies that:
+    - Addresses and ranges can be separated by commas and spaces.
+    - Invalid entries, IPv6, and too many addresses are rejected.
+    """
+    assert parse_probe_targets("") == []
+    assert parse_probe_targets(" 192.168.0.1, 10.0.0.0/30  10.0.1.7/24") == [
+        IPv4Network("192.168.0.1/32"),
+        IPv4Network("10.0.0.0/30"),
+        IPv4Network("10.0.1.0/24"),
+    ]
+    for invalid in ("plug.local", "fe80::1", "10.0.0.0/8"):
+        with pytest.raises(ValueError):
+            parse_probe_targets(invalid)
+
+
+def test_probe_addresses() -> None:
+    """Test that each host address is probed only once."""
+    networks = parse_probe_targets("10.0.0.2, 10.0.0.0/30, 10.0.0.9")
+    assert list(_addresses(networks)) == ["10.0.0.2", "10.0.0.1", "10.0.0.9"]
+
+
+@pytest.mark.asyncio
+async def test_probe_scan(hass: HomeAssistant, plug) -> None:
+    """Test probing for plugs.
+
+    This test verifies that:
+    - Plugs answering a probe are identified by their mac.
+    - Addresses which don't answer are given up on after the timeout.
+    """
+    assert plug.transport is not None
+    port = plug.transport.get_extra_info("sockname")[1]
+    probe = PowersensorProbeDiscovery(
+        hass,
+        parse_probe_targets("127.0.0.1, 127.0.0.2"),
+        port=port,
+        concurrency=1,
+        timeout=0.2,
+    )
+    assert await probe.async_scan() == {MAC: "127.0.0.1"}
+    assert plug.probes == 1
+
+    # the socket is only open while scanning
+    probe.datagram_received(json.dumps({"mac": OTHER_MAC}).encode(), ("127.0.0.3", 1))
+    probe.error_received(OSError("unreachable"))
+    assert await probe.async_scan() == {MAC: "127.0.0.1"}
+
+
+@pytest.mark.asyncio
+async def test_probe_rescan(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test repeated scanning.
+
+    This test verifies that:
+    - New plugs are signalled as added, and changed addresses as updated.
+    - Plugs missing from a scan are not forgotten.
+    - The interval between scans doubles while nothing changes, up to the maximum.
+    - Stopping cancels the next scan.
+    """
+    mod = importlib.import_module(
+        "custom_components.powersensor.PowersensorProbeDiscovery"
+    )
+    send = Mock()
+    monkeypatch.setattr(mod, "async_dispatcher_send", send)
+    call_later = Mock()
+    monkeypatch.setattr(mod, "async_call_later", call_later)
+    probe = PowersensorProbeDiscovery(
+        hass, [], interval_min=10, interval_max=30
+    )
+    scans = [
+        {MAC: "10.0.0.1"},
+        {MAC: "10.0.0.1"},
+        OSError("no network"),
+        {},
+        {MAC: "10.0.0.2", OTHER_MAC: "10.0.0.3"},
+    ]
+    monkeypatch.setattr(probe, "async_scan", AsyncMock(side_effect=scans))
+
+    intervals = []
+    for _ in scans:
+        probe.start()
+        await hass.async_block_till_done(wait_background_tasks=True)
+        intervals.append(call_later.call_args[0][1])
+
+    assert intervals == [10, 20, 30, 30, 10]
+    assert probe.plugs == {MAC: "10.0.0.2", OTHER_MAC: "10.0.0.3"}
+    signals = [(args[1], args[2]["addresses"]) for args, _ in send.call_args_list]
+    assert signals == [
+        (ZEROCONF_ADD_PLUG_SIGNAL, ["10.0.0.1"]),
+        (ZEROCONF_UPDATE_PLUG_SIGNAL, ["10.0.0.2"]),
+        (ZEROCONF_ADD_PLUG_SIGNAL, ["10.0.0.3"]),
+    ]
+    assert send.call_args_list[0][0][2]["properties"] == {b"id": MAC.encode()}
+
+    await probe.async_stop()
+    call_later.return_value.assert_called_once()
+    # stopping again is harmless
+    await probe.async_stop()
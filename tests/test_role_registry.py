@@ -0,0 +1,161 @@
+"""Tests related to the persisted registry of device roles."""
+
+from datetime import timedelta
+from typing import Any
+
+import pytest
+
+from custom_components.powersensor.const import CFG_ROLES, DOMAIN
+from custom_components.powersensor.PowersensorRoleRegistry import (
+    PowersensorRoleRegistry,
+    async_remove_role_registry,
+)
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+MAC = "a4cf1218f158"
+OTHER_MAC = "a4cf1218f159"
+KEY = f"{DOMAIN}.test.roles"
+
+
+@pytest.mark.asyncio
+async def test_roles_moved_from_config_entry(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that roles in the config entry are taken over on first load."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CFG_ROLES: {MAC: "house-net"}}, entry_id="test"
+    )
+    roles = PowersensorRoleRegistry(hass, entry)
+    await roles.async_load()
+    assert roles.get(MAC) == "house-net"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    # Which of the devices are sensors isn't known from the config entry
+    assert hass_storage[KEY]["data"] == {"roles": {MAC: "house-net"}, "sensors": []}
+
+    # From then on the store is used
+    hass_storage[KEY]["data"] = {"roles": {MAC: "solar"}, "sensors": [MAC]}
+    roles = PowersensorRoleRegistry(hass, entry)
+    await roles.async_load()
+    assert roles.get(MAC) == "solar"
+    assert roles.sensors == {MAC}
+
+    await async_remove_role_registry(hass, "test")
+    await hass.async_block_till_done()
+    assert KEY not in hass_storage
+
+
+@pytest.mark.asyncio
+async def test_role_updates_batched(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that role changes are written together, and non-changes not at all."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CFG_ROLES: {}}, entry_id="test")
+    roles = PowersensorRoleRegistry(hass, entry)
+    await roles.async_load()
+    assert roles.get(MAC, "<unknown>") == "<unknown>"
+
+    assert roles.update(MAC, "house-net")
+    assert roles.update(OTHER_MAC, None)
+    assert not roles.update(OTHER_MAC, None)
+    assert OTHER_MAC in roles
+    assert KEY not in hass_storage
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    assert hass_storage[KEY]["data"]["roles"] == {MAC: "house-net", OTHER_MAC: None}
+
+    # Nothing written when nothing changed
+    hass_storage.pop(KEY)
+    assert not roles.update(MAC, "house-net")
+    await roles.async_stop()
+    assert KEY not in hass_storage
+
+    # Pending changes are written on stop
+    roles.update(MAC, "solar")
+    await roles.async_stop()
+    assert hass_storage[KEY]["data"]["roles"][MAC] == "solar"
+    assert dict(roles.items()) == {MAC: "solar", OTHER_MAC: None}
+
+    # What is written is a snapshot, unaffected by later changes
+    roles.update(MAC, "water")
+    await roles.async_stop()
+    written = hass_storage[KEY]["data"]
+    roles.update(MAC, "gas")
+    assert written["roles"][MAC] == "water"
+    await roles.async_stop()
+
+
+@pytest.mark.asyncio
+async def test_role_registry_sensors(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test remembering which devices are sensors.
+
+    This test verifies that:
+    - Roles stored before sensors were remembered are migrated, with no sensors.
+    - Adding a sensor is written out, but only the first time.
+    """
+    hass_storage[KEY] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": KEY,
+        "data": {MAC: "house-net", OTHER_MAC: "appliance"},
+    }
+    entry = MockConfigEntry(domain=DOMAIN, data={}, entry_id="test")
+    roles = PowersensorRoleRegistry(hass, entry)
+    await roles.async_load()
+    assert dict(roles.items()) == {MAC: "house-net", OTHER_MAC: "appliance"}
+    assert roles.sensors == frozenset()
+
+    roles.add_sensor(MAC)
+    await roles.async_stop()
+    assert hass_storage[KEY]["minor_version"] == 2
+    assert hass_storage[KEY]["data"]["sensors"] == [MAC]
+
+    hass_storage.pop(KEY)
+    roles.add_sensor(MAC)
+    await roles.async_stop()
+    assert KEY not in hass_storage
+    assert roles.sensors == {MAC}
+
+
+@pytest.mark.asyncio
+async def test_role_index_and_events(hass: HomeAssistant) -> None:
+    """Test that the role index follows updates, and listeners hear of changes."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CFG_ROLES: {MAC: "house-net", OTHER_MAC: "house-net"}},
+        entry_id="test",
+    )
+    roles = PowersensorRoleRegistry(hass, entry)
+    assert roles.macs_with_role("house-net") == {MAC, OTHER_MAC}
+    assert not roles.has_role("solar")
+
+    changes = []
+    unsubscribe = roles.subscribe(lambda *change: changes.append(change))
+    roles.update(OTHER_MAC, "solar")
+    roles.update(OTHER_MAC, "solar")
+    assert roles.macs_with_role("house-net") == {MAC}
+    assert roles.has_role("solar")
+
+    roles.update(MAC, "appliance")
+    assert not roles.has_role("house-net")
+    assert roles.macs_with_role("house-net") == frozenset()
+    assert changes == [
+        (OTHER_MAC, "house-net", "solar"),
+        (MAC, "house-net", "appliance"),
+    ]
+
+    unsubscribe()
+    unsubscribe()
+    roles.update(MAC, "water")
+    assert len(changes) == 2
+    await roles.async_stop()
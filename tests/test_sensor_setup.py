@@ -8,13 +8,32 @@ import pytest
 
 from custom_components.powersensor import RT_DISPATCHER
 from custom_components.powersensor.const import (
+    CFG_ROLES,
     CREATE_SENSOR_SIGNAL,
     DOMAIN,
     ROLE_UPDATE_SIGNAL,
     RT_VHH,
+    SENSOR_ADDED_TO_HA_SIGNAL,
     UPDATE_VHH_SIGNAL,
 )
+from custom_components.powersensor.PowersensorDeviceRouter import async_get_router
+from custom_components.powersensor.PowersensorRoleRegistry import (
+    PowersensorRoleRegistry,
+)
+from custom_components.powersensor import sensor as sensor_platform
 from custom_components.powersensor.sensor import async_setup_entry
+from custom_components.powersensor.sensor.PowersensorHouseholdEntity import (
+    PowersensorHouseholdEntity,
+)
+from custom_components.powersensor.sensor.PowersensorMetricsEntity import (
+    MetricsMeasurements,
+)
+from custom_components.powersensor.sensor.PowersensorSensorEntity import (
+    PowersensorSensorEntity,
+)
+from custom_components.powersensor.sensor.SensorMeasurements import (
+    SensorMeasurements,
+)
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
@@ -25,11 +44,12 @@ from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 logging.getLogger().setLevel(logging.CRITICAL)
 MAC = "a4cf1218f158"
+METRICS = len(MetricsMeasurements)
 OTHER_MAC = "a4cf1218f159"
 
 
 @pytest.fixture
-def config_entry():
+def config_entry(hass: HomeAssistant):
     """Return a mock config entry with populated runtime data.
 
     This fixture provides a basic config entry setup, including an empty dispatcher and sensor queue.
@@ -39,6 +59,7 @@ def config_entry():
     runtime_data = {RT_VHH: VirtualHousehold(False), RT_DISPATCHER: AsyncMock()}
     runtime_data[RT_DISPATCHER].plugs = {}
     runtime_data[RT_DISPATCHER].on_start_sensor_queue = {}
+    runtime_data[RT_DISPATCHER].roles = PowersensorRoleRegistry(hass, entry)
     entry.runtime_data = runtime_data
     return entry
 
@@ -50,13 +71,25 @@ async def test_setup_entry(
     """Test setup of an existing Powersensor config entry.
 
     This test verifies that:
-    - The `async_setup_entry` function calls `update_entry` with the correct arguments.
+    - Role updates are recorded in the role registry, not the config entry.
     - The dispatcher sends a signal to update the VHH roles.
     - The signal handler is called correctly.
+    - Only the device's entities are told, and the device is renamed once.
     """
     entry = config_entry
     async_update_entry = Mock()
     monkeypatch.setattr(hass.config_entries, "async_update_entry", async_update_entry)
+    async_rename_device = Mock()
+    monkeypatch.setattr(sensor_platform, "async_rename_device", async_rename_device)
+    monkeypatch.setattr(PowersensorSensorEntity, "async_write_ha_state", Mock())
+    sensor_entities = [
+        PowersensorSensorEntity(hass, mac, "appliance", measurement)
+        for mac in (MAC, OTHER_MAC)
+        for measurement in (SensorMeasurements.WATTS, SensorMeasurements.ROLE)
+    ]
+    router = async_get_router(hass)
+    for entity in sensor_entities:
+        router.subscribe(entity._mac, "role_update", entity._handle_role_update)
     entities = []
 
     def callback(new_entities, *args, **kwargs):
@@ -72,6 +105,13 @@ async def test_setup_entry(
         await hass.async_block_till_done()
 
     mock_handler.assert_called_once_with()
+    assert entry.runtime_data[RT_DISPATCHER].roles.get(MAC) == "house-net"
+    assert [entity._role for entity in sensor_entities] == [
+        "house-net", "house-net", "appliance", "appliance"
+    ]
+    async_rename_device.assert_called_once_with(hass, MAC, sensor_entities[:2])
+    async_update_entry.assert_not_called()
+    await entry.runtime_data[RT_DISPATCHER].roles.async_stop()
 
 
 @pytest.mark.asyncio
@@ -98,13 +138,13 @@ async def test_discovered_sensor(
         await hass.async_block_till_done()
 
     # check that the right number of entities have been added
-    assert len(entities) == 5
+    assert len(entities) == METRICS + 5
     # @todo: check that the correct entities are created
 
     async_dispatcher_send(hass, CREATE_SENSOR_SIGNAL, OTHER_MAC, "solar")
     await hass.async_block_till_done()
     # check that the right number of additional entities have been added
-    assert len(entities) == 10
+    assert len(entities) == METRICS + 10
 
 
 @pytest.mark.asyncio
@@ -128,6 +168,54 @@ async def test_initially_known_plugs_and_sensors(
 
     await async_setup_entry(hass, entry, callback)
 
-    assert len(entities) == 12
+    assert len(entities) == METRICS + 12
     # @todo: check that correct entities are created
 
+
+
+@pytest.mark.asyncio
+async def test_sensors_created_from_persisted_roles(
+    hass: HomeAssistant, config_entry
+) -> None:
+    """Test that all known sensors are created at startup, with their roles.
+
+    This test verifies that:
+    - Sensors and the household entities they imply are added in one batch.
+    - Persisted roles of devices not known to be sensors, like plugs, don't
+      create sensor entities.
+    - The dispatcher is told about the sensors, so they aren't created again.
+    - Household entities are still added later as roles change.
+    """
+    plug_mac = "a4cf12000001"
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CFG_ROLES: {MAC: "house-net", plug_mac: "appliance"}}
+    )
+    entry.runtime_data = config_entry.runtime_data
+    entry.runtime_data[RT_DISPATCHER].roles = PowersensorRoleRegistry(hass, entry)
+    entry.runtime_data[RT_DISPATCHER].roles.add_sensor(MAC)
+    batches = []
+
+    def callback(new_entities, *args, **kwargs):
+        batches.append(new_entities)
+
+    added = Mock()
+    async_dispatcher_connect(hass, SENSOR_ADDED_TO_HA_SIGNAL, added)
+    await async_setup_entry(hass, entry, callback)
+    await hass.async_block_till_done()
+
+    assert len(batches) == 1
+    household = [e for e in batches[0] if isinstance(e, PowersensorHouseholdEntity)]
+    assert len(household) == 4
+    assert len(batches[0]) == METRICS + 5 + 4
+    added.assert_called_once_with(MAC, "house-net")
+
+    # Nothing more to add until solar shows up
+    async_dispatcher_send(hass, UPDATE_VHH_SIGNAL)
+    await hass.async_block_till_done()
+    assert len(batches) == 1
+
+    entry.runtime_data[RT_DISPATCHER].roles.update(OTHER_MAC, "solar")
+    async_dispatcher_send(hass, UPDATE_VHH_SIGNAL)
+    await hass.async_block_till_done()
+    assert len(batches) == 2
+    assert len(batches[1]) == 4
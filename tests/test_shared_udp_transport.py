@@ -0,0 +1,256 @@
+"""Tests related to connecting to all plugs over a single shared socket."""
+
+import asyncio
+import json
+import logging
+from unittest.mock import AsyncMock, Mock
+
+from powersensor_local import PlugApi
+from powersensor_local.async_event_emitter import AsyncEventEmitter
+import pytest
+
+from custom_components.powersensor.PowersensorSharedUdpTransport import (
+    SUBSCRIBE,
+    UNSUBSCRIBE,
+    PowersensorSharedUdpTransport,
+    SharedUdpPlugApi,
+    SharedUdpPlugListener,
+    async_get_shared_udp_transport,
+)
+from homeassistant.core import HomeAssistant
+
+MAC = "a4cf1218f158"
+POWER_MESSAGE = {
+    "type": "instant_power",
+    "device": "plug",
+    "mac": MAC,
+    "starttime": 1,
+    "power": 10,
+    "duration": 1,
+    "unit": "w",
+    "current": 0.1,
+    "active_current": 0.1,
+    "reactive_current": 0,
+    "voltage": 240,
+}
+
+
+class FakePlug(asyncio.DatagramProtocol):
+    """A local socket standing in for a plug."""
+
+    def __init__(self) -> None:
+        """Constructor for the fake plug."""
+        self.received: asyncio.Queue = asyncio.Queue()
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport) -> None:
+        """Remember the socket."""
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        """Queue what was sent to the plug."""
+        self.received.put_nowait((data, addr))
+
+    async def next(self) -> tuple[bytes, tuple[str, int]]:
+        """Return the next datagram sent to the plug."""
+        return await asyncio.wait_for(self.received.get(), 5)
+
+
+@pytest.fixture
+async def plug(socket_enabled):
+    """Return a fake plug listening on a local port."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        FakePlug, local_addr=("127.0.0.1", 0)
+    )
+    yield protocol
+    transport.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_is_shared(hass: HomeAssistant) -> None:
+    """Test that a single shared socket is used per Home Assistant instance."""
+    shared = async_get_shared_udp_transport(hass)
+    assert isinstance(shared, PowersensorSharedUdpTransport)
+    assert async_get_shared_udp_transport(hass) is shared
+
+
+@pytest.mark.parametrize("missing", ["_listener", "_on_message", "_on_exception"])
+def test_shared_plug_api_unsupported(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, missing: str
+) -> None:
+    """Test that a PlugApi no longer wired up as relied on is refused."""
+
+    def init(self, **kwargs) -> None:
+        if missing != "_listener":
+            self._listener = AsyncEventEmitter()
+
+    monkeypatch.setattr(PlugApi, "__init__", init)
+    if missing != "_listener":
+        monkeypatch.delattr(PlugApi, missing)
+    with pytest.raises(TypeError):
+        SharedUdpPlugApi(MAC, "127.0.0.1", 49476, PowersensorSharedUdpTransport(hass))
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_messages(hass: HomeAssistant, plug) -> None:
+    """Test receiving plug messages over the shared socket.
+
+    This test verifies that:
+    - The socket is bound on connecting, and the plug subscribed to.
+    - Datagrams are decoded and emitted by the plug's PlugApi, skipping
+      malformed and non-event lines.
+    - Subscription warnings and silent plugs lead to resubscribing.
+    - Datagrams from unknown addresses are ignored.
+    - Disconnecting unsubscribes, and closes the socket after the last plug.
+    """
+    shared = PowersensorSharedUdpTransport(hass)
+    host, port = plug.transport.get_extra_info("sockname")
+    api = SharedUdpPlugApi(MAC, host, port, shared)
+    assert (api.ip_address, api.port) == (host, port)
+    handler = AsyncMock()
+    api.subscribe("average_power", handler)
+
+    api.connect()
+    data, shared_addr = await plug.next()
+    assert data == SUBSCRIBE
+    assert shared.is_open
+
+    lines = [
+        {"type": "subscription", "subtype": "warning"},
+        {"type": "subscription", "subtype": "ok"},
+        {"type": "discovery"},
+        1,
+        POWER_MESSAGE,
+    ]
+    datagram = b"\n".join(json.dumps(line).encode() for line in lines)
+    plug.transport.sendto(datagram + b"\nnot json", shared_addr)
+    assert (await plug.next())[0] == SUBSCRIBE
+    await hass.async_block_till_done()
+    handler.assert_awaited_once()
+    assert handler.await_args_list[0].args[1]["watts"] == 10
+
+    # a stranger's datagrams aren't handed to any plug
+    loop = asyncio.get_running_loop()
+    stranger, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, local_addr=("127.0.0.1", 0)
+    )
+    stranger.sendto(json.dumps(POWER_MESSAGE).encode(), shared_addr)
+    stranger.close()
+    shared.error_received(OSError("unreachable"))
+
+    listener = api._listener
+    shared._async_sweep()
+    assert plug.received.empty()
+    listener.deadline = 0
+    shared._async_sweep()
+    assert (await plug.next())[0] == SUBSCRIBE
+
+    await api.disconnect()
+    assert (await plug.next())[0] == UNSUBSCRIBE
+    assert not shared.is_open
+    await api.disconnect()
+    await hass.async_block_till_done()
+    handler.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_binding(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, caplog
+) -> None:
+    """Test binding of the shared socket going wrong.
+
+    This test verifies that:
+    - Failing to bind is logged, and retried on the next sweep.
+    - Disconnecting the last plug while binding cancels it.
+    - A socket bound after all plugs disconnected is closed straight away.
+    - A socket closing unexpectedly is bound again on the next sweep.
+    """
+    shared = PowersensorSharedUdpTransport(hass)
+    bind = AsyncMock(side_effect=OSError("in use"))
+    monkeypatch.setattr(hass.loop, "create_datagram_endpoint", bind)
+    listener = SharedUdpPlugListener(shared, "127.0.0.1", 49476)
+    listener.connect()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert "Unable to bind the shared plug socket" in caplog.text
+    assert not shared.is_open
+
+    bind.side_effect = None
+    bind.return_value = (Mock(), shared)
+    shared._async_sweep()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert bind.await_count == 2
+
+    # binding which hasn't finished when the last plug goes
+    bind.side_effect = asyncio.Event().wait
+    shared._async_sweep()
+    await asyncio.sleep(0)
+    await listener.disconnect()
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    transport = Mock()
+    shared.connection_made(transport)
+    transport.close.assert_called_once()
+    assert not shared.is_open
+
+    listener.connect()
+    shared._async_close()
+    shared._listeners[listener.addr] = listener
+    shared.connection_made(transport)
+    assert shared.is_open
+    transport.sendto.assert_called_once_with(SUBSCRIBE, listener.addr)
+    with caplog.at_level(logging.WARNING):
+        shared.connection_lost(None)
+    assert "closed unexpectedly" in caplog.text
+    assert not shared.is_open
+    shared.connection_lost(None)
+    await listener.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_address_taken_over(
+    hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch, caplog
+) -> None:
+    """Test two plugs swapping addresses.
+
+    This test verifies that:
+    - A listener registering for an address another one holds takes over.
+    - Datagrams are handed to the newest listener of an address only.
+    - Disconnecting a listener which was taken over doesn't unsubscribe the
+      plug now at its address.
+    """
+    shared = PowersensorSharedUdpTransport(hass)
+    transport = Mock()
+    bind = AsyncMock(return_value=(transport, shared))
+    monkeypatch.setattr(hass.loop, "create_datagram_endpoint", bind)
+    first = SharedUdpPlugListener(shared, "127.0.0.1", 49476)
+    second = SharedUdpPlugListener(shared, "127.0.0.2", 49476)
+    first.connect()
+    second.connect()
+    shared.connection_made(transport)
+
+    # the plugs swap addresses, and new listeners connect before the old go
+    swapped_first = SharedUdpPlugListener(shared, "127.0.0.2", 49476)
+    swapped_second = SharedUdpPlugListener(shared, "127.0.0.1", 49476)
+    with caplog.at_level(logging.WARNING):
+        swapped_first.connect()
+        swapped_second.connect()
+    assert caplog.text.count("taken over by another connection") == 2
+    assert not shared.is_registered(first)
+    assert not shared.is_registered(second)
+
+    transport.reset_mock()
+    await first.disconnect()
+    await second.disconnect()
+    transport.sendto.assert_not_called()
+    assert shared.is_open
+
+    handler = AsyncMock()
+    swapped_first.subscribe("message", handler)
+    shared.datagram_received(json.dumps(POWER_MESSAGE).encode(), swapped_first.addr)
+    await hass.async_block_till_done()
+    handler.assert_awaited_once()
+
+    await swapped_first.disconnect()
+    await swapped_second.disconnect()
+    assert not shared.is_open
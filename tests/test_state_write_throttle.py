@@ -0,0 +1,114 @@
+"""Tests related to throttling of Home Assistant state writes."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from custom_components.powersensor.sensor import StateWriteThrottle as throttle_module
+from custom_components.powersensor.sensor.StateWriteThrottle import (
+    StateWriteThrottle,
+    StateWriteThrottleConfig,
+)
+from homeassistant.core import HomeAssistant
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    """Provide a controllable monotonic clock for the throttle."""
+    now = [1000.0]
+    monkeypatch.setattr(throttle_module, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_throttle_display_precision(hass: HomeAssistant, clock) -> None:
+    """Test suppression of writes which would not change the displayed value.
+
+    This test verifies that:
+    - The first value is always written.
+    - Values equal at the display precision are not written.
+    - The latest value is written once the heartbeat interval has passed.
+    - Forced writes bypass the throttle.
+    """
+    write = Mock()
+    throttle = StateWriteThrottle(
+        StateWriteThrottleConfig(heartbeat_interval=60), 1, write
+    )
+    throttle.async_update(hass, 10.01)
+    assert write.call_count == 1
+    throttle.async_update(hass, 10.04)
+    assert write.call_count == 1
+    throttle.async_update(hass, 10.2)
+    assert write.call_count == 2
+
+    clock[0] += 60
+    throttle.async_update(hass, 10.2)
+    assert write.call_count == 3
+    throttle.async_update(hass, 10.2, force=True)
+    assert write.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_throttle_deadbands(hass: HomeAssistant, clock) -> None:
+    """Test the absolute and relative deadbands.
+
+    This test verifies that:
+    - Changes within the absolute deadband are not written.
+    - Changes within the relative deadband are not written.
+    - Non-numeric values are written whenever they change.
+    """
+    write = Mock()
+    throttle = StateWriteThrottle(
+        StateWriteThrottleConfig(deadband_abs=0.5, deadband_rel=0.01), None, write
+    )
+    throttle.async_update(hass, 230.0)
+    throttle.async_update(hass, 230.4)  # within absolute deadband
+    throttle.async_update(hass, 232.0)  # within relative deadband (2.3)
+    assert write.call_count == 1
+    throttle.async_update(hass, 233.0)
+    assert write.call_count == 2
+
+    throttle = StateWriteThrottle(StateWriteThrottleConfig(), None, write)
+    throttle.async_update(hass, "solar")
+    throttle.async_update(hass, "solar")
+    assert write.call_count == 3
+    throttle.async_update(hass, "house-net")
+    assert write.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_throttle_min_interval(hass: HomeAssistant, clock) -> None:
+    """Test the minimum write interval.
+
+    This test verifies that:
+    - Changes within the minimum interval are deferred rather than dropped.
+    - Only a single deferred write is scheduled.
+    - The deferred write flushes the latest value.
+    - Pending writes can be cancelled.
+    """
+    write = Mock()
+    throttle = StateWriteThrottle(
+        StateWriteThrottleConfig(min_interval=10), 0, write
+    )
+    throttle.async_update(hass, 1)
+    throttle.async_update(hass, 2)
+    pending = throttle._unsub_flush
+    assert pending is not None
+    throttle.async_update(hass, 3)
+    assert throttle._unsub_flush is pending
+    assert write.call_count == 1
+
+    clock[0] += 10
+    throttle._async_deferred_flush(None)
+    assert write.call_count == 2
+    assert throttle._last_value == 3
+    assert throttle._unsub_flush is None
+
+    clock[0] += 10
+    throttle.async_update(hass, 4)
+    assert write.call_count == 3
+    throttle.async_update(hass, 5)
+    assert throttle._unsub_flush is not None
+    throttle.cancel()
+    assert throttle._unsub_flush is None
+    throttle.cancel()
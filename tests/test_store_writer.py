@@ -0,0 +1,81 @@
+"""Tests related to the batched writes to a store."""
+
+from datetime import timedelta
+import threading
+from typing import Any
+
+import pytest
+
+from custom_components.powersensor.PowersensorStoreWriter import (
+    PowersensorStoreWriter,
+)
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+KEY = "powersensor.test.writer"
+
+
+@pytest.mark.asyncio
+async def test_store_writer_snapshot_on_loop(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that the snapshot is taken on the loop, once the delay has passed.
+
+    This test verifies that:
+    - Changes made while a write is pending join it.
+    - The data handed to the store is the snapshot, not the live data.
+    - Flushing without a pending write writes nothing.
+    """
+    data = {"a": 1}
+    snapshots: list[dict] = []
+
+    def snapshot() -> dict:
+        assert threading.get_ident() == hass.loop_thread_id
+        snapshots.append(dict(data))
+        return snapshots[-1]
+
+    writer = PowersensorStoreWriter(hass, Store(hass, 1, KEY), snapshot, 10)
+    assert not writer.pending
+    writer.schedule()
+    data["b"] = 2
+    writer.schedule()
+    assert writer.pending
+    assert snapshots == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    assert not writer.pending
+    assert snapshots == [{"a": 1, "b": 2}]
+    assert hass_storage[KEY]["data"] == {"a": 1, "b": 2}
+
+    data["c"] = 3
+    assert snapshots[-1] == {"a": 1, "b": 2}
+
+    hass_storage.pop(KEY)
+    await writer.async_flush()
+    assert KEY not in hass_storage
+
+
+@pytest.mark.asyncio
+async def test_store_writer_final_write(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that a pending write is done when Home Assistant stops."""
+    writer = PowersensorStoreWriter(
+        hass, Store(hass, 1, KEY), lambda: {"a": 1}, 10
+    )
+    writer.schedule()
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    assert not writer.pending
+    assert hass_storage[KEY]["data"] == {"a": 1}
+
+    # The timer was cancelled along with it
+    hass_storage.pop(KEY)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    assert KEY not in hass_storage